@@ -1,104 +1,756 @@
+import time
+
+STARTED_AT = time.perf_counter()
+
+import json
+import logging
 import os
+import shutil
 import sys
-from flask import Flask, jsonify, request, send_from_directory
+import tempfile
+import threading
+from flask import Flask, Response, abort, g, jsonify, request
 from flask_cors import CORS
+from werkzeug.datastructures import FileStorage
 
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if ROOT_DIR not in sys.path:
     sys.path.append(ROOT_DIR)
 
-from qupid_time_dependent_floquet import run_simulation
-from backend.message_analyzer import parse_messages_from_upload, infer_parameters
+from qupid_time_dependent_floquet import (
+    SCORING_BACKENDS,
+    build_simulation_args,
+    floquet_cache_stats,
+    max_scoring_points,
+    result_cache_stats,
+    run_simulation,
+    run_sweep,
+    score_parameter_sets,
+    validate_simulation_options,
+    validate_simulation_params,
+    warmup,
+)
+from qupid_plot import plot_cache_stats, plot_png
+from qupid_surrogate import load_surrogate
+from backend.lexicon import load_lexicon
+from backend.message_analyzer import MAX_UPLOAD_BYTES, parse_messages_from_upload, infer_parameters
+from backend import encoding, telemetry
+from backend.jobs import JobQueueFull, JobTimeout, runner_from_env
+from backend.timeline import conversation_timeline
+from backend.sessions import LexiconMismatch, SessionNotFound, session_store
+from backend.static_assets import StaticAssets
 
 FRONTEND_DIST = os.path.abspath(
     os.path.join(os.path.dirname(__file__), "..", "qupid-app", "dist")
 )
-app = Flask(__name__, static_folder=FRONTEND_DIST, static_url_path="")
+# serve_react handles every frontend path; Flask's own static route would
+# shadow it for all of them.
+app = Flask(__name__, static_folder=None)
+static_assets = StaticAssets(FRONTEND_DIST)
 CORS(app)
+# Oversized uploads are refused from Content-Length before any body is read;
+# the slack covers multipart framing around the file itself.
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES + 1024 * 1024
+job_runner = runner_from_env()
+if telemetry.ENABLED:
+    job_runner.observers.append(telemetry.record_job)
+startup = {
+    "status": "warming",
+    "import_seconds": round(time.perf_counter() - STARTED_AT, 3),
+    "warmup_seconds": None,
+    "warmup": None,
+}
 
 
-def to_unit(value):
+def run_warmup():
+    start = time.perf_counter()
     try:
-        return float(value) / 100.0
-    except (TypeError, ValueError):
-        return 0.0
+        timings = warmup()
+        lexicon_start = time.perf_counter()
+        load_lexicon()
+        timings["lexicon"] = time.perf_counter() - lexicon_start
+    except Exception as exc:
+        startup.update(status="failed", error=str(exc))
+        telemetry.log_event("warmup_failed", level=logging.ERROR, error=str(exc))
+        return
+    startup.update(
+        status="ready",
+        warmup_seconds=round(time.perf_counter() - start, 3),
+        warmup={name: round(seconds, 3) for name, seconds in timings.items()},
+    )
+    telemetry.log_event(
+        "startup", import_seconds=startup["import_seconds"], warmup_seconds=startup["warmup_seconds"],
+        warmup=startup["warmup"],
+    )
+
+
+# "sync" warms up during import, as the pre-forking server does in its
+# master before the workers are forked.
+if os.environ.get("QUPID_WARMUP", "1") == "sync":
+    run_warmup()
+elif os.environ.get("QUPID_WARMUP", "1") != "0":
+    threading.Thread(target=run_warmup, name="qupid-warmup", daemon=True).start()
+else:
+    startup["status"] = "ready"
+
+
+SIMULATION_OPTIONS = {
+    "periods": int, "samples": int, "propagation": str, "backend": str, "quality": str, "tolerance": float,
+}
+PLOT_MODES = ("url", "inline")
+# Quality for /run requests that name none, e.g. "draft" for an interactive
+# deployment; see QUALITY_PRESETS.
+DEFAULT_QUALITY = os.environ.get("QUPID_DEFAULT_QUALITY", "standard")
+# Most processes one sweep, scoring or timeline job may use, whatever the
+# request asks for; the pre-forking server already has one worker per core.
+SWEEP_WORKERS = int(os.environ.get("QUPID_SWEEP_WORKERS", 0)) or os.cpu_count() or 1
+
+
+def simulation_options(payload):
+    """
+    Optional solver settings from a /run payload, e.g. {"periods": 100,
+    "samples": 2001, "propagation": "periodic"} for a long-term outlook,
+    {"quality": "draft"} while a slider is dragged, or {"quality":
+    "adaptive", "tolerance": 0.1}.
+    """
+    options = {"quality": DEFAULT_QUALITY}
+    for name, cast in SIMULATION_OPTIONS.items():
+        if payload.get(name) is not None:
+            try:
+                options[name] = cast(payload[name])
+            except (TypeError, ValueError):
+                raise ValueError(f"invalid value for '{name}'") from None
+    validate_simulation_options(**options)
+    plot_mode = payload.get("plot") or "url"
+    if plot_mode not in PLOT_MODES:
+        raise ValueError(f"unknown plot mode '{plot_mode}'; expected one of {PLOT_MODES}")
+    options["render_plot"] = plot_mode == "inline"
+    return options
+
+
+def with_plot_url(results):
+    results["plot_url"] = f"/plots/{results['plot_id']}.png"
+    return results
+
+
+def simulation_job(params, progress, options=None):
+    results = run_simulation(params, progress=progress, **(options or {}))
+    return with_plot_url(results)
+
+
+def analysis_job(uploaded_file, progress, lexicon=None):
+    progress("parsing")
+    messages = parse_messages_from_upload(uploaded_file)
+    progress("inference")
+    inferred_params, analyzer_debug = infer_parameters(messages, lexicon)
+    sim_results = run_simulation(build_simulation_args(inferred_params), progress=progress)
+    sim_results["inferred_params"] = inferred_params
+    sim_results["analyzer_debug"] = analyzer_debug
+    sim_results["messages_analyzed"] = len(messages)
+    return with_plot_url(sim_results)
 
 
-def build_simulation_args(payload):
-    omega_A = to_unit(payload.get("personATemperarment"))
-    omega_B = to_unit(payload.get("personBTemperarment"))
-    J_empathy = to_unit(payload.get("mutualEmpathy"))
-    J_compatability = to_unit(payload.get("mutualCompatability"))
-    drive_amplitude = to_unit(payload.get("mutualStrength"))
-    drive_freq = to_unit(payload.get("mutualFrequency"))
+def scoring_workers(requested):
+    """The `workers` a request asks for, capped at SWEEP_WORKERS."""
+    try:
+        return max(1, min(int(requested or 1), SWEEP_WORKERS))
+    except (TypeError, ValueError):
+        raise ValueError("workers must be an integer") from None
 
-    rate_bit_flip_A = to_unit(payload.get("personAHotCold"))
-    rate_dephase_A = to_unit(payload.get("personADistant"))
-    rate_decay_A = to_unit(payload.get("personABurnedOut"))
 
-    rate_bit_flip_B = to_unit(payload.get("personBHotCold"))
-    rate_dephase_B = to_unit(payload.get("personBDistant"))
-    rate_decay_B = to_unit(payload.get("personBBurnedOut"))
+def timeline_options(form):
+    try:
+        options = {
+            "window_days": float(form.get("window_days") or 7.0),
+            "step_days": float(form.get("step_days") or 3.5),
+        }
+    except ValueError:
+        raise ValueError("window_days and step_days must be numbers") from None
+    workers = scoring_workers(form.get("workers"))
+    backend = form.get("backend") or "numpy"
+    validate_simulation_options(backend=backend)
+    return options, workers, backend
 
-    mutual_sync = payload.get("mutualSync", 0)
-    rate_anti_corr = to_unit(100 - float(mutual_sync or 0))
-    rate_coll_decay = to_unit(payload.get("mutualCodependence"))
 
+def timeline_job(uploaded_file, progress, lexicon=None, options=None, workers=1, backend="numpy"):
+    progress("parsing")
+    messages = parse_messages_from_upload(uploaded_file)
+    progress("inference")
+    windows = conversation_timeline(messages, lexicon, **(options or {}))
+    # All windows are simulated in one batched call, grouped by Hamiltonian.
+    progress("solve")
+    scored = [window for window in windows if "inferred_params" in window]
+    params_list = [build_simulation_args(window["inferred_params"]) for window in scored]
+    scores = score_parameter_sets(params_list, workers, backend=backend)[0].tolist() if scored else []
+    for window, score in zip(scored, scores):
+        window["health_score"] = round(score, 3)
+    for window in windows:
+        window.setdefault("health_score", None)
     return {
-        "omega_A": omega_A,
-        "omega_B": omega_B,
-        "J_empathy": J_empathy,
-        "J_compatability": J_compatability,
-        "drive_amplitude": drive_amplitude,
-        "drive_freq": drive_freq,
-        "rate_bit_flip_A": rate_bit_flip_A,
-        "rate_dephase_A": rate_dephase_A,
-        "rate_decay_A": rate_decay_A,
-        "rate_bit_flip_B": rate_bit_flip_B,
-        "rate_dephase_B": rate_dephase_B,
-        "rate_decay_B": rate_decay_B,
-        "rate_anti_corr": rate_anti_corr,
-        "rate_coll_decay": rate_coll_decay,
+        "windows": windows,
+        "window_days": (options or {}).get("window_days", 7.0),
+        "step_days": (options or {}).get("step_days", 3.5),
+        "messages_analyzed": len(messages),
+        "backend": backend,
     }
 
 
+def sweep_job(base, axes, progress, workers=1, include_summaries=False, backend="qutip"):
+    progress("solve")
+    return run_sweep(base, axes, workers=workers, include_summaries=include_summaries, backend=backend)
+
+
+def score_job(params_list, progress, workers=1, include_summaries=False, backend="steady_state"):
+    progress("solve")
+    return score_parameter_sets(params_list, workers, include_summaries, backend)
+
+
+def append_upload(session, uploaded_file, progress):
+    progress("parsing")
+    messages = parse_messages_from_upload(uploaded_file)
+    progress("inference")
+    appended, skipped = session.append(messages)
+    body = session.to_dict()
+    body.update(appended=appended, skipped=skipped)
+    if session.stats.total:
+        body["inferred_params"], body["analyzer_debug"] = session.parameters()
+    return body
+
+
+def session_create_job(session, uploaded_file, progress):
+    with session_store.lock(session.id):
+        body = append_upload(session, uploaded_file, progress)
+        session_store.put(session)
+    return body
+
+
+def session_append_job(session_id, uploaded_file, progress):
+    with session_store.lock(session_id):
+        session = session_store.get(session_id)
+        body = append_upload(session, uploaded_file, progress)
+        session_store.put(session)
+    return body
+
+
+def session_run_job(inferred_params, analyzer_debug, messages, progress):
+    sim_results = run_simulation(build_simulation_args(inferred_params), progress=progress)
+    sim_results["inferred_params"] = inferred_params
+    sim_results["analyzer_debug"] = analyzer_debug
+    sim_results["messages_analyzed"] = messages
+    return with_plot_url(sim_results)
+
+
+def run_sync(kind, fn, *args, **kwargs):
+    # Runs a job on the shared pool and keeps its stage timings for the
+    # Server-Timing header.
+    job = job_runner.run_job(kind, fn, *args, **kwargs)
+    if telemetry.ENABLED:
+        g.stage_timings = telemetry.stage_timings(job)
+    return job.outcome()
+
+
+def encoded_response(data):
+    # MessagePack for clients that prefer it, JSON otherwise; compression is
+    # applied afterwards by compress_response.
+    if encoding.wants_msgpack(request.accept_mimetypes):
+        response = Response(encoding.packb(data), mimetype="application/msgpack")
+    else:
+        response = jsonify(data)
+    response.vary.add("Accept")
+    return response
+
+
+def result_response(result):
+    """
+    A finished result limited to the ?fields= the client names (unknown
+    names are a 400), in the format it accepts.
+    """
+    try:
+        result = encoding.select_fields(result, encoding.parse_fields(request.args.get("fields")))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return encoded_response(result)
+
+
+def queue_full_response(exc):
+    response = jsonify({"error": f"server busy: {exc}. retry shortly."})
+    response.status_code = 503
+    response.headers["Retry-After"] = "5"
+    return response
+
+
+def job_timeout_response(exc):
+    # The job keeps its slot until it finishes; the client can poll it.
+    response = jsonify({
+        "error": f"{exc}; poll status_url for the result",
+        "job_id": exc.job.id,
+        "status_url": f"/jobs/{exc.job.id}",
+    })
+    response.status_code = 504
+    return response
+
+
+if telemetry.ENABLED:
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.get("request_started")
+        if started is None:
+            return response
+        total = time.perf_counter() - started
+        endpoint = request.endpoint or "unmatched"
+        telemetry.REQUEST_SECONDS.observe(total, endpoint, request.method, response.status_code)
+        if request.mimetype == "multipart/form-data" and request.content_length:
+            telemetry.UPLOAD_BYTES.observe(request.content_length, endpoint)
+        response.headers["Server-Timing"] = telemetry.server_timing(g.get("stage_timings", ()), total)
+        return response
+
+
+@app.after_request
+def compress_response(response):
+    # Large JSON and MessagePack bodies only; static assets arrive
+    # precompressed and event streams must not be buffered.
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in encoding.COMPRESSIBLE_MIMETYPES
+        or (response.content_length or 0) < encoding.COMPRESS_MIN_BYTES
+    ):
+        return response
+    response.vary.add("Accept-Encoding")
+    chosen = encoding.choose_encoding(request.accept_encodings)
+    if chosen is not None:
+        response.set_data(encoding.compress(response.get_data(), chosen))
+        response.headers["Content-Encoding"] = chosen
+    return response
+
+
+@app.errorhandler(413)
+def upload_too_large(exc):
+    return jsonify({"error": f"upload too large; the limit is {MAX_UPLOAD_BYTES} bytes."}), 413
+
+
+def upload_lexicon():
+    # Optional "lang" form field; unknown languages raise ValueError.
+    return load_lexicon(request.form.get("lang") or None)
+
+
+def missing_file_response():
+    return jsonify({"error": "missing file upload. send multipart/form-data with a 'file' field."}), 400
+
+
+def spool_upload(uploaded_file):
+    # The request's stream is closed once the response is sent, so uploads
+    # handed to a background job are copied into a spooled temp file first.
+    spooled = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    shutil.copyfileobj(uploaded_file.stream, spooled)
+    spooled.seek(0)
+    return FileStorage(stream=spooled, filename=uploaded_file.filename, content_type=uploaded_file.content_type)
+
+
+def preview_result(params):
+    surrogate = load_surrogate()
+    if surrogate is None:
+        return None
+    preview = surrogate.predict(params)
+    preview["approximate"] = True
+    preview["surrogate"] = surrogate.info()
+    return preview
+
+
+def job_accepted_response(job, preview=None):
+    body = {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events",
+    }
+    if preview is not None:
+        body["preview"] = preview
+    response = jsonify(body)
+    response.status_code = 202
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return response
+
+
 @app.route("/run", methods=["POST"])
 def run_qupid():
     payload = request.get_json(force=True) or {}
-    results = run_simulation(build_simulation_args(payload))
-
-    print(results["report_text"])
-    return jsonify(results)
+    try:
+        options = simulation_options(payload)
+        params = build_simulation_args(payload)
+        validate_simulation_params(params)
+        results = run_sync("run", simulation_job, params, options=options)
+    except JobQueueFull as exc:
+        return queue_full_response(exc)
+    except JobTimeout as exc:
+        return job_timeout_response(exc)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return result_response(results)
 
 
 @app.route("/analyze-run", methods=["POST"])
 def analyze_and_run():
     uploaded_file = request.files.get("file")
     if not uploaded_file:
-        return jsonify({"error": "missing file upload. send multipart/form-data with a 'file' field."}), 400
+        return missing_file_response()
 
     try:
-        messages = parse_messages_from_upload(uploaded_file)
-        inferred_params, analyzer_debug = infer_parameters(messages)
-        sim_results = run_simulation(build_simulation_args(inferred_params))
-        sim_results["inferred_params"] = inferred_params
-        sim_results["analyzer_debug"] = analyzer_debug
-        sim_results["messages_analyzed"] = len(messages)
-        print(sim_results["report_text"])
-        return jsonify(sim_results)
+        sim_results = run_sync("analyze-run", analysis_job, uploaded_file, lexicon=upload_lexicon())
+    except JobQueueFull as exc:
+        return queue_full_response(exc)
+    except JobTimeout as exc:
+        return job_timeout_response(exc)
     except Exception as exc:
         return jsonify({"error": f"analyzer failed: {exc}"}), 400
+    return result_response(sim_results)
+
+
+@app.route("/analyze-timeline", methods=["POST"])
+def analyze_timeline():
+    uploaded_file = request.files.get("file")
+    if not uploaded_file:
+        return missing_file_response()
+    try:
+        options, workers, backend = timeline_options(request.form)
+        result = run_sync(
+            "analyze-timeline", timeline_job, uploaded_file,
+            lexicon=upload_lexicon(), options=options, workers=workers, backend=backend,
+        )
+    except JobQueueFull as exc:
+        return queue_full_response(exc)
+    except JobTimeout as exc:
+        return job_timeout_response(exc)
+    except Exception as exc:
+        return jsonify({"error": f"analyzer failed: {exc}"}), 400
+    return result_response(result)
+
+
+@app.route("/jobs/run", methods=["POST"])
+def submit_run_job():
+    payload = request.get_json(force=True) or {}
+    try:
+        options = simulation_options(payload)
+        params = build_simulation_args(payload)
+        validate_simulation_params(params)
+        job = job_runner.submit("run", simulation_job, params, options=options)
+    except JobQueueFull as exc:
+        return queue_full_response(exc)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    # The surrogate answers immediately; the job delivers the exact result.
+    return job_accepted_response(job, preview=preview_result(params))
+
+
+@app.route("/preview", methods=["POST"])
+def preview():
+    payload = request.get_json(force=True) or {}
+    result = preview_result(build_simulation_args(payload))
+    if result is None:
+        return jsonify({"error": "preview model not built. run `python qupid_surrogate.py build`."}), 503
+    return result_response(result)
+
+
+@app.route("/jobs/analyze-run", methods=["POST"])
+def submit_analyze_job():
+    uploaded_file = request.files.get("file")
+    if not uploaded_file:
+        return missing_file_response()
+    try:
+        lexicon = upload_lexicon()
+        job = job_runner.submit("analyze-run", analysis_job, spool_upload(uploaded_file), lexicon=lexicon)
+    except JobQueueFull as exc:
+        return queue_full_response(exc)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return job_accepted_response(job)
+
+
+def session_not_found_response(session_id):
+    return jsonify({"error": f"unknown or deleted session {session_id!r}"}), 404
+
+
+@app.route("/sessions", methods=["POST"])
+def create_session():
+    try:
+        session = session_store.create(request.form.get("lang") or None)
+        uploaded_file = request.files.get("file")
+        if uploaded_file:
+            body = run_sync("session-upload", session_create_job, session, uploaded_file)
+        else:
+            session_store.put(session)
+            body = session.to_dict()
+    except JobQueueFull as exc:
+        return queue_full_response(exc)
+    except JobTimeout as exc:
+        return job_timeout_response(exc)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    response = jsonify(body)
+    response.status_code = 201
+    response.headers["Location"] = f"/sessions/{session.id}"
+    return response
+
+
+@app.route("/sessions/<session_id>", methods=["GET"])
+def session_status(session_id):
+    try:
+        session = session_store.get(session_id)
+    except SessionNotFound:
+        return session_not_found_response(session_id)
+    body = session.to_dict()
+    if session.stats.total:
+        body["inferred_params"], body["analyzer_debug"] = session.parameters()
+    return jsonify(body)
+
+
+@app.route("/sessions/<session_id>/messages", methods=["POST"])
+def append_session_messages(session_id):
+    uploaded_file = request.files.get("file")
+    if not uploaded_file:
+        return missing_file_response()
+    try:
+        body = run_sync("session-upload", session_append_job, session_id, uploaded_file)
+    except SessionNotFound:
+        return session_not_found_response(session_id)
+    except JobQueueFull as exc:
+        return queue_full_response(exc)
+    except JobTimeout as exc:
+        return job_timeout_response(exc)
+    except LexiconMismatch as exc:
+        return jsonify({"error": f"{exc}; start a new session"}), 409
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify(body)
+
+
+@app.route("/sessions/<session_id>/run", methods=["POST"])
+def run_session(session_id):
+    try:
+        session = session_store.get(session_id)
+        inferred_params, analyzer_debug = session.parameters()
+        validate_simulation_params(build_simulation_args(inferred_params))
+        sim_results = run_sync(
+            "session-run", session_run_job, inferred_params, analyzer_debug, session.stats.total
+        )
+    except SessionNotFound:
+        return session_not_found_response(session_id)
+    except JobQueueFull as exc:
+        return queue_full_response(exc)
+    except JobTimeout as exc:
+        return job_timeout_response(exc)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    sim_results["session_id"] = session.id
+    return result_response(sim_results)
+
+
+@app.route("/sessions/<session_id>", methods=["DELETE"])
+def delete_session(session_id):
+    try:
+        with session_store.lock(session_id):
+            session_store.delete(session_id)
+    except SessionNotFound:
+        return session_not_found_response(session_id)
+    return "", 204
+
+
+@app.route("/jobs/analyze-timeline", methods=["POST"])
+def submit_timeline_job():
+    uploaded_file = request.files.get("file")
+    if not uploaded_file:
+        return missing_file_response()
+    try:
+        options, workers, backend = timeline_options(request.form)
+        job = job_runner.submit(
+            "analyze-timeline", timeline_job, spool_upload(uploaded_file),
+            lexicon=upload_lexicon(), options=options, workers=workers, backend=backend,
+        )
+    except JobQueueFull as exc:
+        return queue_full_response(exc)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return job_accepted_response(job)
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = job_runner.get(job_id)
+    if job is None:
+        return jsonify({"error": "unknown or expired job id"}), 404
+    data = job.to_dict()
+    if "result" in data:
+        try:
+            data["result"] = encoding.select_fields(data["result"], encoding.parse_fields(request.args.get("fields")))
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+    return encoded_response(data)
+
+
+@app.route("/jobs/<job_id>/events", methods=["GET"])
+def job_events(job_id):
+    job = job_runner.get(job_id)
+    if job is None:
+        return jsonify({"error": "unknown or expired job id"}), 404
+
+    def stream():
+        seen = 0
+        while True:
+            events = job.wait_for_events(seen, timeout=15.0)
+            if not events:
+                # Comment line keeps proxies from closing an idle stream.
+                yield ": keep-alive\n\n"
+                continue
+            seen += len(events)
+            for event in events:
+                yield f"event: stage\ndata: {json.dumps(event)}\n\n"
+            if job.done:
+                yield f"event: {job.status}\ndata: {json.dumps(job.to_dict(include_result=False))}\n\n"
+                return
+
+    return Response(stream(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.route("/sweep", methods=["POST"])
+def sweep():
+    payload = request.get_json(force=True) or {}
+    try:
+        result = run_sync(
+            "sweep", sweep_job,
+            payload.get("base") or {},
+            payload.get("axes") or [],
+            workers=scoring_workers(payload.get("workers")),
+            include_summaries=bool(payload.get("summaries", False)),
+            backend=payload.get("backend", "qutip"),
+        )
+    except JobQueueFull as exc:
+        return queue_full_response(exc)
+    except JobTimeout as exc:
+        return job_timeout_response(exc)
+    except (KeyError, TypeError, ValueError, ZeroDivisionError) as exc:
+        return jsonify({"error": f"invalid sweep: {exc}"}), 400
+    return result_response(result)
+
+
+@app.route("/score", methods=["POST"])
+def score_candidates():
+    payload = request.get_json(force=True) or {}
+    try:
+        candidates = payload.get("candidates") or []
+        backend = payload.get("backend", "steady_state")
+        if backend not in SCORING_BACKENDS:
+            raise ValueError(f"unknown backend '{backend}'; expected one of {SCORING_BACKENDS}")
+        if not candidates:
+            raise ValueError("no candidates")
+        if len(candidates) > max_scoring_points(backend):
+            raise ValueError(f"{len(candidates)} candidates; the limit is {max_scoring_points(backend)}")
+        include_summaries = bool(payload.get("summaries", False))
+        scores, summaries, n_groups, workers = run_sync(
+            "score", score_job,
+            [build_simulation_args(candidate) for candidate in candidates],
+            workers=scoring_workers(payload.get("workers")),
+            include_summaries=include_summaries, backend=backend,
+        )
+    except JobQueueFull as exc:
+        return queue_full_response(exc)
+    except JobTimeout as exc:
+        return job_timeout_response(exc)
+    except (KeyError, TypeError, ValueError) as exc:
+        return jsonify({"error": f"invalid candidates: {exc}"}), 400
+    result = {
+        "scores": [round(float(score), 3) for score in scores],
+        # Candidate indices, best score first.
+        "ranking": sorted(range(len(candidates)), key=lambda i: -scores[i]),
+        "points": len(candidates),
+        "hamiltonian_groups": n_groups,
+        "workers": workers,
+        "backend": backend,
+    }
+    if include_summaries:
+        result["summaries"] = summaries
+    return result_response(result)
+
+
+@app.route("/plots/<plot_id>.png", methods=["GET"])
+def plot_image(plot_id):
+    png = plot_png(plot_id)
+    if png is None:
+        return jsonify({"error": "unknown or expired plot id"}), 404
+    # Plot ids are content hashes, so a given URL always serves the same image.
+    return Response(png, mimetype="image/png", headers={"Cache-Control": "public, max-age=86400, immutable"})
+
+
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    # Load balancers should only route here once the warm-up has run.
+    return jsonify(startup), 200 if startup["status"] == "ready" else 503
+
+
+@app.route("/cache-stats", methods=["GET"])
+def cache_stats():
+    return jsonify({
+        "results": result_cache_stats(),
+        "floquet": floquet_cache_stats(),
+        "plots": plot_cache_stats(),
+        "jobs": job_runner.stats(),
+        "static": static_assets.stats(),
+    })
+
+
+def worker_metric_samples():
+    """This worker's cache and job metrics as (name, kind, help, samples)."""
+    caches = {"results": result_cache_stats(), "floquet": floquet_cache_stats()}
+    caches.update({f"plots_{name}": stats for name, stats in plot_cache_stats().items()})
+    jobs = job_runner.stats()
+    families = []
+    for field, kind, help_text in (
+        ("hits", "counter", "Cache hits in memory."),
+        ("disk_hits", "counter", "Cache hits on the disk tier."),
+        ("misses", "counter", "Cache misses."),
+        ("hit_rate", "gauge", "Share of lookups that hit."),
+        ("entries", "gauge", "Entries held in memory."),
+        ("bytes", "gauge", "Bytes held in memory."),
+    ):
+        name = f"qupid_cache_{field}_total" if kind == "counter" else f"qupid_cache_{field}"
+        families.append((name, kind, help_text, [({"cache": cache}, stats[field]) for cache, stats in caches.items()]))
+    families.append((
+        "qupid_jobs", "gauge", "Jobs by state.", [({"state": state}, jobs[state]) for state in ("queued", "running")],
+    ))
+    return families
+
+
+if telemetry.ENABLED:
+    telemetry.worker_samples = worker_metric_samples
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    if not telemetry.ENABLED:
+        return jsonify({"error": "telemetry is disabled (QUPID_TELEMETRY=0)"}), 404
+    lines = telemetry.render_metrics(worker_metric_samples())
+    return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
 
 
 @app.route("/", defaults={"path": ""})
 @app.route("/<path:path>")
 def serve_react(path):
-    target = os.path.join(FRONTEND_DIST, path)
-    if path and os.path.exists(target):
-        return send_from_directory(FRONTEND_DIST, path)
-    return send_from_directory(FRONTEND_DIST, "index.html")
+    asset = static_assets.get(path)
+    if asset is None and not path.startswith("assets/"):
+        # Client-side routes load the app; a missing hashed asset must not
+        # come back as HTML.
+        asset = static_assets.get("index.html")
+    if asset is None:
+        abort(404)
+    return static_assets.response(asset, request)
 
 
 if __name__ == "__main__":
+    # Development server only; production runs gunicorn with
+    # backend/gunicorn.conf.py (see start.sh).
     port = int(os.environ.get("PORT", 5000))
-    app.run(host="0.0.0.0", port=port, debug=True)
+    app.run(host="0.0.0.0", port=port, debug=os.environ.get("QUPID_DEBUG", "1") == "1")
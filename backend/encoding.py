@@ -0,0 +1,162 @@
+"""
+Response encodings for simulation results.
+
+Clients choose what they download:
+
+  fields         ?fields=health_score,trajectory keeps only those top-level
+                 keys of a result (unknown names are a 400)
+  MessagePack    Accept: application/msgpack (or application/x-msgpack)
+                 gets the same structure as MessagePack, with float lists of
+                 FLOAT32_MIN_ITEMS or more (the trajectories) packed as
+                 float32: 5 bytes per sample instead of about 19 in JSON
+  compression    JSON and MessagePack bodies of COMPRESS_MIN_BYTES or more
+                 are sent with Content-Encoding br (when the brotli package
+                 is installed) or gzip, whichever Accept-Encoding prefers
+
+The MessagePack encoder covers what results contain (dicts, lists, str,
+bytes, bool, None, ints, floats and NumPy scalars and arrays), so no
+extra package is needed for it.
+"""
+import gzip
+import os
+import struct
+
+import numpy as np
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MSGPACK_MIMETYPES = ("application/msgpack", "application/x-msgpack")
+COMPRESS_MIN_BYTES = int(os.environ.get("QUPID_COMPRESS_MIN_BYTES", 1024))
+COMPRESSIBLE_MIMETYPES = ("application/json",) + MSGPACK_MIMETYPES
+# Fast levels: responses are compressed once per request, on the request thread.
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+FLOAT32_MIN_ITEMS = 8
+
+
+def parse_fields(text):
+    """Field names from a "a,b,c" query value; None means everything."""
+    if not text:
+        return None
+    return [name.strip() for name in text.split(",") if name.strip()] or None
+
+
+def select_fields(result, fields):
+    if fields is None:
+        return result
+    unknown = [name for name in fields if name not in result]
+    if unknown:
+        raise ValueError(f"unknown fields {unknown}; available: {sorted(result)}")
+    return {name: result[name] for name in fields}
+
+
+def wants_msgpack(accept_mimetypes):
+    # Only an explicit preference switches format; */* stays JSON.
+    best = accept_mimetypes.best_match(("application/json",) + MSGPACK_MIMETYPES)
+    return best in MSGPACK_MIMETYPES
+
+
+def choose_encoding(accept_encodings):
+    """The Content-Encoding to use, or None for identity."""
+    candidates = [("gzip", accept_encodings["gzip"])]
+    if brotli is not None:
+        # Listed first so it wins ties.
+        candidates.insert(0, ("br", accept_encodings["br"]))
+    encoding, quality = max(candidates, key=lambda candidate: candidate[1])
+    return encoding if quality > 0 else None
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def packb(obj):
+    """MessagePack bytes for `obj`."""
+    out = bytearray()
+    _pack(obj, out)
+    return bytes(out)
+
+
+def _pack(obj, out):
+    if obj is None:
+        out.append(0xC0)
+    elif obj is True or obj is False:
+        out.append(0xC3 if obj else 0xC2)
+    elif isinstance(obj, (int, np.integer)):
+        _pack_int(int(obj), out)
+    elif isinstance(obj, (float, np.floating)):
+        out += struct.pack(">Bd", 0xCB, float(obj))
+    elif isinstance(obj, str):
+        data = obj.encode("utf-8")
+        _pack_header(len(data), out, fix=(0xA0, 32), sizes=((0xD9, ">B"), (0xDA, ">H"), (0xDB, ">I")))
+        out += data
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        data = bytes(obj)
+        _pack_header(len(data), out, sizes=((0xC4, ">B"), (0xC5, ">H"), (0xC6, ">I")))
+        out += data
+    elif isinstance(obj, dict):
+        _pack_header(len(obj), out, fix=(0x80, 16), sizes=((0xDE, ">H"), (0xDF, ">I")))
+        for key, value in obj.items():
+            _pack(key, out)
+            _pack(value, out)
+    elif isinstance(obj, (list, tuple, np.ndarray)):
+        if _is_float_array(obj):
+            _pack_float32(obj, out)
+            return
+        _pack_header(len(obj), out, fix=(0x90, 16), sizes=((0xDC, ">H"), (0xDD, ">I")))
+        for item in obj:
+            _pack(item, out)
+    else:
+        raise TypeError(f"cannot encode {type(obj).__name__} as MessagePack")
+
+
+def _pack_header(length, out, sizes, fix=None):
+    if fix is not None and length < fix[1]:
+        out.append(fix[0] | length)
+        return
+    for marker, fmt in sizes:
+        if length < 1 << (8 * struct.calcsize(fmt)):
+            out += struct.pack(">B", marker) + struct.pack(fmt, length)
+            return
+    raise ValueError(f"{length} items is too many for MessagePack")
+
+
+def _pack_int(value, out):
+    if 0 <= value < 128:
+        out.append(value)
+    elif -32 <= value < 0:
+        out.append(value & 0xFF)
+    elif 0 <= value < 1 << 64:
+        for marker, fmt in ((0xCC, ">B"), (0xCD, ">H"), (0xCE, ">I"), (0xCF, ">Q")):
+            if value < 1 << (8 * struct.calcsize(fmt)):
+                out += struct.pack(">B", marker) + struct.pack(fmt, value)
+                return
+    elif -(1 << 63) <= value < 0:
+        for marker, fmt in ((0xD0, ">b"), (0xD1, ">h"), (0xD2, ">i"), (0xD3, ">q")):
+            if value >= -(1 << (8 * struct.calcsize(fmt) - 1)):
+                out += struct.pack(">B", marker) + struct.pack(fmt, value)
+                return
+    else:
+        raise ValueError(f"{value} does not fit a MessagePack integer")
+
+
+def _is_float_array(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.ndim == 1 and obj.dtype.kind == "f" and obj.size >= FLOAT32_MIN_ITEMS
+    return len(obj) >= FLOAT32_MIN_ITEMS and all(type(item) is float for item in obj)
+
+
+def _pack_float32(values, out):
+    # Each element is a 0xca marker followed by a big-endian float32; the
+    # record array writes them all in one go.
+    values = np.asarray(values, dtype=np.float64)
+    _pack_header(len(values), out, fix=(0x90, 16), sizes=((0xDC, ">H"), (0xDD, ">I")))
+    items = np.empty(len(values), dtype=[("marker", "u1"), ("value", ">f4")])
+    items["marker"] = 0xCA
+    items["value"] = values
+    out += items.tobytes()
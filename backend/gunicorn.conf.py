@@ -0,0 +1,93 @@
+"""
+Production server settings: gunicorn -c backend/gunicorn.conf.py backend.app:app
+
+The master imports the app once (preload_app), which imports qutip, scipy
+and matplotlib and, with QUPID_WARMUP=sync, runs the warm-up simulations
+before any worker exists. Workers are forked from it and share those pages
+copy-on-write, so a new or recycled worker is ready immediately.
+
+Each worker runs at most QUPID_JOB_WORKERS simulations at once (default 1:
+they are CPU-bound and there is one worker per core) with
+QUPID_JOB_QUEUE more waiting; past that, simulation, sweep, scoring and
+session upload endpoints answer 503 with Retry-After right away. Sweeps
+and scoring stay in their worker's process (QUPID_SWEEP_WORKERS=1), and
+so does the analysis of large uploads (QUPID_ANALYSIS_WORKERS=1). The
+extra threads per worker keep /healthz, /metrics, job polling and static
+files responsive while simulations run.
+Jobs write their state to QUPID_JOB_DIR, so /jobs/<id> answers from
+whichever worker the poll reaches, and workers publish their metrics to
+QUPID_METRICS_DIR, so /metrics reports all of them (see backend.telemetry).
+
+Workers are recycled gracefully after QUPID_MAX_REQUESTS requests (with
+jitter, so they do not all restart together) or once their resident memory
+passes QUPID_WORKER_MAX_RSS_MB; in-flight requests finish first.
+"""
+import multiprocessing
+import os
+import resource
+import sys
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from qupid_cache import data_path
+
+# Read by backend.app at import, which preload_app does in the master.
+os.environ.setdefault("QUPID_WARMUP", "sync")
+os.environ.setdefault("QUPID_JOB_WORKERS", "1")
+os.environ.setdefault("QUPID_JOB_QUEUE", "2")
+# A sweep's or an upload analysis' own process pool would multiply the
+# per-core worker count, and would be forked from a threaded worker.
+os.environ.setdefault("QUPID_SWEEP_WORKERS", "1")
+os.environ.setdefault("QUPID_ANALYSIS_WORKERS", "1")
+# Job polls land on any worker, so job state goes where all of them can read it.
+os.environ.setdefault("QUPID_JOB_DIR", data_path("jobs"))
+# Scrapes also land on any worker; each publishes its metrics here and
+# /metrics reports all of them.
+os.environ.setdefault("QUPID_METRICS_DIR", data_path("metrics"))
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+preload_app = True
+workers = int(os.environ.get("QUPID_WEB_WORKERS", 0)) or multiprocessing.cpu_count()
+worker_class = "gthread"
+threads = int(os.environ.get("QUPID_WEB_THREADS", 8))
+# Connections waiting for a thread; beyond this the kernel refuses them.
+backlog = int(os.environ.get("QUPID_WEB_BACKLOG", 256))
+# Long uploads and 1000-period runs are legitimate; stuck workers are not.
+timeout = int(os.environ.get("QUPID_WEB_TIMEOUT", 300))
+graceful_timeout = int(os.environ.get("QUPID_WEB_GRACEFUL_TIMEOUT", 60))
+keepalive = 5
+max_requests = int(os.environ.get("QUPID_MAX_REQUESTS", 2000))
+max_requests_jitter = max_requests // 10
+MAX_RSS_MB = int(os.environ.get("QUPID_WORKER_MAX_RSS_MB", 0))
+accesslog = os.environ.get("QUPID_ACCESS_LOG") or None
+errorlog = "-"
+
+
+def on_starting(server):
+    from backend import telemetry
+
+    telemetry.clear_metrics_dir()
+
+
+def worker_exit(server, worker):
+    # Publish the last counts before the master retires this worker's file.
+    from backend import telemetry
+
+    if telemetry.ENABLED and telemetry.METRICS_DIR:
+        telemetry.flush_metrics()
+
+
+def child_exit(server, worker):
+    from backend import telemetry
+
+    telemetry.retire_worker(worker.pid)
+
+
+def post_request(worker, req, environ, resp):
+    # ru_maxrss is in kilobytes on Linux. Clearing `alive` makes the worker
+    # finish its current requests and exit; the master forks a fresh one.
+    if MAX_RSS_MB and resource.getrusage(resource.RUSAGE_SELF).ru_maxrss > MAX_RSS_MB * 1024:
+        worker.log.info("worker %s over %s MB resident; recycling", worker.pid, MAX_RSS_MB)
+        worker.alive = False
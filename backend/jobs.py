@@ -0,0 +1,318 @@
+import os
+import pickle
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from qupid_cache import private_dir
+
+
+class JobQueueFull(Exception):
+    """Raised when the runner already holds its maximum of pending jobs."""
+
+
+class JobTimeout(Exception):
+    """
+    Raised by run_job when the job is still unfinished at the runner's
+    sync_timeout. The job keeps running and can still be polled.
+    """
+
+    def __init__(self, job, timeout):
+        super().__init__(f"job {job.id} still running after {timeout:g} s")
+        self.job = job
+
+
+class Job:
+    def __init__(self, kind):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "queued"
+        self.stage = "queued"
+        self.events = [{"stage": "queued", "at": time.time()}]
+        self.result = None
+        self.error = None
+        self.exception = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.path = None
+        self._cond = threading.Condition()
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed")
+
+    def report(self, stage):
+        with self._cond:
+            self.stage = stage
+            self.events.append({"stage": stage, "at": time.time()})
+            self._cond.notify_all()
+        self._save()
+
+    def _finish(self, status, result=None, error=None):
+        with self._cond:
+            self.status = status
+            self.stage = status
+            self.result = result
+            self.error = error
+            self.finished_at = time.time()
+            self.events.append({"stage": status, "at": self.finished_at})
+            self._cond.notify_all()
+        self._save()
+
+    def _save(self):
+        # Snapshot for other worker processes polling this job (see StoredJob).
+        if self.path is None:
+            return
+        with self._cond:
+            snapshot = self.to_dict()
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as handle:
+                pickle.dump(snapshot, handle, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # The job still completes in this process; only remote polling suffers.
+            pass
+
+    def wait(self, timeout=None):
+        with self._cond:
+            self._cond.wait_for(lambda: self.done, timeout=timeout)
+        return self.done
+
+    def wait_for_events(self, seen, timeout=None):
+        """
+        Blocks until there are more than `seen` events (or the timeout
+        passes) and returns the new ones.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: len(self.events) > seen, timeout=timeout)
+            return list(self.events[seen:])
+
+    def outcome(self):
+        """
+        The result of a finished job; re-raises its failure, so a synchronous
+        endpoint maps it like an inline call (RuntimeError if only the
+        message is known).
+        """
+        if self.status == "failed":
+            if self.exception is not None:
+                raise self.exception
+            raise RuntimeError(self.error)
+        return self.result
+
+    def to_dict(self, include_result=True):
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.stage,
+            "events": list(self.events),
+        }
+        if self.error is not None:
+            data["error"] = self.error
+        if include_result and self.status == "done":
+            data["result"] = self.result
+        return data
+
+
+class StoredJob:
+    """
+    Read-only view of a job held by another process, rebuilt from the
+    snapshot it writes on every event.
+    """
+
+    POLL_SECONDS = 0.25
+
+    def __init__(self, path):
+        self.path = path
+        self._load()
+
+    def _load(self):
+        with open(self.path, "rb") as handle:
+            self._data = pickle.load(handle)
+        self.id = self._data["job_id"]
+        self.kind = self._data["kind"]
+        self.status = self._data["status"]
+        self.stage = self._data["stage"]
+        self.events = self._data["events"]
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed")
+
+    def wait_for_events(self, seen, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while len(self.events) <= seen and not self.done:
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            time.sleep(self.POLL_SECONDS)
+            try:
+                self._load()
+            except (OSError, EOFError, pickle.UnpicklingError):
+                break
+        return list(self.events[seen:])
+
+    def to_dict(self, include_result=True):
+        data = dict(self._data)
+        if not include_result:
+            data.pop("result", None)
+        return data
+
+
+class JobRunner:
+    """
+    Bounded pool for simulation work. At most `max_workers` jobs run at once
+    and at most `max_queue` more wait; beyond that submit() raises
+    JobQueueFull so callers can push back instead of piling up requests.
+    Finished jobs are kept for `ttl` seconds so their results can be fetched.
+    Each callable in `observers` is called with every job once it finishes.
+    run_job() waits at most `sync_timeout` seconds (None: no limit).
+
+    With a `job_dir`, every job also writes its state there, so any process
+    sharing the directory (the workers of a pre-forking server) can report
+    on it through get().
+    """
+
+    def __init__(self, max_workers=2, max_queue=16, ttl=600.0, max_jobs=1000, job_dir=None,
+                 sync_timeout=None):
+        self.observers = []
+        self.sync_timeout = sync_timeout or None
+        self.job_dir = job_dir or None
+        if self.job_dir:
+            private_dir(self.job_dir)
+        self._swept_at = 0.0
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self._start()
+        os.register_at_fork(after_in_child=self._start)
+
+    def _start(self):
+        # A forked child inherits the pool but not its threads, and the
+        # parent's jobs are not its to run; it starts afresh.
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="qupid-job")
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _prune(self):
+        now = time.time()
+        for job_id in list(self._jobs):
+            job = self._jobs[job_id]
+            expired = job.done and now - job.finished_at > self.ttl
+            if expired or (job.done and len(self._jobs) > self.max_jobs):
+                del self._jobs[job_id]
+                self._remove(job.path)
+        if self.job_dir and now - self._swept_at > self.ttl:
+            # Also clears files left behind by processes that have exited.
+            self._swept_at = now
+            for entry in os.scandir(self.job_dir):
+                try:
+                    if now - entry.stat().st_mtime > self.ttl:
+                        self._remove(entry.path)
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _remove(path):
+        if path is None:
+            return
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _file(self, job_id):
+        if not job_id.isalnum():
+            return None
+        return os.path.join(self.job_dir, f"{job_id}.job")
+
+    def _run(self, job, fn, args, kwargs):
+        try:
+            job.status = "running"
+            job.report("running")
+            result = fn(*args, progress=job.report, **kwargs)
+        except Exception as exc:
+            # Without its traceback, so a kept job does not pin the frames.
+            job.exception = exc.with_traceback(None)
+            job._finish("failed", error=str(exc))
+        else:
+            job._finish("done", result=result)
+        finally:
+            self._slots.release()
+        for observer in self.observers:
+            try:
+                observer(job)
+            except Exception:
+                # Instrumentation must never fail a job.
+                pass
+
+    def submit(self, kind, fn, *args, **kwargs):
+        """
+        Queues fn(*args, progress=<callback>, **kwargs) and returns its Job.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise JobQueueFull(f"{self.max_workers + self.max_queue} jobs already pending")
+        job = Job(kind)
+        if self.job_dir:
+            job.path = self._file(job.id)
+            job._save()
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def run_job(self, kind, fn, *args, **kwargs):
+        """
+        Submits a job and blocks until it finishes, so synchronous endpoints
+        share the same concurrency limit. Returns the finished Job; raises
+        JobTimeout if it is still running after sync_timeout seconds.
+        """
+        job = self.submit(kind, fn, *args, **kwargs)
+        if not job.wait(self.sync_timeout):
+            raise JobTimeout(job, self.sync_timeout)
+        return job
+
+    def run_sync(self, kind, fn, *args, **kwargs):
+        """run_job, returning the result and re-raising the job's failure."""
+        return self.run_job(kind, fn, *args, **kwargs).outcome()
+
+    def get(self, job_id):
+        """The Job, a StoredJob when another process holds it, or None."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None or not self.job_dir:
+            return job
+        path = self._file(job_id)
+        if path is None:
+            return None
+        try:
+            return StoredJob(path)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def stats(self):
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "queued": statuses.count("queued"),
+            "running": statuses.count("running"),
+            "retained": len(statuses),
+        }
+
+
+def runner_from_env():
+    return JobRunner(
+        max_workers=int(os.environ.get("QUPID_JOB_WORKERS", min(4, os.cpu_count() or 1))),
+        max_queue=int(os.environ.get("QUPID_JOB_QUEUE", 16)),
+        ttl=float(os.environ.get("QUPID_JOB_TTL", 600)),
+        job_dir=os.environ.get("QUPID_JOB_DIR"),
+        sync_timeout=float(os.environ.get("QUPID_SYNC_TIMEOUT", 300)),
+    )
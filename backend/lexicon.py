@@ -0,0 +1,311 @@
+"""
+Compiled lexicons for message scoring.
+
+A lexicon file maps words and multi-word phrases to a category and a
+weight, and lists negators, one entry per line:
+
+    # category<TAB>phrase[<TAB>weight]
+    positive	love
+    positive	proud of you	1.5
+    negator	not
+
+Phrases are tokenized like messages, so they match on word boundaries.
+Compilation builds an Aho-Corasick automaton over tokens: a message is
+scored in one pass over its tokens, whatever the number of entries.
+Compiled lexicons are pickled into a disk cache keyed by the file content,
+so worker start-up does not rebuild them.
+"""
+import hashlib
+import operator
+import os
+import re
+import threading
+from collections import deque
+
+import numpy as np
+
+from qupid_cache import PickleDirStore, data_path
+
+# Bump when the compiled layout changes; older cache entries are then ignored.
+LEXICON_FORMAT = 1
+# Runs of letters and apostrophes, so "can't" and "i'm" stay one token. The
+# class lists Latin, Greek and Cyrillic letters explicitly: a generic
+# "letter" class ([^\W\d_]) makes tokenizing three times slower.
+TOKEN_RE = re.compile(r"[a-zA-Z'\u00c0-\u00d6\u00d8-\u00f6\u00f8-\u024f\u0370-\u03ff\u0400-\u04ff]+")
+# A negator flips the polarity of matches starting within this many tokens.
+NEGATION_WINDOW = 3
+NEGATION_FLIPS = {"positive": "negative", "negative": "positive"}
+NEGATOR = "negator"
+
+BUILTIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lexicons")
+LEXICON_DIRS = tuple(
+    path for path in os.environ.get("QUPID_LEXICON_PATH", "").split(os.pathsep) if path
+) + (BUILTIN_DIR,)
+DEFAULT_LANGUAGE = os.environ.get("QUPID_LEXICON_LANG", "en")
+_cache_dir = os.environ.get("QUPID_LEXICON_CACHE_DIR", data_path("lexicons"))
+_disk_store = PickleDirStore(_cache_dir) if _cache_dir else None
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or "").lower())
+
+
+class Lexicon:
+    """
+    A compiled lexicon: a token-level Aho-Corasick automaton. `root` holds
+    the transitions out of the start state and `delta[state]` every other
+    transition of `state`, failure links already folded in, so a step is
+    at most two dict lookups. The entries ending in each state (failure
+    chain included) are stored as flat arrays indexed through `out_ptr`:
+    category index, weight and phrase length in tokens.
+    """
+
+    def __init__(self, name, categories, root, delta, outputs, negators, entries, digest):
+        self.name = name
+        self.categories = categories
+        self.root = root
+        self.delta = delta
+        self.out_ptr, self.out_category, self.out_weight, self.out_length = outputs
+        self.negators = negators
+        self.entries = entries
+        self.digest = digest
+        self.flips = np.array([
+            categories.index(NEGATION_FLIPS[c]) if NEGATION_FLIPS.get(c) in categories else i
+            for i, c in enumerate(categories)
+        ], dtype=np.int64)
+        # Tokens that take the automaton out of the start state.
+        self.vocabulary = frozenset(root).union(*delta)
+
+    def __getstate__(self):
+        outputs = (self.out_ptr, self.out_category, self.out_weight, self.out_length)
+        return (self.name, self.categories, self.root, self.delta, outputs, self.negators, self.entries, self.digest)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def category_index(self, category):
+        return self.categories.index(category) if category in self.categories else None
+
+    def _walk(self, tokens):
+        root = self.root.get
+        delta = self.delta
+        state = 0
+        for token in tokens:
+            state = delta[state].get(token) or root(token, 0)
+            yield state
+
+    def score_batch(self, token_lists):
+        """
+        Weighted hits per category for many tokenized messages, as an array
+        of shape (len(token_lists), len(categories)). Every entry match
+        counts, overlapping ones too; a match starting within
+        NEGATION_WINDOW tokens after a negator in the same message is
+        credited to the opposite polarity.
+
+        All messages are walked through the automaton in one pass, separated
+        by an empty token that resets it; the matches are then tallied with
+        array operations, so the Python loop costs one step per token no
+        matter how many entries match.
+        """
+        n = len(token_lists)
+        flat = [""]
+        for tokens in token_lists:
+            flat.extend(tokens)
+            flat.append("")
+        # Only tokens in the vocabulary (plus one reset token per gap) are
+        # walked; every other position is in the start state.
+        in_vocabulary = np.fromiter(map(self.vocabulary.__contains__, flat), dtype=bool, count=len(flat))
+        walked = np.flatnonzero(in_vocabulary | np.concatenate([[True], in_vocabulary[:-1]]))
+        states = np.zeros(len(flat), dtype=np.int64)
+        if len(walked) > 1:
+            states[walked] = np.fromiter(
+                self._walk(operator.itemgetter(*walked)(flat)), dtype=np.int64, count=len(walked)
+            )
+        lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=n)
+        # Message index and first position of every flat position.
+        message = np.repeat(np.arange(-1, n), np.concatenate([[1], lengths + 1]))
+        first = np.repeat(np.cumsum(np.concatenate([[1], lengths + 1]))[:-1], lengths + 1)
+        first = np.concatenate([[1], first])
+
+        # Position of the latest negator at or before each position (0 if none).
+        is_negator = np.fromiter(map(self.negators.__contains__, flat), dtype=bool, count=len(flat))
+        last_negator = np.maximum.accumulate(np.where(is_negator, np.arange(len(flat)), 0))
+
+        # One row per (position, entry ending there).
+        counts = np.diff(self.out_ptr)[states]
+        positions = np.repeat(np.arange(len(flat)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        rows = np.repeat(self.out_ptr[states], counts) + offsets
+        category = self.out_category[rows]
+        start = positions - self.out_length[rows] + 1
+        negator = last_negator[start - 1]
+        negated = (negator >= first[positions]) & (start - negator <= NEGATION_WINDOW)
+        category = np.where(negated, self.flips[category], category)
+        # bincount adds weights in match order, as a per-message loop would.
+        totals = np.bincount(
+            message[positions] * len(self.categories) + category,
+            weights=self.out_weight[rows],
+            minlength=n * len(self.categories),
+        )
+        return totals.reshape(n, len(self.categories))
+
+    def score_tokens(self, tokens):
+        return self.score_batch([tokens])[0]
+
+    def score(self, text):
+        return self.score_tokens(tokenize(text))
+
+    def info(self):
+        return {
+            "name": self.name,
+            "categories": list(self.categories),
+            "entries": self.entries,
+            "states": len(self.delta),
+            "negators": len(self.negators),
+            "digest": self.digest,
+        }
+
+
+def parse_lexicon(lines, source="<lexicon>"):
+    """
+    (category, phrase tokens, weight) entries and the negator set from the
+    lines of a lexicon file. Raises ValueError naming the bad line.
+    """
+    entries = []
+    negators = set()
+    for number, line in enumerate(lines, 1):
+        line = line.rstrip("\r\n")
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        fields = line.split("\t")
+        if len(fields) not in (2, 3):
+            raise ValueError(f"{source}:{number}: expected category<TAB>phrase[<TAB>weight]")
+        category, phrase = fields[0].strip().lower(), fields[1]
+        tokens = tuple(tokenize(phrase))
+        if not category or not tokens:
+            raise ValueError(f"{source}:{number}: empty category or phrase")
+        if category == NEGATOR:
+            if len(tokens) != 1:
+                raise ValueError(f"{source}:{number}: negators must be single words")
+            negators.add(tokens[0])
+            continue
+        try:
+            weight = float(fields[2]) if len(fields) == 3 else 1.0
+        except ValueError:
+            raise ValueError(f"{source}:{number}: weight {fields[2]!r} is not a number") from None
+        entries.append((category, tokens, weight))
+    return entries, negators
+
+
+def compile_lexicon(entries, negators=(), name="custom", digest=None):
+    """
+    Builds the token automaton for (category, tokens, weight) entries. A
+    phrase listed twice in one category keeps its last weight.
+    """
+    categories = []
+    goto = [{}]
+    terminal = [{}]
+    for category, tokens, weight in entries:
+        if category not in categories:
+            categories.append(category)
+        state = 0
+        for token in tokens:
+            next_state = goto[state].get(token)
+            if next_state is None:
+                next_state = goto[state][token] = len(goto)
+                goto.append({})
+                terminal.append({})
+            state = next_state
+        terminal[state][categories.index(category)] = (weight, len(tokens))
+
+    # Breadth-first, so a state's failure target is finished before it.
+    fail = [0] * len(goto)
+    delta = [{} for _ in goto]
+    outputs = [()] * len(goto)
+    queue = deque(goto[0].values())
+    while queue:
+        state = queue.popleft()
+        own = tuple((category, weight, length) for category, (weight, length) in terminal[state].items())
+        outputs[state] = own + outputs[fail[state]]
+        # Transitions back to the root's children are left to the root lookup.
+        delta[state] = dict(delta[fail[state]]) if fail[state] else {}
+        delta[state].update(goto[state])
+        for token, child in goto[state].items():
+            target = fail[state]
+            while target and token not in goto[target]:
+                target = fail[target]
+            fail[child] = goto[target].get(token, 0)
+            queue.append(child)
+
+    flat = [entry for out in outputs for entry in out]
+    out_ptr = np.cumsum([0] + [len(out) for out in outputs])
+    packed = (
+        out_ptr.astype(np.int64),
+        np.array([category for category, _, _ in flat], dtype=np.int64),
+        np.array([weight for _, weight, _ in flat], dtype=np.float64),
+        np.array([length for _, _, length in flat], dtype=np.int64),
+    )
+    return Lexicon(
+        name, tuple(categories), goto[0], delta, packed, frozenset(negators),
+        sum(len(own) for own in terminal), digest,
+    )
+
+
+def lexicon_path(language):
+    """
+    Path of the lexicon file for `language`, searching QUPID_LEXICON_PATH
+    before the built-in directory. Raises ValueError for unknown languages.
+    """
+    if not re.fullmatch(r"[A-Za-z][A-Za-z0-9_-]*", language or ""):
+        raise ValueError(f"invalid lexicon language {language!r}")
+    for directory in LEXICON_DIRS:
+        path = os.path.join(directory, f"{language}.tsv")
+        if os.path.isfile(path):
+            return path
+    raise ValueError(f"no lexicon for language {language!r}; available: {', '.join(available_languages())}")
+
+
+def available_languages():
+    languages = set()
+    for directory in LEXICON_DIRS:
+        if os.path.isdir(directory):
+            languages.update(name[:-4] for name in os.listdir(directory) if name.endswith(".tsv"))
+    return sorted(languages)
+
+
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def load_lexicon(language=None):
+    """
+    The compiled lexicon for `language` (default QUPID_LEXICON_LANG). Held
+    in memory per file version; on a miss the compiled form is read from the
+    disk cache (QUPID_LEXICON_CACHE_DIR, empty to disable) by content
+    digest, and only compiled when the file is new or changed.
+    """
+    path = lexicon_path(language or DEFAULT_LANGUAGE)
+    stat = os.stat(path)
+    memo_key = (path, stat.st_mtime_ns, stat.st_size)
+    lexicon = _loaded.get(memo_key)
+    if lexicon is not None:
+        return lexicon
+    with _loaded_lock:
+        lexicon = _loaded.get(memo_key)
+        if lexicon is not None:
+            return lexicon
+        with open(path, "rb") as handle:
+            raw = handle.read()
+        digest = hashlib.sha256(raw).hexdigest()
+        name = os.path.splitext(os.path.basename(path))[0]
+        store_key = ("lexicon", LEXICON_FORMAT, name, digest)
+        lexicon = _disk_store.get(store_key) if _disk_store is not None else None
+        if lexicon is None:
+            entries, negators = parse_lexicon(raw.decode("utf-8").splitlines(), source=path)
+            lexicon = compile_lexicon(entries, negators, name=name, digest=digest)
+            if _disk_store is not None:
+                _disk_store.put(store_key, lexicon)
+        for stale in [key for key in _loaded if key[0] == path]:
+            del _loaded[stale]
+        _loaded[memo_key] = lexicon
+        return lexicon
@@ -1,24 +1,74 @@
+import bisect
 import csv
 import io
+import itertools
 import json
 import math
-import re
-from collections import defaultdict
-from datetime import datetime
+import operator
+import os
+import sys
+from array import array
 
+import numpy as np
 
-POSITIVE_WORDS = {
-    "love", "great", "good", "amazing", "happy", "glad", "excited", "thanks", "thank",
-    "appreciate", "proud", "care", "caring", "sweet", "kind", "fun", "wonderful", "yes",
-}
-NEGATIVE_WORDS = {
-    "angry", "mad", "upset", "sad", "hurt", "annoyed", "frustrated", "bad", "hate",
-    "tired", "drained", "stressed", "anxious", "worried", "no", "never", "can't", "cant",
-}
-EMPATHY_WORDS = {
-    "sorry", "understand", "hear you", "i hear", "you okay", "you ok", "here for you",
-    "that makes sense", "proud of you", "i'm here", "im here",
-}
+from backend.lexicon import TOKEN_RE, load_lexicon
+from backend.timestamps import TimestampColumn, datetime_micros, micros_datetime
+
+
+# Upload limits; exceeding either rejects the upload with UploadLimitError.
+MAX_UPLOAD_BYTES = int(os.environ.get("QUPID_UPLOAD_MAX_BYTES", 512 * 1024 * 1024))
+MAX_UPLOAD_MESSAGES = int(os.environ.get("QUPID_UPLOAD_MAX_MESSAGES", 2_000_000))
+# Uploads are decoded in chunks of this many bytes.
+STREAM_CHUNK_BYTES = 64 * 1024
+# Rows whose timestamps are parsed together in one bulk call.
+TIMESTAMP_BLOCK_ROWS = 4096
+# Uploads of at least this many messages are analyzed in contiguous chunks of
+# ANALYSIS_CHUNK_MESSAGES on a pool of QUPID_ANALYSIS_WORKERS processes
+# (default: one per core; 1 keeps analysis in-process).
+PARALLEL_MIN_MESSAGES = int(os.environ.get("QUPID_ANALYSIS_PARALLEL_MIN", 200_000))
+ANALYSIS_CHUNK_MESSAGES = 50_000
+ANALYSIS_WORKERS = int(os.environ.get("QUPID_ANALYSIS_WORKERS", 0)) or os.cpu_count() or 1
+# Largest single JSON value (one message, or a skipped top-level field) the
+# streaming parser will buffer.
+MAX_JSON_VALUE_CHARS = 1024 * 1024
+
+
+class UploadLimitError(ValueError):
+    """Raised as soon as an upload exceeds MAX_UPLOAD_BYTES or MAX_UPLOAD_MESSAGES."""
+
+
+class Message:
+    """
+    One chat message. Slots keep multi-million message exports compact;
+    item access (m["text"], m.get("timestamp")) works as with plain dicts.
+    The time is stored as integer microseconds since the epoch plus the
+    original tzinfo; `timestamp` rebuilds the datetime on access.
+    """
+
+    __slots__ = ("sender", "text", "timestamp_us", "tzinfo")
+
+    def __init__(self, sender, text, timestamp=None, timestamp_us=None, tzinfo=None):
+        self.sender = sender
+        self.text = text
+        if timestamp is not None:
+            timestamp_us, tzinfo = datetime_micros(timestamp)
+        self.timestamp_us = timestamp_us
+        self.tzinfo = tzinfo
+
+    @property
+    def timestamp(self):
+        if self.timestamp_us is None:
+            return None
+        return micros_datetime(self.timestamp_us, self.tzinfo)
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __repr__(self):
+        return f"Message({self.sender!r}, {self.text!r}, {self.timestamp!r})"
 
 
 def clamp_0_100(value):
@@ -55,91 +105,148 @@ def _scale_centered(value, mid, spread):
         return 50.0
     return max(0.0, min(100.0, 50.0 + ((value - mid) / spread) * 50.0))
 
-def _parse_timestamp(raw):
-    if raw is None:
-        return None
-    if isinstance(raw, (int, float)):
-        try:
-            return datetime.fromtimestamp(float(raw))
-        except Exception:
-            return None
-    text = str(raw).strip()
-    if not text:
-        return None
-    for fmt in (
-        "%Y-%m-%d %H:%M:%S",
-        "%Y-%m-%d %H:%M",
-        "%Y-%m-%d",
-        "%m/%d/%Y %H:%M:%S",
-        "%m/%d/%Y %H:%M",
-        "%m/%d/%Y",
-    ):
-        try:
-            return datetime.strptime(text, fmt)
-        except ValueError:
-            pass
-    try:
-        return datetime.fromisoformat(text.replace("Z", "+00:00"))
-    except Exception:
-        return None
-
-
-def _tokenize(text):
-    return re.findall(r"[a-zA-Z']+", (text or "").lower())
-
-
-def _sentiment_score(text):
-    tokens = _tokenize(text)
-    if not tokens:
-        return 0.0
-    pos = sum(1 for t in tokens if t in POSITIVE_WORDS)
-    neg = sum(1 for t in tokens if t in NEGATIVE_WORDS)
-    return (pos - neg) / max(1, len(tokens))
-
-
-def _empathy_score(text):
-    lower = (text or "").lower()
-    hits = sum(1 for phrase in EMPATHY_WORDS if phrase in lower)
-    return hits
-
-
-def parse_messages_from_upload(file_storage):
-    filename = (file_storage.filename or "").lower()
-    raw = file_storage.read()
-    text = raw.decode("utf-8", errors="ignore")
+class _LimitedReader(io.RawIOBase):
+    """
+    Binary stream wrapper that raises UploadLimitError once more than
+    `limit` bytes have been read, so oversized uploads fail early.
+    """
 
-    messages = []
+    def __init__(self, stream, limit):
+        self._stream = stream
+        self._limit = limit
+        self.bytes_read = 0
 
-    if filename.endswith(".json"):
-        data = json.loads(text)
-        records = data.get("messages", data) if isinstance(data, dict) else data
-        if isinstance(records, list):
-            for row in records:
-                if not isinstance(row, dict):
-                    continue
-                messages.append(
-                    {
-                        "sender": row.get("sender") or row.get("from") or row.get("author") or "Unknown",
-                        "text": row.get("text") or row.get("message") or row.get("body") or "",
-                        "timestamp": _parse_timestamp(
-                            row.get("timestamp") or row.get("time") or row.get("date")
-                        ),
-                    }
-                )
-    elif filename.endswith(".csv"):
-        reader = csv.DictReader(io.StringIO(text))
-        for row in reader:
-            messages.append(
-                {
-                    "sender": row.get("sender") or row.get("from") or row.get("author") or "Unknown",
-                    "text": row.get("text") or row.get("message") or row.get("body") or "",
-                    "timestamp": _parse_timestamp(
-                        row.get("timestamp") or row.get("time") or row.get("date")
-                    ),
-                }
-            )
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._stream.read(len(buffer))
+        self.bytes_read += len(data)
+        if self._limit is not None and self.bytes_read > self._limit:
+            raise UploadLimitError(f"upload exceeds {self._limit} bytes")
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def _record_message(row):
+    return (
+        row.get("sender") or row.get("from") or row.get("author") or "Unknown",
+        row.get("text") or row.get("message") or row.get("body") or "",
+        row.get("timestamp") or row.get("time") or row.get("date"),
+    )
+
+
+class _JSONStream:
+    """
+    Incremental reader over a text stream that decodes one JSON value at a
+    time with json.JSONDecoder.raw_decode, keeping only the unread tail of
+    the current chunk in memory.
+    """
+
+    _WHITESPACE = " \t\n\r"
+    _NUMBER_CHARS = "0123456789+-.eE"
+
+    def __init__(self, text_stream):
+        self._stream = text_stream
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self):
+        if self._eof:
+            return False
+        chunk = self._stream.read(STREAM_CHUNK_BYTES)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self):
+        """
+        Next non-whitespace character without consuming it ("" at the end).
+        """
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in self._WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, chars):
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"invalid JSON: expected one of {chars!r}, found {char or 'end of file'!r}")
+        self._pos += 1
+        return char
+
+    def value(self):
+        """
+        Decodes the next complete value. A number is only accepted once the
+        character after it has been read (or at EOF), since "12" or "1e"
+        may continue in the next chunk.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                complete = end < len(self._buffer) and self._buffer[end] not in self._NUMBER_CHARS
+                if complete or self._eof or not isinstance(value, (int, float)):
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            if len(self._buffer) - self._pos > MAX_JSON_VALUE_CHARS:
+                raise UploadLimitError(f"a JSON value exceeds {MAX_JSON_VALUE_CHARS} characters")
+            self._fill()
+
+    def array_items(self):
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.expect(",]") == "]":
+                return
+
+
+def _iter_json_rows(text_stream):
+    """
+    Rows of a JSON export: either a top-level array or the "messages" array
+    of a top-level object. Other fields are decoded one at a time and
+    dropped, so only one message is held in memory at once.
+    """
+    stream = _JSONStream(text_stream)
+    first = stream.peek()
+    if first == "[":
+        yield from stream.array_items()
+    elif first == "{":
+        stream.expect("{")
+        if stream.peek() == "}":
+            return
+        while True:
+            key = stream.value()
+            stream.expect(":")
+            if key == "messages" and stream.peek() == "[":
+                yield from stream.array_items()
+            else:
+                stream.value()
+            if stream.expect(",}") == "}":
+                return
     else:
-        for line in text.splitlines():
+        # A scalar document has no messages, but must still be valid JSON.
+        stream.value()
+
+
+def _iter_text_rows(text_stream):
+    for physical_line in text_stream:
+        # splitlines() also breaks on the rarer separators (\v, \x1c, \u2028, ...)
+        for line in physical_line.splitlines():
             line = line.strip()
             if not line:
                 continue
@@ -150,219 +257,631 @@ def parse_messages_from_upload(file_storage):
             else:
                 sender = "Unknown"
                 body = line
-            messages.append({"sender": sender, "text": body, "timestamp": None})
+            yield sender, body, None
 
-    messages = [m for m in messages if (m.get("text") or "").strip()]
-    messages.sort(key=lambda m: m["timestamp"] or datetime.min)
-    return messages
 
+def iter_messages_from_upload(file_storage, max_bytes=None, max_messages=None):
+    """
+    Streams messages out of an uploaded .json, .csv or .txt export without
+    reading the whole file: JSON arrays are decoded element by element, CSV
+    row by row and text line by line, straight from the upload stream.
+
+    Yields Message records for non-empty messages in file order. Raises
+    UploadLimitError as soon as more than `max_bytes` bytes are read or more
+    than `max_messages` messages are found (defaults: MAX_UPLOAD_BYTES,
+    MAX_UPLOAD_MESSAGES). Memory use is one chunk plus the current record.
+    """
+    max_bytes = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    max_messages = MAX_UPLOAD_MESSAGES if max_messages is None else max_messages
+    content_length = getattr(file_storage, "content_length", None)
+    if content_length and content_length > max_bytes:
+        raise UploadLimitError(f"upload exceeds {max_bytes} bytes")
+
+    filename = (file_storage.filename or "").lower()
+    raw = io.BufferedReader(_LimitedReader(file_storage.stream, max_bytes), STREAM_CHUNK_BYTES)
+    # newline="" keeps line endings untouched for the csv module; the text
+    # format splits lines itself.
+    newline = "" if filename.endswith(".csv") else None
+    text_stream = io.TextIOWrapper(raw, encoding="utf-8", errors="ignore", newline=newline)
 
-def _std(values):
-    if not values:
-        return 0.0
-    mean = sum(values) / len(values)
-    return math.sqrt(sum((v - mean) ** 2 for v in values) / len(values))
+    if filename.endswith(".json"):
+        rows = (_record_message(row) for row in _iter_json_rows(text_stream) if isinstance(row, dict))
+    elif filename.endswith(".csv"):
+        rows = (_record_message(row) for row in csv.DictReader(text_stream))
+    else:
+        rows = _iter_text_rows(text_stream)
 
+    count = 0
+    block = []
+    timestamps = TimestampColumn()
+    for sender, text, timestamp in rows:
+        if not (text or "").strip():
+            continue
+        count += 1
+        if count > max_messages:
+            raise UploadLimitError(f"upload has more than {max_messages} messages")
+        if isinstance(sender, str):
+            # Senders repeat on every line; share one string per name.
+            sender = sys.intern(sender)
+        block.append((sender, text, timestamp))
+        if len(block) == TIMESTAMP_BLOCK_ROWS:
+            yield from _timed_messages(block, timestamps)
+            block = []
+    yield from _timed_messages(block, timestamps)
+
+
+def _timed_messages(block, timestamps):
+    # Timestamps of a block are parsed together with the file's sniffed layout.
+    micros, tzinfos = timestamps.parse([timestamp for _, _, timestamp in block])
+    for (sender, text, _), timestamp_us, tzinfo in zip(block, micros, tzinfos):
+        yield Message(sender, text, timestamp_us=timestamp_us, tzinfo=tzinfo)
+
+
+def parse_messages_from_upload(file_storage, max_bytes=None, max_messages=None):
+    """
+    All messages of an upload, sorted by timestamp (untimed messages first,
+    otherwise in file order). See iter_messages_from_upload for limits.
+    """
+    messages = list(iter_messages_from_upload(file_storage, max_bytes, max_messages))
+    messages.sort(key=lambda m: -math.inf if m.timestamp_us is None else m.timestamp_us)
+    return messages
 
-def infer_parameters(messages):
-    if not messages:
-        raise ValueError("No valid messages found in the uploaded file.")
 
-    # Pick the two most frequent senders to avoid skew when many labels exist.
-    sender_counts = defaultdict(int)
-    for m in messages:
-        sender_counts[m["sender"]] += 1
-    if not sender_counts:
-        raise ValueError("No sender information found in messages.")
+COUNT_COLUMNS = ("sender", "timestamp_us", "has_timestamp", "tokens")
+# Weighted lexicon hits; a lexicon without one of these categories scores 0.
+HIT_COLUMNS = ("positive", "negative", "empathy")
+FEATURE_COLUMNS = COUNT_COLUMNS + HIT_COLUMNS
+# Messages scored per lexicon pass; bounds the flat token buffer.
+LEXICON_BATCH_MESSAGES = 16384
 
-    sorted_senders = sorted(sender_counts.items(), key=lambda x: x[1], reverse=True)
-    sender_a = sorted_senders[0][0]
-    sender_b = sorted_senders[1][0] if len(sorted_senders) > 1 else "Person B"
 
-    by_sender = {sender_a: [], sender_b: []}
+def extract_message_features(messages, lexicon=None):
+    """
+    One pass over the messages producing a columnar feature table: NumPy
+    arrays in message order for the sender id (index into `senders`, in
+    first-seen order), timestamp in integer microseconds since the epoch
+    (exact, so differences match datetime arithmetic), token count,
+    weighted positive/negative/empathy lexicon hits and sentiment.
+    `lexicon` defaults to load_lexicon() for QUPID_LEXICON_LANG.
+    """
+    lexicon = lexicon or load_lexicon()
+    sender_ids = {}
+    rows = []
+    pending = []
+    hit_blocks = []
     for m in messages:
-        if m["sender"] == sender_a:
-            by_sender[sender_a].append(m)
+        if type(m) is Message:
+            sender, text, micros = m.sender, m.text, m.timestamp_us
         else:
-            # Map all other senders to Person B to keep volume balanced.
-            by_sender[sender_b].append(m)
+            sender, text, timestamp = m["sender"], m["text"], m["timestamp"]
+            micros = None if timestamp is None else datetime_micros(timestamp)[0]
+        sender_id = sender_ids.get(sender)
+        if sender_id is None:
+            sender_id = sender_ids[sender] = len(sender_ids)
+        tokens = TOKEN_RE.findall((text or "").lower())
+        rows.append((sender_id, micros or 0, micros is not None, len(tokens)))
+        pending.append(tokens)
+        if len(pending) == LEXICON_BATCH_MESSAGES:
+            hit_blocks.append(lexicon.score_batch(pending))
+            pending = []
+    hit_blocks.append(lexicon.score_batch(pending))
+
+    data = np.array(rows, dtype=np.int64).reshape(-1, len(COUNT_COLUMNS))
+    table = {name: data[:, i] for i, name in enumerate(COUNT_COLUMNS)}
+    table["has_timestamp"] = table["has_timestamp"].astype(bool)
+    hits = np.concatenate(hit_blocks)
+    for name in HIT_COLUMNS:
+        column = lexicon.category_index(name)
+        table[name] = hits[:, column] if column is not None else np.zeros(len(rows))
+    # Sentiment is (pos - neg) / token count, 0 for messages without tokens.
+    table["sentiment"] = (table["positive"] - table["negative"]) / np.maximum(1, table["tokens"])
+    table["senders"] = list(sender_ids)
+    table["lexicon"] = lexicon.name
+    table["lexicon_digest"] = lexicon.digest
+    return table
+
+
+# Floats are summed exactly as integers scaled by 2**EXACT_SCALE, which
+# represents every finite double. Sums then do not depend on order or on how
+# the messages were split, so statistics merged from pieces equal one pass.
+EXACT_SCALE = 1130
+# Reply lags are clipped to a day.
+MAX_LAG_US = 24 * 3600 * 10**6
+_MICROS_PER_MINUTE = 60 * 10**6
+
+
+def _exact_sum(values):
+    """
+    Sum of a float array as an integer scaled by 2**EXACT_SCALE. Each value
+    is split into mantissa and exponent; mantissas are summed per exponent
+    in two 26-bit halves, which stays exact for up to 2**26 values.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        return 0
+    mantissa, exponent = np.frexp(values)
+    mantissa = (mantissa * 2.0**53).astype(np.int64)
+    exponents, groups = np.unique(exponent, return_inverse=True)
+    high = np.bincount(groups, weights=mantissa >> 26)
+    low = np.bincount(groups, weights=mantissa & (2**26 - 1))
+    total = 0
+    for e, h, l in zip(exponents.tolist(), high.tolist(), low.tolist()):
+        total += ((int(h) << 26) + int(l)) << (e - 53 + EXACT_SCALE)
+    return total
+
+
+class _Moments:
+    """
+    Count, sum and sum of squares of a series, held exactly (integers,
+    floats scaled by 2**scale), so two can be added without rounding.
+    """
 
-    count_a = len(by_sender[sender_a])
-    count_b = len(by_sender[sender_b])
-    total = max(1, count_a + count_b)
+    __slots__ = ("n", "s1", "s2", "scale")
 
-    timestamps = [m["timestamp"] for m in messages if m["timestamp"] is not None]
-    if timestamps:
-        span_days = max(1.0, (max(timestamps) - min(timestamps)).total_seconds() / 86400.0)
-    else:
-        span_days = max(1.0, total / 40.0)
-
-    msgs_per_day = total / span_days
-    mutual_frequency = clamp_0_100(_scale_log(msgs_per_day, 200.0))
-
-    sentiments = {sender_a: [], sender_b: []}
-    empathy_hits = 0
-    positive_hits = 0
-    negative_hits = 0
-    lengths = {sender_a: [], sender_b: []}
-
-    for sender, sender_msgs in by_sender.items():
-        for m in sender_msgs:
-            s = _sentiment_score(m["text"])
-            sentiments[sender].append(s)
-            empathy_hits += _empathy_score(m["text"])
-            tokens = _tokenize(m["text"])
-            positive_hits += sum(1 for t in tokens if t in POSITIVE_WORDS)
-            negative_hits += sum(1 for t in tokens if t in NEGATIVE_WORDS)
-            lengths[sender].append(len(_tokenize(m["text"])))
-
-    avg_sent_a = sum(sentiments[sender_a]) / max(1, len(sentiments[sender_a]))
-    avg_sent_b = sum(sentiments[sender_b]) / max(1, len(sentiments[sender_b]))
-    sent_std_all = _std(sentiments[sender_a] + sentiments[sender_b])
-    sentiment_mean = (avg_sent_a + avg_sent_b) / 2.0
-    sentiment_mag = (abs(avg_sent_a) + abs(avg_sent_b)) / 2.0
-    sentiment_diff = abs(avg_sent_a - avg_sent_b)
-    # If both sentiments are near-neutral, alignment should be neutral-ish.
-    alignment_raw = max(0.0, 1.0 - min(1.0, sentiment_diff / 0.25))
-    alignment_weight = min(1.0, sentiment_mag / 0.12)
-    sentiment_alignment = 50.0 + alignment_raw * alignment_weight * 50.0
-
-    reciprocity_gap = abs(count_a - count_b) / total
-    reciprocity = (1.0 - reciprocity_gap) ** 0.6 * 100.0
-
-    empathy_density = empathy_hits / max(1, total)
-    pos_ratio = positive_hits / max(1, positive_hits + negative_hits)
-    empathy_component = _scale_linear(empathy_density, 0.0, 0.08)
-    sentiment_component = _scale_centered(sentiment_mean, 0.0, 0.12)
-    positivity_component = _scale_centered(pos_ratio, 0.5, 0.25)
-    stability_component = _scale_linear(1.0 - min(1.0, sent_std_all), 0.4, 1.0)
-    mutual_empathy = clamp_0_100(
-        0.35 * empathy_component
-        + 0.25 * sentiment_component
-        + 0.2 * positivity_component
-        + 0.2 * stability_component
-    )
-    mutual_compatability = clamp_0_100(
-        0.35 * sentiment_alignment
-        + 0.3 * reciprocity
-        + 0.2 * stability_component
-        + 0.15 * _scale_linear(sentiment_mag, 0.02, 0.18)
-    )
+    def __init__(self, n=0, s1=0, s2=0, scale=0):
+        self.n = n
+        self.s1 = s1
+        self.s2 = s2
+        self.scale = scale
 
-    avg_len = (sum(lengths[sender_a]) + sum(lengths[sender_b])) / max(1, len(lengths[sender_a]) + len(lengths[sender_b]))
-    length_component = _scale_linear(avg_len, 3.0, 25.0)
-    freq_component = _scale_log(msgs_per_day, 200.0)
-    mutual_strength = clamp_0_100(
-        0.4 * reciprocity + 0.35 * length_component + 0.25 * freq_component
-    )
+    @classmethod
+    def of_floats(cls, values):
+        values = np.asarray(values, dtype=np.float64)
+        return cls(len(values), _exact_sum(values), _exact_sum(values * values), EXACT_SCALE)
+
+    @classmethod
+    def of_ints(cls, values):
+        values = np.asarray(values, dtype=np.int64).tolist()
+        return cls(len(values), sum(values), sum(map(operator.mul, values, values)))
+
+    def __add__(self, other):
+        return _Moments(self.n + other.n, self.s1 + other.s1, self.s2 + other.s2, self.scale)
+
+    def mean(self, unit=1):
+        return self.s1 / ((max(1, self.n) << self.scale) * unit)
+
+    def std(self, unit=1):
+        """
+        Population standard deviation, 0 for an empty series.
+        """
+        if not self.n:
+            return 0.0
+        spread = (self.n * self.s2 << self.scale) - self.s1 * self.s1
+        return math.sqrt(max(0, spread) / (self.n * self.n << 2 * self.scale)) / unit
+
+
+class _SenderStats:
+    """
+    Per-sender part of ConversationStats: message count, sentiment and
+    reply-lag moments, and the message positions with running token totals,
+    from which the token sums of any leading run of messages follow.
+    """
+
+    __slots__ = ("count", "sentiment", "lags", "positions", "token_prefix")
+
+    def __init__(self):
+        self.count = 0
+        self.sentiment = _Moments(scale=EXACT_SCALE)
+        self.lags = _Moments()
+        self.positions = array("q")
+        self.token_prefix = array("q", [0])
+
+
+def _leading_tokens(group, k):
+    """
+    Tokens in the first `k` messages sent by any sender in `group`. With
+    several senders, bisects for the position before which exactly `k` of
+    their messages fall.
+    """
+    if k <= 0:
+        return 0
+    if len(group) == 1:
+        return group[0].token_prefix[k]
+    lo, hi = 0, max(s.positions[-1] for s in group if s.count) + 1
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if sum(bisect.bisect_left(s.positions, mid) for s in group) >= k:
+            hi = mid
+        else:
+            lo = mid + 1
+    return sum(s.token_prefix[bisect.bisect_left(s.positions, lo)] for s in group)
 
-    response_lags = {sender_a: [], sender_b: []}
-    switches = 0
-    for i in range(1, len(messages)):
-        prev = messages[i - 1]
-        curr = messages[i]
-        if prev["sender"] == curr["sender"]:
-            continue
-        switches += 1
-        if prev["timestamp"] and curr["timestamp"]:
-            lag_min = (curr["timestamp"] - prev["timestamp"]).total_seconds() / 60.0
-            lag_min = max(0.0, min(lag_min, 24 * 60))
-            response_lags[curr["sender"]].append(lag_min)
-
-    turn_taking = (switches / max(1, len(messages) - 1)) * 100.0
-    if response_lags[sender_a] or response_lags[sender_b]:
-        lag_diff = abs(
-            (sum(response_lags[sender_a]) / max(1, len(response_lags[sender_a])))
-            - (sum(response_lags[sender_b]) / max(1, len(response_lags[sender_b])))
-        )
-        lag_sync = 100.0 - min(100.0, lag_diff / 3.0)
-    else:
-        # No timestamps → infer from turn-taking to avoid a flat midpoint.
-        lag_sync = _scale_centered(turn_taking, 50.0, 30.0)
-    mutual_sync = clamp_0_100(0.6 * turn_taking + 0.4 * lag_sync)
-
-    burstiness = 50.0
-    if timestamps and len(timestamps) > 2:
-        gaps = []
-        for i in range(1, len(timestamps)):
-            gaps.append((timestamps[i] - timestamps[i - 1]).total_seconds() / 60.0)
-        burstiness = min(100.0, _std(gaps) / max(1.0, (sum(gaps) / len(gaps))) * 100.0)
-
-    mutual_codependence = clamp_0_100(
-        0.45 * burstiness + 0.35 * (100.0 - lag_sync) + 0.2 * _scale_log(msgs_per_day, 200.0)
-    )
 
-    def person_metrics(sender):
-        sender_msgs = by_sender[sender]
-        sender_sents = sentiments[sender]
-        sender_lags = response_lags[sender]
+def _extend_shifted(target, source, offset):
+    values = np.frombuffer(source, dtype=np.int64) + offset
+    target.frombytes(values.tobytes())
 
-        sent_std = _std(sender_sents)
-        lag_mean = sum(sender_lags) / max(1, len(sender_lags))
-        lag_std = _std(sender_lags)
-        init_share = len(sender_msgs) / total
 
-        temperament = clamp_0_100(
-            _scale_centered(sum(sender_sents) / max(1, len(sender_sents)), 0.0, 0.12) * 0.7
-            + _scale_linear(1.0 - min(1.0, sent_std), 0.3, 1.0) * 0.3
+class ConversationStats:
+    """
+    Mergeable sufficient statistics of a conversation: everything
+    infer_parameters needs, kept as exact counts and sums per sender plus
+    the first and last message for continuity across pieces.
+
+    `a.merge(b)` updates `a` to describe `a`'s messages followed by `b`'s,
+    including the turn switch, reply lag and gap across the seam, and gives
+    the same result as building the statistics in one pass. Messages are
+    appended in O(new messages); parameters() recomputes the outputs from
+    the sums in time independent of the history length.
+    """
+
+    def __init__(self, lexicon=None):
+        # (name, digest) of the lexicon the hits were scored with.
+        self.lexicon = lexicon
+        self.total = 0
+        self.tokens = 0
+        self.hits = {name: 0 for name in HIT_COLUMNS}
+        self.senders = {}
+        self.switches = 0
+        # (sender, timestamp_us or None) of the first and last message.
+        self.first = None
+        self.last = None
+        # First, last, lowest and highest timestamp among timed messages.
+        self.first_time = None
+        self.last_time = None
+        self.min_time = None
+        self.max_time = None
+        self.timed = 0
+        self.gaps = _Moments()
+
+    @classmethod
+    def from_messages(cls, messages, lexicon=None):
+        return cls.from_table(extract_message_features(messages, lexicon))
+
+    @classmethod
+    def from_table(cls, table):
+        """
+        Statistics of one extract_message_features table.
+        """
+        stats = cls((table["lexicon"], table["lexicon_digest"]))
+        ids = table["sender"]
+        n = len(ids)
+        if not n:
+            return stats
+        names = table["senders"]
+        times = table["timestamp_us"]
+        has_time = table["has_timestamp"]
+        tokens = table["tokens"]
+        sentiment = table["sentiment"]
+
+        stats.total = n
+        stats.tokens = int(tokens.sum())
+        stats.hits = {name: _exact_sum(table[name]) for name in HIT_COLUMNS}
+        # A turn switch is any change of sender label between neighbours; its
+        # response lag (clipped to a day) is credited to whoever replied.
+        switch = ids[1:] != ids[:-1]
+        stats.switches = int(switch.sum())
+        timed_switch = switch & has_time[1:] & has_time[:-1]
+        lags = np.clip(np.diff(times)[timed_switch], 0, MAX_LAG_US)
+        lag_senders = ids[1:][timed_switch]
+        positions = np.arange(n, dtype=np.int64)
+        # Senders in first-seen order; a table slice may lack some of `names`.
+        present, first_seen = np.unique(ids, return_index=True)
+        for sender_id in present[np.argsort(first_seen)].tolist():
+            name = names[sender_id]
+            mask = ids == sender_id
+            sender = _SenderStats()
+            sender.count = int(mask.sum())
+            sender.sentiment = _Moments.of_floats(sentiment[mask])
+            sender.lags = _Moments.of_ints(lags[lag_senders == sender_id])
+            sender.positions.frombytes(positions[mask].tobytes())
+            sender.token_prefix.frombytes(np.cumsum(tokens[mask], dtype=np.int64).tobytes())
+            stats.senders[name] = sender
+
+        stats.first = (names[ids[0]], int(times[0]) if has_time[0] else None)
+        stats.last = (names[ids[-1]], int(times[-1]) if has_time[-1] else None)
+        timed = times[has_time]
+        stats.timed = len(timed)
+        if len(timed):
+            stats.first_time, stats.last_time = int(timed[0]), int(timed[-1])
+            stats.min_time, stats.max_time = int(timed.min()), int(timed.max())
+            stats.gaps = _Moments.of_ints(np.diff(timed))
+        return stats
+
+    def copy(self):
+        copied = ConversationStats.__new__(ConversationStats)
+        copied.__dict__.update(self.__dict__)
+        copied.hits = dict(self.hits)
+        copied.senders = {}
+        for name, sender in self.senders.items():
+            twin = copied.senders[name] = _SenderStats()
+            twin.count, twin.sentiment, twin.lags = sender.count, sender.sentiment, sender.lags
+            twin.positions = array("q", sender.positions)
+            twin.token_prefix = array("q", sender.token_prefix)
+        return copied
+
+    def merge(self, other):
+        """
+        Appends `other`'s messages after this conversation's; returns self.
+        Raises ValueError when the two were scored with different lexicons.
+        """
+        if self.lexicon is not None and other.lexicon is not None and self.lexicon != other.lexicon:
+            raise ValueError(f"cannot merge statistics scored with lexicons {self.lexicon} and {other.lexicon}")
+        self.lexicon = self.lexicon or other.lexicon
+        if not other.total:
+            return self
+
+        for name, theirs in other.senders.items():
+            mine = self.senders.get(name)
+            if mine is None:
+                mine = self.senders[name] = _SenderStats()
+            mine.count += theirs.count
+            mine.sentiment += theirs.sentiment
+            mine.lags += theirs.lags
+            _extend_shifted(mine.positions, theirs.positions, self.total)
+            _extend_shifted(mine.token_prefix, theirs.token_prefix[1:], mine.token_prefix[-1])
+
+        # The seam between the two pieces is a neighbour pair like any other.
+        if self.last is not None:
+            (prev_sender, prev_time), (sender, time) = self.last, other.first
+            if prev_sender != sender:
+                self.switches += 1
+                if prev_time is not None and time is not None:
+                    lag = min(max(time - prev_time, 0), MAX_LAG_US)
+                    self.senders[sender].lags += _Moments(1, lag, lag * lag)
+        if self.last_time is not None and other.first_time is not None:
+            gap = other.first_time - self.last_time
+            self.gaps += _Moments(1, gap, gap * gap)
+
+        self.gaps += other.gaps
+        self.switches += other.switches
+        self.total += other.total
+        self.tokens += other.tokens
+        self.hits = {name: self.hits[name] + other.hits[name] for name in HIT_COLUMNS}
+        self.first = self.first or other.first
+        self.last = other.last
+        self.timed += other.timed
+        if other.timed:
+            if self.first_time is None:
+                self.first_time, self.min_time, self.max_time = other.first_time, other.min_time, other.max_time
+            else:
+                self.min_time = min(self.min_time, other.min_time)
+                self.max_time = max(self.max_time, other.max_time)
+            self.last_time = other.last_time
+        return self
+
+    def parameters(self):
+        """
+        (inferred slider values, debug details), as infer_parameters returns.
+        """
+        if not self.total:
+            raise ValueError("No valid messages found in the uploaded file.")
+        if not self.senders:
+            raise ValueError("No sender information found in messages.")
+
+        # Pick the two most frequent senders to avoid skew when many labels exist.
+        # The stable sort keeps first-seen order among equal counts.
+        sorted_senders = sorted(
+            ((name, s.count) for name, s in self.senders.items()), key=lambda item: item[1], reverse=True
         )
-        hot_cold = clamp_0_100(_scale_linear(sent_std, 0.02, 0.18) * 0.7 + _scale_linear(lag_std, 2.0, 120.0) * 0.3)
-        distant = clamp_0_100(
-            _scale_linear(lag_mean, 5.0, 180.0) * 0.7 + _scale_linear(1.0 - init_share, 0.0, 0.6) * 0.3
+        sender_a = sorted_senders[0][0]
+        sender_b = sorted_senders[1][0] if len(sorted_senders) > 1 else "Person B"
+
+        # Sender A is Person A; all other senders map to Person B to keep volume balanced.
+        group_a = [self.senders[sender_a]]
+        group_b = [s for name, s in self.senders.items() if name != sender_a]
+        count_a = group_a[0].count
+        count_b = sum(s.count for s in group_b)
+        total = max(1, count_a + count_b)
+
+        if self.timed:
+            span_days = max(1.0, (self.max_time - self.min_time) / 10**6 / 86400.0)
+        else:
+            span_days = max(1.0, total / 40.0)
+
+        msgs_per_day = total / span_days
+        mutual_frequency = clamp_0_100(_scale_log(msgs_per_day, 200.0))
+
+        sent_a = group_a[0].sentiment
+        sent_b = sum((s.sentiment for s in group_b), _Moments(scale=EXACT_SCALE))
+        empathy_hits = self.hits["empathy"] / (1 << EXACT_SCALE)
+        positive_hits = self.hits["positive"] / (1 << EXACT_SCALE)
+        negative_hits = self.hits["negative"] / (1 << EXACT_SCALE)
+
+        avg_sent_a = sent_a.mean()
+        avg_sent_b = sent_b.mean()
+        sent_std_all = (sent_a + sent_b).std()
+        sentiment_mean = (avg_sent_a + avg_sent_b) / 2.0
+        sentiment_mag = (abs(avg_sent_a) + abs(avg_sent_b)) / 2.0
+        sentiment_diff = abs(avg_sent_a - avg_sent_b)
+        # If both sentiments are near-neutral, alignment should be neutral-ish.
+        alignment_raw = max(0.0, 1.0 - min(1.0, sentiment_diff / 0.25))
+        alignment_weight = min(1.0, sentiment_mag / 0.12)
+        sentiment_alignment = 50.0 + alignment_raw * alignment_weight * 50.0
+
+        reciprocity_gap = abs(count_a - count_b) / total
+        reciprocity = (1.0 - reciprocity_gap) ** 0.6 * 100.0
+
+        empathy_density = empathy_hits / max(1, total)
+        pos_ratio = positive_hits / max(1, positive_hits + negative_hits)
+        empathy_component = _scale_linear(empathy_density, 0.0, 0.08)
+        sentiment_component = _scale_centered(sentiment_mean, 0.0, 0.12)
+        positivity_component = _scale_centered(pos_ratio, 0.5, 0.25)
+        stability_component = _scale_linear(1.0 - min(1.0, sent_std_all), 0.4, 1.0)
+        mutual_empathy = clamp_0_100(
+            0.35 * empathy_component
+            + 0.25 * sentiment_component
+            + 0.2 * positivity_component
+            + 0.2 * stability_component
+        )
+        mutual_compatability = clamp_0_100(
+            0.35 * sentiment_alignment
+            + 0.3 * reciprocity
+            + 0.2 * stability_component
+            + 0.15 * _scale_linear(sentiment_mag, 0.02, 0.18)
+        )
+
+        avg_len = self.tokens / max(1, self.total)
+        length_component = _scale_linear(avg_len, 3.0, 25.0)
+        freq_component = _scale_log(msgs_per_day, 200.0)
+        mutual_strength = clamp_0_100(
+            0.4 * reciprocity + 0.35 * length_component + 0.25 * freq_component
         )
 
-        burned_out = 0.0
-        if len(sender_msgs) >= 6:
-            thirds = max(1, len(sender_msgs) // 3)
-            first = sender_msgs[:thirds]
-            last = sender_msgs[-thirds:]
-            first_avg = sum(len(_tokenize(m["text"])) for m in first) / max(1, len(first))
-            last_avg = sum(len(_tokenize(m["text"])) for m in last) / max(1, len(last))
-            decay = max(0.0, first_avg - last_avg)
-            burned_out = clamp_0_100(decay * 12.0 + max(0.0, -sum(sender_sents) / max(1, len(sender_sents)) * 80.0))
+        lags_a = group_a[0].lags
+        lags_b = sum((s.lags for s in group_b), _Moments())
+        turn_taking = (self.switches / max(1, self.total - 1)) * 100.0
+        if lags_a.n or lags_b.n:
+            lag_diff = abs(lags_a.mean(_MICROS_PER_MINUTE) - lags_b.mean(_MICROS_PER_MINUTE))
+            lag_sync = 100.0 - min(100.0, lag_diff / 3.0)
         else:
-            burned_out = clamp_0_100(max(0.0, -sum(sender_sents) / max(1, len(sender_sents)) * 100.0))
-
-        return temperament, hot_cold, distant, burned_out
-
-    a_temp, a_hotcold, a_distant, a_burned = person_metrics(sender_a)
-    b_temp, b_hotcold, b_distant, b_burned = person_metrics(sender_b)
-
-    strength = _strength_from_total(total)
-    inferred = {
-        "mutualEmpathy": _expand_midrange(mutual_empathy, strength=strength),
-        "mutualCompatability": _expand_midrange(mutual_compatability, strength=strength),
-        "mutualFrequency": _expand_midrange(mutual_frequency, strength=strength),
-        "mutualStrength": _expand_midrange(mutual_strength, strength=strength),
-        "mutualSync": _expand_midrange(mutual_sync, strength=strength),
-        "mutualCodependence": _expand_midrange(mutual_codependence, strength=strength),
-        "personATemperarment": _expand_midrange(a_temp, strength=strength),
-        "personAHotCold": _expand_midrange(a_hotcold, strength=strength),
-        "personADistant": _expand_midrange(a_distant, strength=strength),
-        "personABurnedOut": _expand_midrange(a_burned, strength=strength),
-        "personBTemperarment": _expand_midrange(b_temp, strength=strength),
-        "personBHotCold": _expand_midrange(b_hotcold, strength=strength),
-        "personBDistant": _expand_midrange(b_distant, strength=strength),
-        "personBBurnedOut": _expand_midrange(b_burned, strength=strength),
-        "personAName": sender_a,
-        "personBName": sender_b,
-    }
-    debug = {
-        "total_messages": total,
-        "sender_counts": dict(sorted_senders[:4]),
-        "span_days": round(span_days, 2),
-        "messages_per_day": round(msgs_per_day, 2),
-        "avg_sent_a": round(avg_sent_a, 4),
-        "avg_sent_b": round(avg_sent_b, 4),
-        "sentiment_mean": round(sentiment_mean, 4),
-        "sentiment_mag": round(sentiment_mag, 4),
-        "sent_std_all": round(sent_std_all, 4),
-        "sentiment_alignment": round(sentiment_alignment, 2),
-        "pos_ratio": round(pos_ratio, 3),
-        "reciprocity": round(reciprocity, 2),
-        "avg_msg_len": round(avg_len, 2),
-        "turn_taking": round(turn_taking, 2),
-        "lag_sync": round(lag_sync, 2),
-        "burstiness": round(burstiness, 2),
-    }
-    return inferred, debug
+            # No timestamps → infer from turn-taking to avoid a flat midpoint.
+            lag_sync = _scale_centered(turn_taking, 50.0, 30.0)
+        mutual_sync = clamp_0_100(0.6 * turn_taking + 0.4 * lag_sync)
+
+        burstiness = 50.0
+        if self.timed > 2:
+            burstiness = min(
+                100.0,
+                self.gaps.std(_MICROS_PER_MINUTE) / max(1.0, self.gaps.mean(_MICROS_PER_MINUTE)) * 100.0,
+            )
+
+        mutual_codependence = clamp_0_100(
+            0.45 * burstiness + 0.35 * (100.0 - lag_sync) + 0.2 * _scale_log(msgs_per_day, 200.0)
+        )
+
+        def person_metrics(group, sentiment, lags):
+            n_msgs = sentiment.n
+            sent_mean = sentiment.mean()
+
+            sent_std = sentiment.std()
+            lag_mean = lags.mean(_MICROS_PER_MINUTE)
+            lag_std = lags.std(_MICROS_PER_MINUTE)
+            init_share = n_msgs / total
+
+            temperament = clamp_0_100(
+                _scale_centered(sent_mean, 0.0, 0.12) * 0.7
+                + _scale_linear(1.0 - min(1.0, sent_std), 0.3, 1.0) * 0.3
+            )
+            hot_cold = clamp_0_100(_scale_linear(sent_std, 0.02, 0.18) * 0.7 + _scale_linear(lag_std, 2.0, 120.0) * 0.3)
+            distant = clamp_0_100(
+                _scale_linear(lag_mean, 5.0, 180.0) * 0.7 + _scale_linear(1.0 - init_share, 0.0, 0.6) * 0.3
+            )
+
+            burned_out = 0.0
+            if n_msgs >= 6:
+                thirds = max(1, n_msgs // 3)
+                first_avg = _leading_tokens(group, thirds) / thirds
+                last_avg = (_leading_tokens(group, n_msgs) - _leading_tokens(group, n_msgs - thirds)) / thirds
+                decay = max(0.0, first_avg - last_avg)
+                burned_out = clamp_0_100(decay * 12.0 + max(0.0, -sent_mean * 80.0))
+            else:
+                burned_out = clamp_0_100(max(0.0, -sent_mean * 100.0))
+
+            return temperament, hot_cold, distant, burned_out
+
+        a_temp, a_hotcold, a_distant, a_burned = person_metrics(group_a, sent_a, lags_a)
+        b_temp, b_hotcold, b_distant, b_burned = person_metrics(group_b, sent_b, lags_b)
+        strength = _strength_from_total(total)
+        inferred = {
+            "mutualEmpathy": _expand_midrange(mutual_empathy, strength=strength),
+            "mutualCompatability": _expand_midrange(mutual_compatability, strength=strength),
+            "mutualFrequency": _expand_midrange(mutual_frequency, strength=strength),
+            "mutualStrength": _expand_midrange(mutual_strength, strength=strength),
+            "mutualSync": _expand_midrange(mutual_sync, strength=strength),
+            "mutualCodependence": _expand_midrange(mutual_codependence, strength=strength),
+            "personATemperarment": _expand_midrange(a_temp, strength=strength),
+            "personAHotCold": _expand_midrange(a_hotcold, strength=strength),
+            "personADistant": _expand_midrange(a_distant, strength=strength),
+            "personABurnedOut": _expand_midrange(a_burned, strength=strength),
+            "personBTemperarment": _expand_midrange(b_temp, strength=strength),
+            "personBHotCold": _expand_midrange(b_hotcold, strength=strength),
+            "personBDistant": _expand_midrange(b_distant, strength=strength),
+            "personBBurnedOut": _expand_midrange(b_burned, strength=strength),
+            "personAName": sender_a,
+            "personBName": sender_b,
+        }
+        debug = {
+            "total_messages": total,
+            "sender_counts": dict(sorted_senders[:4]),
+            "span_days": round(span_days, 2),
+            "messages_per_day": round(msgs_per_day, 2),
+            "avg_sent_a": round(avg_sent_a, 4),
+            "avg_sent_b": round(avg_sent_b, 4),
+            "sentiment_mean": round(sentiment_mean, 4),
+            "sentiment_mag": round(sentiment_mag, 4),
+            "sent_std_all": round(sent_std_all, 4),
+            "sentiment_alignment": round(sentiment_alignment, 2),
+            "pos_ratio": round(pos_ratio, 3),
+            "reciprocity": round(reciprocity, 2),
+            "avg_msg_len": round(avg_len, 2),
+            "turn_taking": round(turn_taking, 2),
+            "lag_sync": round(lag_sync, 2),
+            "burstiness": round(burstiness, 2),
+            "lexicon": self.lexicon[0] if self.lexicon else None,
+        }
+        return inferred, debug
+
+
+_worker_lexicon = None
+
+
+def _init_analysis_worker(lexicon):
+    # The compiled lexicon is sent once per worker, not with every chunk.
+    global _worker_lexicon
+    _worker_lexicon = lexicon
+
+
+def _message_row(m):
+    if type(m) is Message:
+        return m.sender, m.text, m.timestamp_us
+    timestamp = m["timestamp"]
+    return m["sender"], m["text"], None if timestamp is None else datetime_micros(timestamp)[0]
+
+
+def _chunk_stats(rows):
+    # Runs in a pool worker on (sender, text, timestamp_us) rows.
+    messages = [Message(sender, text, timestamp_us=micros) for sender, text, micros in rows]
+    return ConversationStats.from_messages(messages, _worker_lexicon)
+
+
+def analyze_messages(messages, lexicon=None, workers=None, chunk_messages=ANALYSIS_CHUNK_MESSAGES):
+    """
+    ConversationStats of `messages` (any iterable, consumed once), computed
+    as contiguous chunks of `chunk_messages` on a process pool of `workers`
+    and merged in order. Merging accounts for switches, lags and gaps across
+    chunk edges and the sums are exact, so the result is identical to one
+    serial pass. At most two chunks per worker are in flight, so an iterator
+    is never held in memory whole. An explicit `workers` is used as given,
+    even past the core count (so the parallel path can be checked on one
+    core); the default, QUPID_ANALYSIS_WORKERS, is capped at the cores.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    lexicon = lexicon or load_lexicon()
+    workers = max(1, int(workers) if workers else min(ANALYSIS_WORKERS, os.cpu_count() or 1))
+    messages = iter(messages)
+    if workers == 1:
+        return ConversationStats.from_messages(list(messages), lexicon)
+
+    def chunks():
+        while True:
+            chunk = list(itertools.islice(messages, chunk_messages))
+            if not chunk:
+                return
+            yield [_message_row(m) for m in chunk]
+
+    stats = ConversationStats((lexicon.name, lexicon.digest))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_analysis_worker, initargs=(lexicon,)) as pool:
+        pending = []
+        for rows in chunks():
+            pending.append(pool.submit(_chunk_stats, rows))
+            if len(pending) >= 2 * workers:
+                stats.merge(pending.pop(0).result())
+        for future in pending:
+            stats.merge(future.result())
+    return stats
+
+
+def infer_parameters(messages, lexicon=None, workers=None):
+    """
+    (inferred slider values, debug details) for a conversation. Lists of at
+    least PARALLEL_MIN_MESSAGES are analyzed in parallel chunks (see
+    analyze_messages); `workers` overrides the pool size, 1 forces a serial
+    pass. Both paths give identical results.
+    """
+    if not messages:
+        raise ValueError("No valid messages found in the uploaded file.")
+    if workers is None and len(messages) < PARALLEL_MIN_MESSAGES:
+        workers = 1
+    return analyze_messages(messages, lexicon, workers).parameters()
@@ -0,0 +1,212 @@
+"""
+Incremental conversation sessions.
+
+A session keeps the ConversationStats of everything uploaded so far, so
+each new upload costs O(new messages): the upload is reduced to its own
+statistics and merged in, and parameters are recomputed from the sums.
+The result equals infer_parameters on the uploads' messages concatenated
+in upload order.
+
+Sessions are pickled, one file per session, into QUPID_SESSION_DIR so they
+survive restarts and are shared by every worker process. Each process
+keeps the sessions it used most recently in memory and reloads one only
+when its file has changed; appends hold a file lock on the session, so
+concurrent uploads to it from different workers are applied one after
+the other.
+"""
+import contextlib
+import fcntl
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+import uuid
+
+from backend.lexicon import load_lexicon
+from backend.message_analyzer import ConversationStats
+from qupid_cache import LRUCache, data_path, private_dir
+
+SESSION_DIR = os.environ.get("QUPID_SESSION_DIR", data_path("sessions"))
+# Bump when the pickled layout changes; older session files are then unreadable.
+SESSION_FORMAT = 1
+
+
+class SessionNotFound(KeyError):
+    """Raised for unknown, deleted or unreadable session ids."""
+
+
+class LexiconMismatch(ValueError):
+    """Raised when a session's lexicon changed since its history was scored."""
+
+
+def history_digest(messages, digest=None):
+    """
+    Chained sha256 over (sender, text, timestamp) of `messages`, continuing
+    from `digest` (hex) when given.
+    """
+    hasher = hashlib.sha256(bytes.fromhex(digest) if digest else b"")
+    for m in messages:
+        hasher.update(f"{m.sender}\x1f{m.text}\x1f{m.timestamp_us}\x1e".encode("utf-8", "surrogatepass"))
+    return hasher.hexdigest()
+
+
+class Session:
+    def __init__(self, language=None):
+        self.id = uuid.uuid4().hex
+        self.language = language
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.stats = ConversationStats()
+        # (messages so far, chained digest) after every upload, so an upload
+        # that repeats the history (a fresh export of the same chat) only
+        # contributes its new tail.
+        self.batches = []
+
+    @property
+    def uploads(self):
+        return len(self.batches)
+
+    def _repeats_history(self, messages):
+        digest, start = None, 0
+        for end, expected in self.batches:
+            if end > len(messages):
+                return False
+            digest = history_digest(messages[start:end], digest)
+            if digest != expected:
+                return False
+            start = end
+        return bool(self.batches)
+
+    def append(self, messages):
+        """
+        Merges `messages` after the history; returns (appended, skipped).
+        Raises LexiconMismatch when the lexicon file changed since the
+        session started.
+        """
+        skipped = 0
+        if self._repeats_history(messages):
+            skipped = self.stats.total
+            messages = messages[skipped:]
+        lexicon = load_lexicon(self.language)
+        batch = ConversationStats.from_messages(messages, lexicon)
+        try:
+            self.stats.merge(batch)
+        except ValueError as exc:
+            raise LexiconMismatch(str(exc)) from None
+        previous = self.batches[-1][1] if self.batches else None
+        self.batches.append((self.stats.total, history_digest(messages, previous)))
+        self.updated_at = time.time()
+        return len(messages), skipped
+
+    def parameters(self):
+        return self.stats.parameters()
+
+    def to_dict(self):
+        return {
+            "session_id": self.id,
+            "language": self.language,
+            "lexicon": self.stats.lexicon[0] if self.stats.lexicon else None,
+            "messages": self.stats.total,
+            "senders": len(self.stats.senders),
+            "uploads": self.uploads,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
+class SessionStore:
+    """
+    Sessions on disk, with the most recently used ones also kept in memory
+    per process (bounded by QUPID_SESSION_CACHE_ENTRIES and, by file size,
+    QUPID_SESSION_CACHE_BYTES). lock() serializes updates of a session
+    across threads and worker processes; writes are atomic (temp file +
+    rename) so readers never see a partial file.
+    """
+
+    def __init__(self, path=SESSION_DIR):
+        self.path = path
+        private_dir(path)
+        # Entries are (file version, session); the file size stands in for
+        # the size of the unpickled session.
+        self._loaded = LRUCache(
+            max_entries=int(os.environ.get("QUPID_SESSION_CACHE_ENTRIES", 64)),
+            max_bytes=int(os.environ.get("QUPID_SESSION_CACHE_BYTES", 256 * 1024 * 1024)),
+            size_fn=lambda entry: entry[0][1],
+        )
+
+    def _file(self, session_id, suffix=".pkl"):
+        if not (len(session_id) == 32 and all(c in "0123456789abcdef" for c in session_id)):
+            raise SessionNotFound(session_id)
+        return os.path.join(self.path, session_id + suffix)
+
+    @contextlib.contextmanager
+    def lock(self, session_id):
+        """
+        Exclusive flock on the session's lock file for a get -> change ->
+        put sequence. Every call opens its own descriptor, so it excludes
+        other threads of this process as well as other processes.
+        """
+        lock_path = self._file(session_id, ".lock")
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                # Lock files of sessions that do not exist (deleted, or a
+                # bad id) are not kept around.
+                if not os.path.exists(self._file(session_id)):
+                    try:
+                        os.remove(lock_path)
+                    except OSError:
+                        pass
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    def create(self, language=None):
+        # Validates the language before anything is stored.
+        load_lexicon(language)
+        return Session(language)
+
+    def get(self, session_id):
+        path = self._file(session_id)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self._loaded.discard(session_id)
+            raise SessionNotFound(session_id) from None
+        version = (stat.st_mtime_ns, stat.st_size)
+        cached = self._loaded.get(session_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        try:
+            with open(path, "rb") as handle:
+                stored_format, session = pickle.load(handle)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            raise SessionNotFound(session_id) from None
+        if stored_format != SESSION_FORMAT:
+            raise SessionNotFound(session_id)
+        self._loaded.put(session_id, (version, session))
+        return session
+
+    def put(self, session):
+        path = self._file(session.id)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "wb") as handle:
+            pickle.dump((SESSION_FORMAT, session), handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        stat = os.stat(path)
+        self._loaded.put(session.id, ((stat.st_mtime_ns, stat.st_size), session))
+
+    def delete(self, session_id):
+        path = self._file(session_id)
+        self._loaded.discard(session_id)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            raise SessionNotFound(session_id) from None
+
+
+session_store = SessionStore()
@@ -0,0 +1,107 @@
+"""
+Frontend assets (qupid-app/dist), indexed once at startup.
+
+The Vite build writes .br and .gz variants next to each text asset (see
+qupid-app/vite.config.js); requests get the best variant their
+Accept-Encoding allows, so nothing is compressed per request. Files of at
+most QUPID_STATIC_MEMORY_BYTES (default 256 KB) are served from memory,
+larger ones from disk. Every file gets a content-hash ETag and conditional
+requests answer 304. Vite's content-hashed files under assets/ never change
+under the same name and are cached for a year as immutable; everything
+else, index.html included, is revalidated on each use.
+
+The index reflects dist/ as it was at startup; restart after a rebuild.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+
+from flask import Response, send_file
+
+MEMORY_MAX_BYTES = int(os.environ.get("QUPID_STATIC_MEMORY_BYTES", 256 * 1024))
+# Preference order when a client accepts several.
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+# Vite output names: assets/<name>-<8+ char base64url hash>.<ext>
+HASHED_NAME = re.compile(r"^assets/.+-[A-Za-z0-9_-]{8,}\.\w+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+
+class _Variant:
+    __slots__ = ("path", "size", "etag", "body")
+
+    def __init__(self, path, etag, body):
+        self.path = path
+        self.size = len(body)
+        self.etag = etag
+        self.body = body if self.size <= MEMORY_MAX_BYTES else None
+
+
+class Asset:
+    """One file of the build and its precompressed variants by encoding."""
+
+    def __init__(self, name, path):
+        self.name = name
+        self.mimetype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        self.cache_control = IMMUTABLE if HASHED_NAME.match(name) else REVALIDATE
+        with open(path, "rb") as handle:
+            body = handle.read()
+        digest = hashlib.sha256(body).hexdigest()[:24]
+        self.variants = {None: _Variant(path, digest, body)}
+        for encoding, suffix in ENCODINGS:
+            if os.path.isfile(path + suffix):
+                with open(path + suffix, "rb") as handle:
+                    self.variants[encoding] = _Variant(path + suffix, f"{digest}-{encoding}", handle.read())
+
+    def choose(self, accept_encodings):
+        """The encoding to send for an Accept-Encoding header (None: identity)."""
+        for encoding, _ in ENCODINGS:
+            if encoding in self.variants and accept_encodings[encoding]:
+                return encoding
+        return None
+
+
+class StaticAssets:
+    def __init__(self, root):
+        self.root = root
+        self.assets = {}
+        if not os.path.isdir(root):
+            return
+        compressed = tuple(suffix for _, suffix in ENCODINGS)
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                if filename.endswith(compressed) and os.path.isfile(os.path.splitext(path)[0]):
+                    continue
+                name = os.path.relpath(path, root).replace(os.sep, "/")
+                self.assets[name] = Asset(name, path)
+
+    def get(self, name):
+        return self.assets.get(name)
+
+    def stats(self):
+        variants = [variant for asset in self.assets.values() for variant in asset.variants.values()]
+        return {
+            "files": len(self.assets),
+            "precompressed": len(variants) - len(self.assets),
+            "memory_bytes": sum(variant.size for variant in variants if variant.body is not None),
+        }
+
+    def response(self, asset, request):
+        """The response for a GET or HEAD of `asset`, honouring If-None-Match."""
+        encoding = asset.choose(request.accept_encodings)
+        variant = asset.variants[encoding]
+        if request.if_none_match.contains_weak(variant.etag):
+            response = Response(status=304)
+        elif variant.body is not None:
+            response = Response(variant.body, mimetype=asset.mimetype)
+        else:
+            response = send_file(variant.path, mimetype=asset.mimetype, etag=False, conditional=False)
+        response.set_etag(variant.etag)
+        response.headers["Cache-Control"] = asset.cache_control
+        if len(asset.variants) > 1:
+            response.vary.add("Accept-Encoding")
+        if encoding is not None and response.status_code != 304:
+            response.headers["Content-Encoding"] = encoding
+        return response
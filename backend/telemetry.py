@@ -0,0 +1,367 @@
+"""
+Request and stage instrumentation.
+
+Stage durations come from job events: every job already reports its stages
+(parsing, inference, floquet_setup, solve, scoring, plotting, ...) through
+its progress callback, so a finished job's event times give the time spent
+in each. They feed Prometheus histograms served at /metrics, the
+Server-Timing header of synchronous responses, and structured JSON log
+lines. Simulation and analysis logs are sampled (QUPID_LOG_SAMPLE, default
+0.01 of jobs; failures are always logged) and written by a background
+thread, so request threads never block on stdout.
+
+Metrics live in each process. With QUPID_METRICS_DIR set (gunicorn.conf.py
+does), every worker also writes its histograms and per-worker gauges there
+within METRICS_FLUSH_SECONDS of a change, and /metrics, whichever worker
+answers it, reports histograms summed over all workers and gauges labelled
+with the worker pid. When a worker exits, the master folds its histograms
+into a retired total (retire_worker), so counters never go backwards
+across worker recycling.
+
+QUPID_TELEMETRY=0 turns all of it off: nothing is recorded, no headers are
+added and /metrics answers 404.
+"""
+import bisect
+import contextlib
+import fcntl
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from qupid_cache import private_dir
+
+ENABLED = os.environ.get("QUPID_TELEMETRY", "1") != "0"
+LOG_SAMPLE = float(os.environ.get("QUPID_LOG_SAMPLE", 0.01))
+METRICS_DIR = os.environ.get("QUPID_METRICS_DIR") or None
+METRICS_FLUSH_SECONDS = float(os.environ.get("QUPID_METRICS_FLUSH_SECONDS", 1.0))
+# Seconds; spans sub-millisecond cache hits to minute-long uploads.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = tuple(1024 * 4**i for i in range(11))  # 1 KB .. 1 GB
+# Job events that mark bookkeeping rather than work.
+_NOT_STAGES = ("done", "failed")
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram per label set, rendered in the Prometheus
+    text format.
+    """
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+        _changed.set()
+
+    def snapshot(self):
+        """[[label values, bucket counts, sum, count]], JSON-ready."""
+        with self._lock:
+            return [[list(key), list(counts), total, n] for key, (counts, total, n) in self._series.items()]
+
+    def reset(self):
+        with self._lock:
+            self._series = {}
+
+    def render(self, snapshots=None):
+        """
+        Prometheus lines for this process's series, or for the sum of
+        `snapshots` (from snapshot(), possibly of other processes).
+        """
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        merged = _sum_series([self.snapshot()] if snapshots is None else snapshots)
+        for label_values, (counts, total, n) in sorted(merged.items()):
+            labels = _labels(self.labels, label_values)
+            running = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                running += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{_labels(self.labels + ("le",), label_values + (le,))} {running}')
+            lines.append(f"{self.name}_sum{labels} {total!r}")
+            lines.append(f"{self.name}_count{labels} {n}")
+        return lines
+
+
+def _sum_series(snapshots):
+    # {label values: [bucket counts, sum, count]} over Histogram snapshots.
+    merged = {}
+    for snapshot in snapshots:
+        for key, counts, total, n in snapshot:
+            series = merged.setdefault(tuple(key), [[0] * len(counts), 0.0, 0])
+            series[0] = [a + b for a, b in zip(series[0], counts)]
+            series[1] += total
+            series[2] += n
+    return merged
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def gauge_lines(name, help_text, samples, kind="gauge"):
+    """Prometheus lines for `samples`, a list of (label dict, value)."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {value!r}")
+    return lines
+
+
+REQUEST_SECONDS = Histogram(
+    "qupid_request_duration_seconds", "HTTP request latency.", ("endpoint", "method", "status")
+)
+STAGE_SECONDS = Histogram(
+    "qupid_stage_duration_seconds", "Time spent in each job stage.", ("kind", "stage")
+)
+UPLOAD_BYTES = Histogram(
+    "qupid_upload_size_bytes", "Size of uploaded chat exports.", ("endpoint",), buckets=SIZE_BUCKETS
+)
+
+
+HISTOGRAMS = (REQUEST_SECONDS, STAGE_SECONDS, UPLOAD_BYTES)
+# Set by the app: returns [(name, kind, help, [(labels, value)])] of this
+# worker's gauges and counters (caches, jobs) for the metrics snapshot.
+worker_samples = None
+_changed = threading.Event()
+
+
+def _snapshot_file(pid):
+    return os.path.join(METRICS_DIR, f"{pid}.json")
+
+
+def _write_json(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=METRICS_DIR, suffix=".tmp")
+    with os.fdopen(fd, "w") as handle:
+        json.dump(data, handle)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path) as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+@contextlib.contextmanager
+def _metrics_lock(mode):
+    # Shared while a scrape reads the directory, exclusive while the master
+    # moves a retired worker's counts, so no scrape sees them twice or not
+    # at all.
+    fd = os.open(os.path.join(METRICS_DIR, "metrics.lock"), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, mode)
+        yield
+    finally:
+        os.close(fd)
+
+
+def flush_metrics():
+    """Writes this worker's metrics snapshot to METRICS_DIR."""
+    _changed.clear()
+    snapshot = {
+        "histograms": {histogram.name: histogram.snapshot() for histogram in HISTOGRAMS},
+        "samples": worker_samples() if worker_samples else [],
+    }
+    try:
+        _write_json(_snapshot_file(os.getpid()), snapshot)
+    except OSError:
+        pass
+
+
+def _flush_loop():
+    while True:
+        _changed.wait()
+        time.sleep(METRICS_FLUSH_SECONDS)
+        flush_metrics()
+
+
+def _start_metrics_writer():
+    # Like the log writer: forked workers start their own thread, and
+    # forget the counts of the parent (the preloading master).
+    for histogram in HISTOGRAMS:
+        histogram.reset()
+    _changed.clear()
+    threading.Thread(target=_flush_loop, name="qupid-metrics", daemon=True).start()
+
+
+def retire_worker(pid):
+    """Folds an exited worker's histograms into the retired total (master)."""
+    if not METRICS_DIR:
+        return
+    with _metrics_lock(fcntl.LOCK_EX):
+        snapshot = _read_json(_snapshot_file(pid))
+        if snapshot is None:
+            return
+        retired = (_read_json(os.path.join(METRICS_DIR, "retired.json")) or {"histograms": {}})["histograms"]
+        retired = {
+            histogram.name: [
+                [list(key), counts, total, n]
+                for key, (counts, total, n) in _sum_series([
+                    retired.get(histogram.name, []), snapshot["histograms"].get(histogram.name, []),
+                ]).items()
+            ]
+            for histogram in HISTOGRAMS
+        }
+        _write_json(os.path.join(METRICS_DIR, "retired.json"), {"histograms": retired})
+        try:
+            os.remove(_snapshot_file(pid))
+        except OSError:
+            pass
+
+
+def clear_metrics_dir():
+    """Drops snapshots of a previous server run (master, at startup)."""
+    if not METRICS_DIR:
+        return
+    private_dir(METRICS_DIR)
+    for entry in os.scandir(METRICS_DIR):
+        if entry.name.endswith((".json", ".tmp")):
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+def render_metrics(local_samples):
+    """
+    Prometheus text for /metrics. Without METRICS_DIR it covers this
+    process; with it, every worker (see the module docstring).
+    local_samples is what worker_samples returns for this process.
+    """
+    lines = []
+    if not METRICS_DIR:
+        for histogram in HISTOGRAMS:
+            lines += histogram.render()
+        for name, kind, help_text, samples in local_samples:
+            lines += gauge_lines(name, help_text, samples, kind)
+        return lines
+
+    flush_metrics()
+    with _metrics_lock(fcntl.LOCK_SH):
+        snapshots = {}
+        for entry in os.scandir(METRICS_DIR):
+            if entry.name.endswith(".json"):
+                snapshot = _read_json(entry.path)
+                if snapshot is not None:
+                    snapshots[entry.name[:-len(".json")]] = snapshot
+    for histogram in HISTOGRAMS:
+        lines += histogram.render([snapshot["histograms"].get(histogram.name, []) for snapshot in snapshots.values()])
+    families = {}
+    for worker, snapshot in sorted(snapshots.items()):
+        for name, kind, help_text, samples in snapshot.get("samples", []):
+            family = families.setdefault(name, (kind, help_text, []))
+            family[2].extend((dict(labels, worker=worker), value) for labels, value in samples)
+    for name, (kind, help_text, samples) in families.items():
+        lines += gauge_lines(name, help_text, samples, kind)
+    return lines
+
+
+def stage_timings(job):
+    """
+    [(stage, seconds)] of a job from its event times, in order. "queued"
+    is the wait for a worker; stages reported more than once are summed.
+    """
+    timings = {}
+    for event, following in zip(job.events, job.events[1:]):
+        stage = event["stage"]
+        if stage in _NOT_STAGES:
+            continue
+        timings[stage] = timings.get(stage, 0.0) + following["at"] - event["at"]
+    return list(timings.items())
+
+
+def record_job(job):
+    """Job runner observer: stage histograms and a sampled log line per job."""
+    timings = stage_timings(job)
+    for stage, seconds in timings:
+        STAGE_SECONDS.observe(seconds, job.kind, stage)
+    failed = job.status == "failed"
+    if failed or random.random() < LOG_SAMPLE:
+        fields = {
+            "job_id": job.id,
+            "kind": job.kind,
+            "status": job.status,
+            "seconds": round(job.finished_at - job.created_at, 6),
+            "stages": {stage: round(seconds, 6) for stage, seconds in timings},
+        }
+        result = job.result if isinstance(job.result, dict) else {}
+        for key in ("health_score", "cache_hit", "messages_analyzed"):
+            if key in result:
+                fields[key] = result[key]
+        if failed:
+            fields["error"] = job.error
+        log_event("job", level=logging.WARNING if failed else logging.INFO, **fields)
+
+
+def server_timing(timings, total=None):
+    """Server-Timing header value for [(stage, seconds)] plus the total."""
+    parts = [f"{stage};dur={seconds * 1e3:.2f}" for stage, seconds in timings]
+    if total is not None:
+        parts.append(f"total;dur={total * 1e3:.2f}")
+    return ", ".join(parts)
+
+
+class _JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {"ts": round(record.created, 3), "level": record.levelname.lower(), "event": record.getMessage()}
+        entry.update(getattr(record, "fields", {}))
+        return json.dumps(entry, default=str)
+
+
+logger = logging.getLogger("qupid")
+logger.propagate = False
+_stream_handler = logging.StreamHandler(sys.stderr)
+_stream_handler.setFormatter(_JSONFormatter())
+_queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+logger.addHandler(_queue_handler)
+logger.setLevel(logging.INFO)
+
+
+def _start_log_writer():
+    # Records are handed to a queue; a listener thread does the writing. A
+    # forked worker does not inherit the thread, so it starts its own on a
+    # fresh queue.
+    _queue_handler.queue = queue.SimpleQueue()
+    logging.handlers.QueueListener(_queue_handler.queue, _stream_handler).start()
+
+
+_start_log_writer()
+os.register_at_fork(after_in_child=_start_log_writer)
+if ENABLED and METRICS_DIR:
+    # Only forked workers publish snapshots; the preloading master serves
+    # no requests.
+    private_dir(METRICS_DIR)
+    os.register_at_fork(after_in_child=_start_metrics_writer)
+
+
+def log_event(event, level=logging.INFO, **fields):
+    """One structured JSON log line (written asynchronously)."""
+    logger.log(level, event, extra={"fields": fields})
+
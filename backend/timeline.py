@@ -0,0 +1,131 @@
+"""
+Relationship timeline: slider values per sliding time window.
+
+Timed messages are cut into panes of one window step (e.g. 3.5 days for
+weekly windows with 50% overlap). Each pane is reduced to
+ConversationStats once, from a single feature table for the whole upload,
+and windows are assembled by sliding over the panes: each step adds the
+newest pane and removes the oldest. The statistics have no inverse, so the
+window keeps the two-stack layout of SlidingStats, which supports removal
+with an amortized constant number of merges per step. Analysis therefore
+costs O(messages), not O(windows x window size).
+"""
+import numpy as np
+
+from backend.lexicon import load_lexicon
+from backend.message_analyzer import ConversationStats, Message, extract_message_features
+from backend.timestamps import micros_datetime
+
+DAY_US = 86_400 * 10**6
+MAX_TIMELINE_WINDOWS = 400
+# Windows with fewer messages get no slider values and no simulation.
+MIN_WINDOW_MESSAGES = 2
+
+
+class SlidingStats:
+    """
+    ConversationStats of a queue of consecutive pieces with push (append
+    the newest) and pop (drop the oldest). New pieces accumulate in `_back`;
+    `_front` holds, for the older pieces, the statistics of each piece
+    merged with every newer piece in front. A pop takes the top of
+    `_front`, rebuilding it from `_back` when empty.
+    """
+
+    def __init__(self):
+        self._front = []
+        self._back = []
+        self._back_stats = ConversationStats()
+
+    def __len__(self):
+        return len(self._front) + len(self._back)
+
+    def push(self, stats):
+        self._back.append(stats)
+        self._back_stats.merge(stats)
+
+    def pop(self):
+        if not self._front:
+            suffix = ConversationStats()
+            for stats in reversed(self._back):
+                suffix = stats.copy().merge(suffix)
+                self._front.append(suffix)
+            self._back = []
+            self._back_stats = ConversationStats()
+        self._front.pop()
+
+    def stats(self):
+        """The merged statistics of every piece, oldest first (a new object)."""
+        combined = self._front[-1].copy() if self._front else ConversationStats()
+        return combined.merge(self._back_stats)
+
+
+def _time_key(m):
+    return -1 if m.timestamp_us is None else m.timestamp_us
+
+
+def _table_slice(table, start, stop):
+    return {
+        name: column[start:stop] if name not in ("senders", "lexicon", "lexicon_digest") else column
+        for name, column in table.items()
+    }
+
+
+def conversation_timeline(messages, lexicon=None, window_days=7.0, step_days=3.5):
+    """
+    Slider values for every window of `window_days`, starting at the first
+    timed message and advancing by `step_days`, which must divide the window
+    length. Untimed messages are left out. Each window is a dict with its
+    start and end, message count and, when it holds at least
+    MIN_WINDOW_MESSAGES, `inferred_params` and `analyzer_debug` exactly as
+    infer_parameters would return for the window's messages.
+    Raises ValueError for bad window settings or too many windows.
+    """
+    if not (window_days > 0 and step_days > 0):
+        raise ValueError("window_days and step_days must be positive")
+    window_us = round(window_days * DAY_US)
+    step_us = round(step_days * DAY_US)
+    panes_per_window = window_us // step_us
+    if panes_per_window * step_us != window_us:
+        raise ValueError("step_days must divide window_days (e.g. 7 and 3.5)")
+
+    timed = sorted(
+        (m if type(m) is Message else Message(m["sender"], m["text"], m["timestamp"]) for m in messages),
+        key=_time_key,
+    )
+    timed = [m for m in timed if m.timestamp_us is not None]
+    if not timed:
+        raise ValueError("No timestamped messages found; a timeline needs timestamps.")
+    table = extract_message_features(timed, lexicon or load_lexicon())
+    times = table["timestamp_us"]
+    origin = int(times[0])
+    n_panes = int((times[-1] - origin) // step_us) + 1
+    n_windows = max(1, n_panes - panes_per_window + 1)
+    if n_windows > MAX_TIMELINE_WINDOWS:
+        raise ValueError(f"timeline has {n_windows} windows; the limit is {MAX_TIMELINE_WINDOWS}. use a longer step")
+    bounds = times.searchsorted(origin + step_us * np.arange(n_panes + 1), side="left")
+    bounds[-1] = len(times)
+
+    def pane(index):
+        if index >= n_panes:
+            return ConversationStats()
+        return ConversationStats.from_table(_table_slice(table, bounds[index], bounds[index + 1]))
+
+    window = SlidingStats()
+    for index in range(panes_per_window):
+        window.push(pane(index))
+    windows = []
+    for index in range(n_windows):
+        if index:
+            window.pop()
+            window.push(pane(index + panes_per_window - 1))
+        start = origin + index * step_us
+        stats = window.stats()
+        entry = {
+            "start": micros_datetime(start).isoformat(),
+            "end": micros_datetime(start + window_us).isoformat(),
+            "messages": stats.total,
+        }
+        if stats.total >= MIN_WINDOW_MESSAGES:
+            entry["inferred_params"], entry["analyzer_debug"] = stats.parameters()
+        windows.append(entry)
+    return windows
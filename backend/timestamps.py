@@ -0,0 +1,317 @@
+"""
+Timestamp parsing for chat exports.
+
+parse_timestamp handles one value by trying every known layout in turn.
+TimestampColumn does the same for a whole column: it sniffs the layout
+from a sample of the first values, locks it in for the file and converts
+each block of values with one regex match per value and array arithmetic,
+falling back to parse_timestamp for values the locked layout does not
+cover. Both return integer microseconds since the Unix epoch, so gaps
+between messages are exact integer differences.
+"""
+import re
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+# Layouts tried by parse_timestamp, in order, before ISO 8601.
+TIMESTAMP_FORMATS = (
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d",
+    "%m/%d/%Y %H:%M:%S",
+    "%m/%d/%Y %H:%M",
+    "%m/%d/%Y",
+)
+# Values sniffed to pick a file's layout.
+SNIFF_SAMPLE = 64
+# Distinct row shapes per length decoded in bulk before the rest of a block
+# is decoded row by row.
+MAX_SHAPES = 8
+# Epoch numbers below this many units are seconds, below 1000x that
+# milliseconds, otherwise microseconds: 1e11 s is the year 5138 and 1e11 ms
+# is March 1973, so the ranges do not overlap for real chat dates.
+EPOCH_SECONDS_BELOW = 10**11
+
+EPOCH = datetime(1970, 1, 1)
+EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+_MICROS_PER_DAY = 86_400 * 10**6
+# Epoch values outside this range (in microseconds) are not valid datetimes.
+_MIN_EPOCH_MICROS = (datetime.min - EPOCH) // MICROSECOND
+_MAX_EPOCH_MICROS = (datetime.max - EPOCH) // MICROSECOND
+
+# The field patterns datetime.strptime itself uses, so a value matched here
+# is one strptime would also accept.
+_FIELDS = {
+    "%Y": r"(?P<Y>\d\d\d\d)",
+    "%m": r"(?P<m>1[0-2]|0[1-9]|[1-9])",
+    "%d": r"(?P<d>3[01]|[12]\d|0[1-9]|[1-9])",
+    "%H": r"(?P<H>2[0-3]|[0-1]\d|\d)",
+    "%M": r"(?P<M>[0-5]\d|\d)",
+    "%S": r"(?P<S>[0-5]\d|\d)",
+}
+_ISO_PATTERN = (
+    r"(?P<Y>\d{4})-(?P<m>\d\d)-(?P<d>\d\d)[T ](?P<H>\d\d)(?::(?P<M>\d\d)(?::(?P<S>\d\d)"
+    r"(?:\.(?P<f>\d{6}|\d{3}))?)?)?(?:Z|(?P<sign>[+-])(?P<oh>\d\d):(?P<om>\d\d))?"
+)
+_EPOCH_PATTERN = r"[+-]?\d+(?:\.\d+)?"
+_CALENDAR_FIELDS = ("year", "month", "day", "hour", "minute", "second", "microsecond", "offset", "aware")
+
+
+def _layout_regex(fmt):
+    return re.compile(re.sub(r"%[YmdHMS]", lambda m: _FIELDS[m.group()], fmt).replace(" ", r"\s+"))
+
+
+# (name, compiled pattern) for every layout the bulk path understands.
+LAYOUTS = (
+    ("epoch", re.compile(_EPOCH_PATTERN)),
+    *((fmt, _layout_regex(fmt)) for fmt in TIMESTAMP_FORMATS),
+    ("iso", re.compile(_ISO_PATTERN)),
+)
+
+
+def datetime_micros(value):
+    """
+    (microseconds since the epoch, tzinfo) of a datetime. Naive values count
+    from the naive epoch, aware ones from the UTC epoch.
+    """
+    if value.tzinfo is None:
+        return (value - EPOCH) // MICROSECOND, None
+    return (value - EPOCH_UTC) // MICROSECOND, value.tzinfo
+
+
+def micros_datetime(micros, tzinfo=None):
+    if tzinfo is None:
+        return EPOCH + timedelta(microseconds=micros)
+    return (EPOCH_UTC + timedelta(microseconds=micros)).astimezone(tzinfo)
+
+
+def _epoch_micros(number):
+    magnitude = abs(number)
+    if magnitude < EPOCH_SECONDS_BELOW:
+        return round(number * 10**6)
+    if magnitude < EPOCH_SECONDS_BELOW * 1000:
+        return round(number * 1000)
+    return round(number)
+
+
+def parse_timestamp(raw):
+    """
+    One timestamp as a datetime, or None. Numbers (and numeric strings) are
+    Unix epoch seconds, milliseconds or microseconds, told apart by
+    magnitude, and come back in UTC; strings are tried against
+    TIMESTAMP_FORMATS and then ISO 8601.
+    """
+    if raw is None or isinstance(raw, bool):
+        return None
+    text = raw if isinstance(raw, (int, float)) else str(raw).strip()
+    if isinstance(text, str) and re.fullmatch(_EPOCH_PATTERN, text):
+        text = float(text) if "." in text else int(text)
+    if isinstance(text, (int, float)):
+        try:
+            return EPOCH_UTC + timedelta(microseconds=_epoch_micros(text))
+        except (OverflowError, ValueError):
+            return None
+    if not text:
+        return None
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            pass
+    try:
+        return datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except Exception:
+        return None
+
+
+class TimestampColumn:
+    """
+    Bulk parser for one file's timestamp column. parse() takes a block of
+    raw values and returns parallel lists of epoch microseconds (None when
+    unparseable) and tzinfo (None for naive values). The layout is sniffed
+    from the first SNIFF_SAMPLE non-empty values and kept for the rest of
+    the file; values it does not match, or that fail the range checks, go
+    through parse_timestamp.
+    """
+
+    def __init__(self):
+        self.layout = None
+        self.sniffed = False
+        self.fast_rows = 0
+        self.slow_rows = 0
+        self._zones = {}
+
+    def _sniff(self, texts):
+        sample = [text for text in texts if text][:SNIFF_SAMPLE]
+        if not sample:
+            return
+        self.sniffed = True
+        best = 0
+        for name, pattern in LAYOUTS:
+            hits = sum(1 for text in sample if pattern.fullmatch(text))
+            if hits > best:
+                self.layout, best = (name, pattern), hits
+
+    def parse(self, raw_values):
+        n = len(raw_values)
+        micros = [None] * n
+        tzinfos = [None] * n
+        texts = [
+            "" if raw is None or isinstance(raw, bool) else (raw if isinstance(raw, str) else repr(raw)).strip()
+            for raw in raw_values
+        ]
+        if not self.sniffed:
+            self._sniff(texts)
+
+        parsed = [False] * n
+        if self.layout is not None:
+            name, pattern = self.layout
+            matches = list(map(pattern.fullmatch, texts))
+            rows = [i for i, match in enumerate(matches) if match]
+            if rows:
+                if name == "epoch":
+                    values, zones, ok = self._epoch_block([texts[i] for i in rows])
+                else:
+                    values, zones, ok = self._calendar_block([matches[i] for i in rows])
+                for i, value, zone, good in zip(rows, values, zones, ok):
+                    if good:
+                        micros[i], tzinfos[i], parsed[i] = value, zone, True
+                        self.fast_rows += 1
+
+        for i, text in enumerate(texts):
+            if parsed[i] or not text:
+                continue
+            self.slow_rows += 1
+            value = parse_timestamp(raw_values[i])
+            if value is not None:
+                micros[i], tzinfos[i] = datetime_micros(value)
+        return micros, tzinfos
+
+    def _epoch_block(self, texts):
+        if any("." in text for text in texts):
+            # Fractional epochs are rare; round them one by one like parse_timestamp.
+            values = [_epoch_micros(float(text) if "." in text else int(text)) for text in texts]
+            ok = [_MIN_EPOCH_MICROS < value < _MAX_EPOCH_MICROS for value in values]
+            return values, [timezone.utc] * len(texts), ok
+        numbers = np.array(list(map(int, texts)))
+        if numbers.dtype != np.int64:
+            # Some value does not fit in 64 bits; leave the block to parse_timestamp.
+            return [], [], []
+        magnitude = np.abs(numbers)
+        scale = np.select(
+            [magnitude < EPOCH_SECONDS_BELOW, magnitude < EPOCH_SECONDS_BELOW * 1000], [10**6, 1000], 1
+        )
+        # Seconds and milliseconds stay below 1e17 after scaling, so no overflow.
+        values = numbers * scale
+        ok = (values > _MIN_EPOCH_MICROS) & (values < _MAX_EPOCH_MICROS)
+        return values.tolist(), [timezone.utc] * len(texts), ok.tolist()
+
+    def _calendar_block(self, matches):
+        """
+        Rows sharing a shape (same length, digits and separators in the same
+        places) share their field positions, so each shape is decoded with
+        byte slicing over all of its rows. Rows of rare shapes are decoded
+        one by one.
+        """
+        fields = np.zeros((len(matches), len(_CALENDAR_FIELDS)), dtype=np.int64)
+        shapes = {}
+        leftover = []
+        for i, match in enumerate(matches):
+            text = match.string
+            if text.isascii():
+                shapes.setdefault(len(text), []).append(i)
+            else:
+                leftover.append(i)
+        for length, rows in shapes.items():
+            raw = np.array([matches[i].string for i in rows], dtype=f"S{length}")
+            raw = raw.view(np.uint8).reshape(len(rows), length)
+            digits = (raw >= 48) & (raw <= 57)
+            pending = np.arange(len(rows))
+            for _ in range(MAX_SHAPES):
+                if not len(pending):
+                    break
+                template = pending[0]
+                same = np.all(
+                    (digits[pending] == digits[template]) & (digits[template] | (raw[pending] == raw[template])),
+                    axis=1,
+                )
+                chosen = pending[same]
+                fields[[rows[j] for j in chosen]] = _shape_fields(matches[rows[template]], raw[chosen])
+                pending = pending[~same]
+            leftover.extend(rows[j] for j in pending)
+        for i in leftover:
+            fields[i] = _calendar_fields(matches[i])
+
+        year, month, day, hour, minute, second, fraction, offset, aware = fields.T
+        month_start = ((year - 1970) * 12 + month - 1).astype("datetime64[M]")
+        date = month_start.astype("datetime64[D]") + (day - 1)
+        ok = (
+            (year >= 1) & (month >= 1) & (month <= 12) & (day >= 1)
+            & (date.astype("datetime64[M]") == month_start)
+            & (hour < 24) & (minute < 60) & (second < 60)
+        )
+        values = (
+            date.astype(np.int64) * _MICROS_PER_DAY
+            + ((hour * 60 + minute) * 60 + second) * 10**6 + fraction
+            - offset * 60 * 10**6
+        )
+        zones = [self._zone(minutes) if flag else None for minutes, flag in zip(offset.tolist(), aware.tolist())]
+        return values.tolist(), zones, ok.tolist()
+
+    def _zone(self, minutes):
+        zone = self._zones.get(minutes)
+        if zone is None:
+            zone = self._zones[minutes] = timezone(timedelta(minutes=minutes))
+        return zone
+
+
+def _calendar_fields(match):
+    """
+    The _CALENDAR_FIELDS of one calendar layout match as integers; absent
+    fields are 0, the offset is in minutes east of UTC.
+    """
+    groups = match.groupdict()
+    fraction = groups.get("f")
+    if groups.get("sign"):
+        offset = int(groups["oh"]) * 60 + int(groups["om"])
+        offset, aware = -offset if groups["sign"] == "-" else offset, 1
+    else:
+        offset, aware = 0, int(match.string.endswith("Z"))
+    return (
+        int(groups["Y"]), int(groups["m"]), int(groups["d"]),
+        int(groups.get("H") or 0), int(groups.get("M") or 0), int(groups.get("S") or 0),
+        int(fraction.ljust(6, "0")) if fraction else 0,
+        offset, aware,
+    )
+
+
+def _digits(raw, start, end):
+    value = np.zeros(len(raw), dtype=np.int64)
+    for column in range(start, end):
+        value = value * 10 + (raw[:, column] - 48)
+    return value
+
+
+def _shape_fields(match, raw):
+    """
+    _CALENDAR_FIELDS for rows of uint8 bytes that all have the shape of
+    `match`, read from the byte positions of its groups.
+    """
+    out = np.zeros((len(raw), len(_CALENDAR_FIELDS)), dtype=np.int64)
+    for column, name in enumerate(("Y", "m", "d", "H", "M", "S")):
+        start, end = match.span(name) if name in match.re.groupindex else (-1, -1)
+        if start >= 0:
+            out[:, column] = _digits(raw, start, end)
+    start, end = match.span("f") if "f" in match.re.groupindex else (-1, -1)
+    if start >= 0:
+        out[:, 6] = _digits(raw, start, end) * 10 ** (6 - (end - start))
+    sign = match.start("sign") if "sign" in match.re.groupindex else -1
+    if sign >= 0:
+        minutes = _digits(raw, *match.span("oh")) * 60 + _digits(raw, *match.span("om"))
+        out[:, 7] = np.where(raw[:, sign] == ord("-"), -minutes, minutes)
+        out[:, 8] = 1
+    elif match.string.endswith("Z"):
+        out[:, 8] = 1
+    return out
@@ -0,0 +1,82 @@
+"""
+Before/after timing of the Floquet setup in run_simulation.
+
+"before" replays the original flow: floquet_modes, a 501-point
+floquet_modes_table, fmmesolve (which repeats both internally) and the
+per-step lookup/transform loop. "after" is run_simulation with a cold and
+a warm Floquet cache.
+
+    python benchmarks/bench_floquet_pipeline.py [repeats]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from qutip import (
+    basis, expect, floquet_modes, floquet_modes_t_lookup, floquet_modes_table,
+    fmmesolve, qeye, sigmax, sigmay, sigmaz, tensor,
+)
+
+import qupid_time_dependent_floquet as qtf
+
+
+def legacy_flow():
+    I = qeye(2)
+    sx_A, sx_B = tensor(sigmax(), I), tensor(I, sigmax())
+    sy_A, sy_B = tensor(sigmay(), I), tensor(I, sigmay())
+    sz_A, sz_B = tensor(sigmaz(), I), tensor(I, sigmaz())
+    H_static = 1.0 * sz_A + 1.4 * sz_B + 0.1 * (sx_A * sx_B + sy_A * sy_B) + 0.05 * (sz_A * sz_B)
+    H = [H_static, [1.5 * (sx_A + sx_B), lambda t, args: np.sin(args["w"] * t)]]
+    args = {"w": 1.0}
+    T = 2 * np.pi
+    tlist = np.linspace(0.0, 10 * T, 200)
+    psi0 = tensor(basis(2, 0), basis(2, 0))
+
+    f_modes_0, f_energies = floquet_modes(H, T, args)
+    table = floquet_modes_table(f_modes_0, f_energies, np.linspace(0, T, 501), H, T, args)
+    output = fmmesolve(H, psi0, tlist, [sx_A], [], [lambda w: 0.05 / (2 * np.pi)], T=T, args=args)
+    for idx, t in enumerate(tlist):
+        rho_lab = output.states[idx].transform(floquet_modes_t_lookup(table, t, T), True)
+        expect(sz_A, rho_lab)
+        expect(sz_B, rho_lab)
+
+
+def cold_run():
+    qtf.clear_floquet_cache()
+    qtf.run_simulation(render_plot=False, use_cache=False)
+
+
+def warm_run():
+    qtf.run_simulation({"rate_bit_flip_A": 0.2}, render_plot=False, use_cache=False)
+
+
+def timeit(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return min(samples), float(np.median(samples))
+
+
+def main(repeats=5):
+    qtf.run_simulation(render_plot=False, use_cache=False)  # import/JIT warm-up
+    rows = [
+        ("before: original flow", legacy_flow),
+        ("after: cold Floquet cache", cold_run),
+        ("after: warm Floquet cache", warm_run),
+    ]
+    print(f"{'stage':<30}{'min ms':>10}{'median ms':>12}")
+    for name, fn in rows:
+        best, median = timeit(fn, repeats)
+        print(f"{name:<30}{best * 1e3:>10.1f}{median * 1e3:>12.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,69 @@
+"""
+Per-message scoring cost as the lexicon grows.
+
+"scan" is the previous approach, one substring test per entry per message;
+"compiled" the token automaton in backend.lexicon. Lexicons are synthetic:
+random words plus two- and three-word phrases built from them. Compile and
+disk-cache load times are reported per size.
+
+    python benchmarks/bench_lexicon.py [messages]
+"""
+import os
+import pickle
+import random
+import string
+import sys
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from backend.lexicon import compile_lexicon, tokenize
+from benchmarks.bench_infer_parameters import synthetic_messages
+
+SIZES = (30, 1_000, 10_000, 100_000)
+
+
+def synthetic_entries(size, seed=0):
+    rng = random.Random(seed)
+    words = ["".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9))) for _ in range(size)]
+    entries = []
+    for i in range(size):
+        length = 1 if i % 4 else rng.randint(2, 3)
+        phrase = tuple(rng.choice(words) for _ in range(length))
+        entries.append((rng.choice(("positive", "negative", "empathy")), phrase, rng.uniform(0.5, 2.0)))
+    return entries
+
+
+def main(count=20_000):
+    texts = [m.text.lower() for m in synthetic_messages(count)]
+    token_lists = [tokenize(text) for text in texts]
+    print(f"{count} messages")
+    print(f"{'entries':>10}{'compile s':>11}{'load ms':>9}{'scan us/msg':>13}{'compiled us/msg':>17}")
+    for size in SIZES:
+        entries = synthetic_entries(size)
+        start = time.perf_counter()
+        lexicon = compile_lexicon(entries, negators={"not", "never"})
+        compile_s = time.perf_counter() - start
+        blob = pickle.dumps(lexicon, protocol=pickle.HIGHEST_PROTOCOL)
+        start = time.perf_counter()
+        pickle.loads(blob)
+        load_ms = (time.perf_counter() - start) * 1e3
+
+        phrases = [" ".join(tokens) for _, tokens, _ in entries]
+        # The substring scan is timed on a slice; it is too slow for all messages.
+        sample = texts[: max(1, min(count, 2_000_000 // size))]
+        start = time.perf_counter()
+        for text in sample:
+            sum(1 for phrase in phrases if phrase in text)
+        scan_us = (time.perf_counter() - start) / len(sample) * 1e6
+
+        start = time.perf_counter()
+        lexicon.score_batch(token_lists)
+        compiled_us = (time.perf_counter() - start) / count * 1e6
+        print(f"{size:>10}{compile_s:>11.2f}{load_ms:>9.1f}{scan_us:>13.1f}{compiled_us:>17.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
@@ -0,0 +1,51 @@
+"""
+Chunked parallel analysis versus one serial pass.
+
+Each run reduces the same synthetic conversation to ConversationStats
+with analyze_messages on 1, 2, 4, ... worker processes (up to the core
+count, but always including 2 and 4 so the chunked path is checked on
+small machines too) and checks that the inferred parameters are identical
+to the serial result; any difference makes the script exit with status 1.
+Throughput is messages per second of wall time.
+
+    python benchmarks/bench_parallel_analysis.py [messages] [chunk]
+"""
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from backend.lexicon import load_lexicon
+from backend.message_analyzer import ANALYSIS_CHUNK_MESSAGES, analyze_messages
+from benchmarks.bench_infer_parameters import synthetic_messages
+
+
+def main(count=1_000_000, chunk=ANALYSIS_CHUNK_MESSAGES):
+    lexicon = load_lexicon()
+    messages = synthetic_messages(count)
+    cores = os.cpu_count() or 1
+    counts = sorted({1, 2, 4, cores} | {2**i for i in range(1, cores.bit_length()) if 2**i <= cores})
+    print(f"{count} messages, chunks of {chunk}, {cores} cores")
+    print(f"{'workers':>8}{'seconds':>9}{'msg/s':>11}{'speedup':>9}  same")
+    serial = None
+    identical = True
+    for workers in counts:
+        start = time.perf_counter()
+        params = analyze_messages(messages, lexicon, workers=workers, chunk_messages=chunk).parameters()
+        seconds = time.perf_counter() - start
+        if serial is None:
+            serial = (seconds, params)
+        same = params == serial[1]
+        identical &= same
+        print(f"{workers:>8}{seconds:>9.2f}{count / seconds:>11.0f}{serial[0] / seconds:>8.1f}x  {same}")
+    return identical
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    if not main(*args):
+        print("parallel analysis differs from the serial pass")
+        sys.exit(1)
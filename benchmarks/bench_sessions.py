@@ -0,0 +1,63 @@
+"""
+Appending to a session versus recomputing the whole history.
+
+A history of each size is loaded into a ConversationStats once; then a
+batch of new messages is added either by recomputing infer_parameters on
+history + batch ("full") or by merging the batch's statistics and
+recomputing parameters from the sums ("append"). Both must agree exactly;
+the script exits with status 1 if they do not.
+The last columns give the pickled session size and its reload time.
+
+    python benchmarks/bench_sessions.py [batch] [sizes...]
+"""
+import os
+import pickle
+import sys
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from backend.lexicon import load_lexicon
+from backend.message_analyzer import ConversationStats, infer_parameters
+from benchmarks.bench_infer_parameters import synthetic_messages
+
+SIZES = (10_000, 100_000, 1_000_000)
+
+
+def main(batch=200, sizes=SIZES):
+    lexicon = load_lexicon()
+    print(f"{batch} new messages per append")
+    identical = True
+    print(f"{'history':>10}{'full s':>9}{'append ms':>11}{'speedup':>10}  {'same':<6}{'state MB':>9}{'load ms':>9}")
+    for size in sizes:
+        messages = synthetic_messages(size + batch)
+        history, new = messages[:size], messages[size:]
+        stats = ConversationStats.from_messages(history, lexicon)
+
+        start = time.perf_counter()
+        expected = infer_parameters(messages, lexicon)
+        full_s = time.perf_counter() - start
+
+        blob = pickle.dumps(stats, protocol=pickle.HIGHEST_PROTOCOL)
+        start = time.perf_counter()
+        stats = pickle.loads(blob)
+        load_ms = (time.perf_counter() - start) * 1e3
+
+        start = time.perf_counter()
+        got = stats.merge(ConversationStats.from_messages(new, lexicon)).parameters()
+        append_s = time.perf_counter() - start
+        identical &= got == expected
+        print(
+            f"{size:>10}{full_s:>9.2f}{append_s * 1e3:>11.1f}{full_s / append_s:>9.0f}x  "
+            f"{str(got == expected):<6}{len(blob) / 2**20:>9.1f}{load_ms:>9.1f}"
+        )
+    return identical
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    if not main(*args[:1], sizes=tuple(args[1:]) or SIZES):
+        print("appending differs from a full recompute")
+        sys.exit(1)
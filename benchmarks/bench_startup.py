@@ -0,0 +1,59 @@
+"""
+Cold-start timing of the backend, each case in a fresh interpreter.
+
+"import" is the time to import backend.app (the worker's boot cost),
+"first /run" the latency of the first request, and "second /run" a warm
+request for comparison. The cold case skips warm-up; the warmed case runs
+warmup() first, as the server does before /healthz reports ready.
+
+    python benchmarks/bench_startup.py [repeats]
+"""
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+PROBE = """
+import json, time
+start = time.perf_counter()
+import backend.app as server
+imported = time.perf_counter() - start
+warmup_seconds = 0.0
+if {warm}:
+    start = time.perf_counter()
+    server.warmup()
+    warmup_seconds = time.perf_counter() - start
+client = server.app.test_client()
+payload = {{"personATemperarment": 60, "mutualFrequency": 80, "mutualStrength": 120}}
+latencies = []
+for _ in range(2):
+    start = time.perf_counter()
+    client.post("/run", json=payload)
+    latencies.append(time.perf_counter() - start)
+print(json.dumps([imported, warmup_seconds] + latencies))
+"""
+
+
+def probe(warm):
+    # Result caching off, so both requests actually simulate.
+    env = dict(os.environ, QUPID_WARMUP="0", QUPID_RESULT_CACHE_DB="", QUPID_RESULT_CACHE_ENTRIES="0")
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(warm=warm)],
+        cwd=ROOT_DIR, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(repeats=3):
+    print(f"{'case':<10}{'import s':>10}{'warmup s':>10}{'first /run ms':>15}{'second /run ms':>16}")
+    for name, warm in (("cold", False), ("warmed", True)):
+        imported, warmed, first, second = np.median([probe(warm) for _ in range(repeats)], axis=0)
+        print(f"{name:<10}{imported:>10.2f}{warmed:>10.2f}{first * 1e3:>15.1f}{second * 1e3:>16.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
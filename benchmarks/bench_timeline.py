@@ -0,0 +1,77 @@
+"""
+Timeline analysis: sliding panes and one batched solve versus per-window
+recomputation.
+
+"naive" runs infer_parameters on every window's messages and one
+run_simulation (qutip backend) per window; "timeline" is
+conversation_timeline (panes reduced once, windows slid with add/remove)
+plus score_parameter_sets on the numpy backend in one batch. Slider values
+must match exactly; scores agree to the engines' 1e-3 tolerance.
+
+    python benchmarks/bench_timeline.py [messages] [window_days] [step_days]
+"""
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from backend.lexicon import load_lexicon
+from backend.message_analyzer import infer_parameters
+from backend.timeline import DAY_US, MIN_WINDOW_MESSAGES, conversation_timeline
+from benchmarks.bench_infer_parameters import synthetic_messages
+from qupid_time_dependent_floquet import build_simulation_args, clear_result_cache, run_simulation, score_parameter_sets
+
+
+def naive_windows(messages, lexicon, window_days, step_days):
+    timed = sorted((m for m in messages if m.timestamp_us is not None), key=lambda m: m.timestamp_us)
+    origin, last = timed[0].timestamp_us, timed[-1].timestamp_us
+    windows = []
+    start = origin
+    while True:
+        end = start + round(window_days * DAY_US)
+        chunk = [m for m in timed if start <= m.timestamp_us < end]
+        windows.append(infer_parameters(chunk, lexicon, workers=1) if len(chunk) >= MIN_WINDOW_MESSAGES else None)
+        if end > last:
+            return windows
+        start += round(step_days * DAY_US)
+
+
+def main(count=20_000, window_days=7.0, step_days=3.5):
+    lexicon = load_lexicon()
+    messages = synthetic_messages(count)
+    clear_result_cache()
+
+    start = time.perf_counter()
+    expected = naive_windows(messages, lexicon, window_days, step_days)
+    naive_analysis = time.perf_counter() - start
+    start = time.perf_counter()
+    naive_scores = [
+        run_simulation(build_simulation_args(params))["health_score"] for params, _ in filter(None, expected)
+    ]
+    naive_solve = time.perf_counter() - start
+
+    start = time.perf_counter()
+    windows = conversation_timeline(messages, lexicon, window_days, step_days)
+    analysis = time.perf_counter() - start
+    scored = [w for w in windows if "inferred_params" in w]
+    start = time.perf_counter()
+    scores, _, _, _ = score_parameter_sets(
+        [build_simulation_args(w["inferred_params"]) for w in scored], backend="numpy"
+    )
+    solve = time.perf_counter() - start
+
+    got = [(w["inferred_params"], w["analyzer_debug"]) if "inferred_params" in w else None for w in windows]
+    score_error = max(abs(a - b) for a, b in zip(naive_scores, scores.tolist()))
+    print(f"{count} messages, {len(windows)} windows of {window_days} days every {step_days}")
+    print(f"{'':<10}{'analysis s':>11}{'solve s':>9}{'total s':>9}")
+    print(f"{'naive':<10}{naive_analysis:>11.2f}{naive_solve:>9.2f}{naive_analysis + naive_solve:>9.2f}")
+    print(f"{'timeline':<10}{analysis:>11.2f}{solve:>9.2f}{analysis + solve:>9.2f}")
+    print(f"params identical: {got == expected}, max score difference: {score_error:.2e}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 20_000, *(float(arg) for arg in args[1:3]))
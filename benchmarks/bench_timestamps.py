@@ -0,0 +1,91 @@
+"""
+Timestamp parsing per row versus by sniffed layout.
+
+"per row" calls parse_timestamp on every value, trying each layout in
+turn as the upload parser used to; "bulk" is TimestampColumn, which locks
+in the layout sniffed from the first rows and converts blocks of
+TIMESTAMP_BLOCK_ROWS values at once. Both must agree on every value. The
+last column times parse_messages_from_upload on a CSV export of the same
+rows.
+
+    python benchmarks/bench_timestamps.py [rows]
+"""
+import csv
+import io
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from werkzeug.datastructures import FileStorage
+
+from backend.message_analyzer import TIMESTAMP_BLOCK_ROWS, parse_messages_from_upload
+from backend.timestamps import TimestampColumn, datetime_micros, parse_timestamp
+
+LAYOUTS = {
+    "%Y-%m-%d %H:%M:%S": lambda t: t.strftime("%Y-%m-%d %H:%M:%S"),
+    "%m/%d/%Y %H:%M": lambda t: t.strftime("%m/%d/%Y %H:%M"),
+    "iso+offset": lambda t: t.strftime("%Y-%m-%dT%H:%M:%S.%f") + "+02:00",
+    "epoch s": lambda t: str(int(t.timestamp())),
+    "epoch ms": lambda t: str(int(t.timestamp() * 1000)),
+}
+
+
+def column(count, render, seed=0):
+    rng = random.Random(seed)
+    now = datetime(2021, 1, 1)
+    values = []
+    for _ in range(count):
+        now += timedelta(seconds=rng.randint(1, 3600))
+        values.append(render(now))
+    return values
+
+
+def per_row(values):
+    parsed = (parse_timestamp(value) for value in values)
+    return [None if value is None else datetime_micros(value) for value in parsed]
+
+
+def bulk(values):
+    parser = TimestampColumn()
+    out = []
+    for start in range(0, len(values), TIMESTAMP_BLOCK_ROWS):
+        out.extend(zip(*parser.parse(values[start:start + TIMESTAMP_BLOCK_ROWS])))
+    return out
+
+
+def upload(values):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(("sender", "text", "timestamp"))
+    writer.writerows(("Alex" if i % 2 else "Sam", "see you soon", value) for i, value in enumerate(values))
+    data = io.BytesIO(buffer.getvalue().encode("utf-8"))
+    start = time.perf_counter()
+    parse_messages_from_upload(FileStorage(stream=data, filename="export.csv"))
+    return time.perf_counter() - start
+
+
+def timed(fn, values):
+    start = time.perf_counter()
+    result = fn(values)
+    return result, time.perf_counter() - start
+
+
+def main(count=500_000):
+    print(f"{count} rows")
+    print(f"{'layout':<20}{'per row s':>11}{'bulk s':>9}{'speedup':>9}  {'same':<6}{'csv upload s':>13}")
+    for name, render in LAYOUTS.items():
+        values = column(count, render)
+        expected, slow_s = timed(per_row, values)
+        got, fast_s = timed(bulk, values)
+        same = [value if value is None else tuple(value) for value in got] == expected
+        print(f"{name:<20}{slow_s:>11.2f}{fast_s:>9.2f}{slow_s / fast_s:>8.1f}x  {str(same):<6}{upload(values):>13.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500_000)
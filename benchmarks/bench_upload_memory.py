@@ -0,0 +1,119 @@
+"""
+Peak memory of parsing a large chat export, before and after streaming.
+
+"before" replays the original parser: read the whole upload, decode it,
+json.loads / split it, then build one dict per message. "after" is
+parse_messages_from_upload reading the same file from disk. Peaks are
+measured with tracemalloc and exclude the file itself.
+
+The streaming parser must stay within PEAK_FIXED_BYTES (its read buffers)
+plus PEAK_BYTES_PER_MESSAGE per kept message, whatever the file size; the
+script exits with status 1 when it does not.
+
+    python benchmarks/bench_upload_memory.py [messages] [json|csv|txt]
+"""
+import csv
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from werkzeug.datastructures import FileStorage
+
+from backend.message_analyzer import parse_messages_from_upload
+from backend.timestamps import parse_timestamp
+
+# Measured: about 230 bytes per message in every format.
+PEAK_FIXED_BYTES = 4 * 2**20
+PEAK_BYTES_PER_MESSAGE = 300
+WORDS = ("love", "sorry", "tired", "great", "dinner", "tonight", "miss", "you", "okay", "work", "haha", "why")
+
+
+def write_export(path, count, fmt, seed=0):
+    rng = random.Random(seed)
+    start = datetime(2021, 1, 1)
+    rows = (
+        {
+            "sender": rng.choice(("Alex", "Sam")),
+            "text": " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 18))),
+            "timestamp": (start + timedelta(minutes=7 * i)).strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        for i in range(count)
+    )
+    with open(path, "w", encoding="utf-8", newline="") as handle:
+        if fmt == "json":
+            handle.write("[")
+            for i, row in enumerate(rows):
+                handle.write(("," if i else "") + json.dumps(row))
+            handle.write("]")
+        elif fmt == "csv":
+            writer = csv.DictWriter(handle, fieldnames=("sender", "text", "timestamp"))
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            for row in rows:
+                handle.write(f"{row['sender']}: {row['text']}\n")
+
+
+def legacy_parse(path, fmt):
+    with open(path, "rb") as handle:
+        text = handle.read().decode("utf-8", errors="ignore")
+    if fmt == "json":
+        records = json.loads(text)
+    elif fmt == "csv":
+        records = list(csv.DictReader(io.StringIO(text)))
+    else:
+        records = [dict(zip(("sender", "text"), line.split(":", 1))) for line in text.splitlines()]
+    messages = [
+        {"sender": row["sender"], "text": row["text"], "timestamp": parse_timestamp(row.get("timestamp"))}
+        for row in records
+    ]
+    messages.sort(key=lambda m: m["timestamp"] or datetime.min)
+    return messages
+
+
+def streaming_parse(path, fmt):
+    with open(path, "rb") as handle:
+        return parse_messages_from_upload(FileStorage(stream=handle, filename=f"export.{fmt}"))
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(result), peak, elapsed
+
+
+def main(count=200_000, fmt="json"):
+    """Prints the comparison; returns False if streaming broke its bound."""
+    bound = PEAK_FIXED_BYTES + PEAK_BYTES_PER_MESSAGE * count
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f"export.{fmt}")
+        write_export(path, count, fmt)
+        size_mb = os.path.getsize(path) / 2**20
+        print(f"{count} messages, {fmt}, {size_mb:.1f} MB on disk")
+        print(f"{'parser':<12}{'messages':>10}{'peak MB':>10}{'MB/file MB':>12}{'seconds':>10}")
+        for name, fn in (("before", legacy_parse), ("after", streaming_parse)):
+            messages, peak, elapsed = measure(fn, path, fmt)
+            peak_mb = peak / 2**20
+            print(f"{name:<12}{messages:>10}{peak_mb:>10.1f}{peak_mb / size_mb:>12.2f}{elapsed:>10.2f}")
+    within = peak <= bound
+    print(f"streaming peak {peak / 2**20:.1f} MB, bound {bound / 2**20:.1f} MB: {'ok' if within else 'EXCEEDED'}")
+    return within
+
+
+if __name__ == "__main__":
+    ok = main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000, sys.argv[2] if len(sys.argv) > 2 else "json")
+    sys.exit(0 if ok else 1)
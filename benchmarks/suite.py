@@ -0,0 +1,381 @@
+"""
+Stage-level benchmark suite with JSON baselines and a regression gate.
+
+Times each stage separately so an upgrade or a code change can be traced
+to the step it slowed down:
+
+  simulation.*   run_simulation stages on a cold Floquet cache, taken from
+                 its progress events: floquet_setup (Floquet modes, mode
+                 table and rates), solve (master equation with the
+                 lab-frame transform), scoring (score and report), plus the
+                 PNG render and a full run on a warm Floquet cache
+  parse.*        parse_messages_from_upload per format and size
+  infer.*        infer_parameters (serial) per size
+  endpoint.*     Flask endpoints through the test client
+
+Reports also record response sizes in bytes (`bytes`: /run and
+/analyze-run per format, encoding and field selection), and `compare`
+gates on them the same way.
+
+Inputs come from benchmarks/synthetic.py, so the suite runs offline. The
+shared result cache is disabled for the run.
+
+    python benchmarks/suite.py run [--quick] [--sizes 1000,100000] [--out results.json]
+    python benchmarks/suite.py compare BASELINE [CURRENT] [--threshold 0.25]
+    python benchmarks/suite.py generate json|csv|txt count path
+
+`run` writes benchmarks/baselines/<hostname>.json unless --out is given.
+`compare` measures afresh when CURRENT is omitted and exits with status 1
+when a stage's median is more than `threshold` (relative) and
+MIN_REGRESSION_SECONDS (absolute) slower than in BASELINE.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import socket
+import sys
+import time
+from datetime import datetime, timezone
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+# Cached results from earlier runs would turn timings into cache lookups.
+os.environ["QUPID_RESULT_CACHE_DB"] = ""
+os.environ.setdefault("QUPID_WARMUP", "0")
+
+import numpy as np
+
+from benchmarks.synthetic import FORMATS, export_bytes
+from benchmarks.synthetic import main as generate_export
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+SIZES = (1_000, 100_000, 1_000_000)
+QUICK_SIZES = (1_000, 100_000)
+DEFAULT_THRESHOLD = 0.25
+# Differences below this are timer noise, whatever the ratio.
+MIN_REGRESSION_SECONDS = 0.002
+SIMULATION_STAGES = ("floquet_setup", "solve", "scoring")
+# Every slider at its midpoint, as the frontend starts out.
+SLIDERS = dict.fromkeys((
+    "mutualEmpathy", "mutualCompatability", "mutualFrequency", "mutualStrength", "mutualSync",
+    "mutualCodependence", "personATemperarment", "personAHotCold", "personADistant", "personABurnedOut",
+    "personBTemperarment", "personBHotCold", "personBDistant", "personBBurnedOut",
+), 50)
+
+
+def repeats_for(count):
+    return 5 if count <= 10_000 else 3 if count <= 100_000 else 1
+
+
+def measure(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def summarize(samples):
+    return {"median": float(np.median(samples)), "min": float(min(samples)), "repeats": len(samples)}
+
+
+def simulation_stages(repeats):
+    import qupid_time_dependent_floquet as qtf
+    from qupid_plot import render_dynamics_png
+
+    qtf.run_simulation(use_cache=False)  # imports and first-call setup
+    stages = {name: [] for name in SIMULATION_STAGES}
+    plots = []
+    for i in range(repeats):
+        qtf.clear_floquet_cache()
+        events = []
+        result = qtf.run_simulation(
+            {"rate_bit_flip_A": 0.1 + 0.01 * i},
+            progress=lambda stage: events.append((stage, time.perf_counter())),
+            use_cache=False,
+        )
+        events.append(("done", time.perf_counter()))
+        for (stage, began), (_, ended) in zip(events, events[1:]):
+            if stage in stages:
+                stages[stage].append(ended - began)
+        trajectory = result["trajectory"]
+        start = time.perf_counter()
+        render_dynamics_png(trajectory["t"], trajectory["happiness_A"], trajectory["happiness_B"])
+        plots.append(time.perf_counter() - start)
+    results = {f"simulation.{name}": summarize(samples) for name, samples in stages.items()}
+    results["simulation.plot"] = summarize(plots)
+    results["simulation.warm_total"] = measure(
+        lambda: qtf.run_simulation({"rate_dephase_B": 0.2}, use_cache=False), repeats
+    )
+    return results
+
+
+def upload(data, fmt):
+    from werkzeug.datastructures import FileStorage
+
+    return FileStorage(stream=io.BytesIO(data), filename=f"export.{fmt}")
+
+
+def analysis_stages(sizes):
+    from backend.lexicon import load_lexicon
+    from backend.message_analyzer import infer_parameters, parse_messages_from_upload
+
+    lexicon = load_lexicon()
+    results = {}
+    for count in sizes:
+        repeats = repeats_for(count)
+        messages = None
+        for fmt in FORMATS:
+            data = export_bytes(count, fmt)
+            results[f"parse.{fmt}.{count}"] = measure(lambda: parse_messages_from_upload(upload(data, fmt)), repeats)
+            if fmt == "csv":
+                messages = parse_messages_from_upload(upload(data, fmt))
+            del data
+        results[f"infer.{count}"] = measure(lambda: infer_parameters(messages, lexicon, workers=1), repeats)
+    return results
+
+
+def endpoint_stages(repeats):
+    import backend.app as server
+    from qupid_time_dependent_floquet import clear_result_cache
+
+    client = server.app.test_client()
+    data = export_bytes(1_000, "csv")
+    counter = iter(range(10**6))
+
+    def post_run(payload):
+        response = client.post("/run", json=payload)
+        assert response.status_code == 200, response.get_json()
+
+    def fresh_run():
+        # A new noise slider misses the result cache but reuses the Floquet setup.
+        post_run(dict(SLIDERS, personBHotCold=50 + 0.01 * next(counter)))
+
+    def analyze_run():
+        clear_result_cache()
+        response = client.post("/analyze-run", data={"file": (io.BytesIO(data), "export.csv")})
+        assert response.status_code == 200, response.get_json()
+
+    post_run(SLIDERS)
+    results = {
+        "endpoint.run": measure(fresh_run, repeats),
+        "endpoint.run_cached": measure(lambda: post_run(SLIDERS), repeats),
+        "endpoint.analyze_run.1000": measure(analyze_run, repeats),
+        "endpoint.healthz": measure(lambda: client.get("/healthz"), repeats),
+    }
+    if server.preview_result(server.build_simulation_args(SLIDERS)) is not None:
+        results["endpoint.preview"] = measure(lambda: client.post("/preview", json=SLIDERS), repeats)
+    return results
+
+
+def response_sizes():
+    """Body bytes of /run and /analyze-run per format, encoding and ?fields=."""
+    import backend.app as server
+
+    client = server.app.test_client()
+    data = export_bytes(1_000, "csv")
+    variants = {
+        "json": {},
+        "json_gzip": {"Accept-Encoding": "gzip"},
+        "msgpack": {"Accept": "application/msgpack"},
+        "msgpack_gzip": {"Accept": "application/msgpack", "Accept-Encoding": "gzip"},
+    }
+    sizes = {}
+    for plot in ("url", "inline"):
+        for name, headers in variants.items():
+            response = client.post("/run", json=dict(SLIDERS, plot=plot), headers=headers)
+            sizes[f"run.{plot}.{name}"] = len(response.data)
+    for fields in ("health_score", "trajectory"):
+        response = client.post(f"/run?fields={fields}", json=SLIDERS, headers=variants["msgpack"])
+        sizes[f"run.fields_{fields}.msgpack"] = len(response.data)
+    for name in ("json", "json_gzip"):
+        response = client.post(
+            "/analyze-run", data={"file": (io.BytesIO(data), "export.csv")}, headers=variants[name]
+        )
+        sizes[f"analyze_run.1000.{name}"] = len(response.data)
+    return sizes
+
+
+def environment():
+    import importlib.metadata
+
+    versions = {}
+    for package in ("numpy", "scipy", "qutip", "flask"):
+        try:
+            versions[package] = importlib.metadata.version(package)
+        except importlib.metadata.PackageNotFoundError:
+            versions[package] = None
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "host": socket.gethostname(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "packages": versions,
+    }
+
+
+def run_suite(sizes=SIZES, repeats=5, log=print):
+    results = {}
+    for name, stage in (
+        ("simulation", lambda: simulation_stages(repeats)),
+        ("analysis", lambda: analysis_stages(sizes)),
+        ("endpoints", lambda: endpoint_stages(repeats)),
+    ):
+        start = time.perf_counter()
+        # Jobs print their reports; keep the suite's own output readable.
+        with contextlib.redirect_stdout(io.StringIO()):
+            results.update(stage())
+        log(f"{name}: {time.perf_counter() - start:.1f}s")
+    with contextlib.redirect_stdout(io.StringIO()):
+        response_bytes = response_sizes()
+    return {
+        "environment": environment(),
+        "sizes": list(sizes),
+        "results": dict(sorted(results.items())),
+        "bytes": dict(sorted(response_bytes.items())),
+    }
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Rows of (stage, baseline s, current s, ratio, status) and whether any
+    stage regressed. Stages missing on either side are reported, not failed.
+    """
+    rows = []
+    regressed = False
+    names = sorted(set(baseline["results"]) | set(current["results"]))
+    for name in names:
+        before = baseline["results"].get(name)
+        after = current["results"].get(name)
+        if before is None or after is None:
+            rows.append((name, before and before["median"], after and after["median"], None, "missing"))
+            continue
+        ratio = after["median"] / max(before["median"], 1e-9)
+        slower = after["median"] - before["median"]
+        if ratio > 1 + threshold and slower > MIN_REGRESSION_SECONDS:
+            status = "REGRESSION"
+            regressed = True
+        elif ratio < 1 / (1 + threshold) and -slower > MIN_REGRESSION_SECONDS:
+            status = "faster"
+        else:
+            status = "ok"
+        rows.append((name, before["median"], after["median"], ratio, status))
+    return rows, regressed
+
+
+def compare_bytes(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """Rows of (response, baseline bytes, current bytes, ratio, status) and whether any grew."""
+    rows = []
+    regressed = False
+    before_all = baseline.get("bytes", {})
+    after_all = current.get("bytes", {})
+    for name in sorted(set(before_all) | set(after_all)):
+        before = before_all.get(name)
+        after = after_all.get(name)
+        if before is None or after is None:
+            rows.append((name, before, after, None, "missing"))
+            continue
+        ratio = after / max(before, 1)
+        if ratio > 1 + threshold:
+            status = "REGRESSION"
+            regressed = True
+        elif ratio < 1 / (1 + threshold):
+            status = "smaller"
+        else:
+            status = "ok"
+        rows.append((name, before, after, ratio, status))
+    return rows, regressed
+
+
+def print_byte_comparison(rows):
+    def count(value):
+        return str(value) if value is not None else "-"
+
+    print(f"{'response':<32}{'baseline B':>12}{'current B':>12}{'ratio':>8}  status")
+    for name, before, after, ratio, status in rows:
+        print(f"{name:<32}{count(before):>12}{count(after):>12}{(f'{ratio:.2f}x' if ratio else '-'):>8}  {status}")
+
+
+def print_comparison(rows):
+    def seconds(value):
+        return f"{value:.4f}" if value is not None else "-"
+
+    print(f"{'stage':<32}{'baseline s':>12}{'current s':>12}{'ratio':>8}  status")
+    for name, before, after, ratio, status in rows:
+        print(f"{name:<32}{seconds(before):>12}{seconds(after):>12}{(f'{ratio:.2f}x' if ratio else '-'):>8}  {status}")
+
+
+def load(path):
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def save(report, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+        handle.write("\n")
+
+
+def parse_sizes(text):
+    return tuple(int(size) for size in text.split(",") if size)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="measure every stage and write a JSON report")
+    run.add_argument("--quick", action="store_true", help=f"sizes {QUICK_SIZES} only")
+    run.add_argument("--sizes", type=parse_sizes, help="comma-separated message counts")
+    run.add_argument("--repeats", type=int, default=5)
+    run.add_argument("--out", help="report path (default benchmarks/baselines/<host>.json)")
+    check = commands.add_parser("compare", help="compare a report with a baseline")
+    check.add_argument("baseline")
+    check.add_argument("current", nargs="?", help="report to check (default: measure now)")
+    check.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    check.add_argument("--repeats", type=int, default=5)
+    generate = commands.add_parser("generate", help="write a synthetic chat export")
+    generate.add_argument("format", choices=FORMATS)
+    generate.add_argument("count", type=int)
+    generate.add_argument("path")
+    generate.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        generate_export(args.format, args.count, args.path, args.seed)
+        return 0
+    if args.command == "run":
+        sizes = args.sizes or (QUICK_SIZES if args.quick else SIZES)
+        report = run_suite(sizes, args.repeats)
+        out = args.out or os.path.join(BASELINE_DIR, f"{socket.gethostname()}.json")
+        save(report, out)
+        print(f"wrote {out}")
+        return 0
+
+    baseline = load(args.baseline)
+    if args.current:
+        current = load(args.current)
+    else:
+        current = run_suite(tuple(baseline.get("sizes") or QUICK_SIZES), args.repeats)
+    rows, regressed = compare(baseline, current, args.threshold)
+    print_comparison(rows)
+    if regressed:
+        print(f"regression: at least one stage is more than {args.threshold:.0%} slower than the baseline")
+    byte_rows, grew = compare_bytes(baseline, current, args.threshold)
+    if byte_rows:
+        print()
+        print_byte_comparison(byte_rows)
+    if grew:
+        print(f"regression: at least one response is more than {args.threshold:.0%} larger than the baseline")
+    return 1 if regressed or grew else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""
+Synthetic chat exports for offline benchmarking.
+
+Writes a conversation of `count` messages in any upload format the
+analyzer accepts: a JSON array of {sender, text, timestamp} objects, a CSV
+with the same columns, or "Sender: text" lines. The content is seeded, so
+the same arguments always give the same bytes. Reply gaps are bursty,
+turns switch about 60% of the time, a third sender chimes in now and then,
+and about 5% of JSON/CSV rows have no timestamp.
+
+    python benchmarks/synthetic.py json|csv|txt count path [seed]
+"""
+import csv
+import io
+import json
+import random
+import sys
+from datetime import datetime, timedelta
+
+FORMATS = ("json", "csv", "txt")
+WORDS = (
+    "love", "great", "thanks", "sorry", "tired", "upset", "no", "never", "dinner", "tonight",
+    "miss", "you", "okay", "work", "haha", "why", "can't", "i hear", "proud of you", "here for you",
+    "not", "happy", "annoyed", "later", "call", "me", "weekend", "plans", "so", "much",
+)
+
+
+def synthetic_rows(count, seed=0):
+    """Yields (sender, text, timestamp string or None) in time order."""
+    rng = random.Random(seed)
+    now = datetime(2020, 1, 1)
+    sender = "Alex"
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.03:
+            speaker = "Jordan"
+        else:
+            if roll < 0.6:
+                sender = "Sam" if sender == "Alex" else "Alex"
+            speaker = sender
+        now += timedelta(seconds=int(rng.expovariate(1 / 600.0)))
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 20)))
+        timestamp = now.strftime("%Y-%m-%d %H:%M:%S") if rng.random() < 0.95 else None
+        yield speaker, text, timestamp
+
+
+def write_export(handle, count, fmt, seed=0):
+    """Writes the export to a text-mode `handle` (open it with newline="")."""
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown format {fmt!r}; expected one of {FORMATS}")
+    rows = synthetic_rows(count, seed)
+    if fmt == "json":
+        handle.write("[")
+        for i, (sender, text, timestamp) in enumerate(rows):
+            handle.write(("," if i else "") + json.dumps({"sender": sender, "text": text, "timestamp": timestamp}))
+        handle.write("]")
+    elif fmt == "csv":
+        writer = csv.writer(handle)
+        writer.writerow(("sender", "text", "timestamp"))
+        writer.writerows((sender, text, timestamp or "") for sender, text, timestamp in rows)
+    else:
+        for sender, text, _ in rows:
+            handle.write(f"{sender}: {text}\n")
+
+
+def export_bytes(count, fmt, seed=0):
+    buffer = io.StringIO(newline="")
+    write_export(buffer, count, fmt, seed)
+    return buffer.getvalue().encode("utf-8")
+
+
+def main(fmt, count, path, seed=0):
+    with open(path, "w", encoding="utf-8", newline="") as handle:
+        write_export(handle, int(count), fmt, int(seed))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (4, 5):
+        sys.exit(__doc__.strip().splitlines()[-1].strip())
+    main(*sys.argv[1:])
@@ -15,6 +15,10 @@ python --version
 pip install --upgrade pip
 pip install -r "$BACKEND_DIR/requirements.txt"
 
+echo "== Qupid: build preview surrogate =="
+# Rebuilt only when missing or when the simulation code has changed.
+(cd "$ROOT_DIR" && python qupid_surrogate.py build --if-needed)
+
 echo "== Qupid: setup frontend =="
 cd "$FRONTEND_DIR"
 npm install
@@ -274,11 +274,15 @@ const QupidApp = () => {
                   )}
                 </div>
 
-                {serverResult?.plot_base64 && (
+                {(serverResult?.plot_url || serverResult?.plot_base64) && (
                   <div className={`mt-6 overflow-hidden ${neoGlassPanel} p-4`}>
                     <img
                       alt="relationship dynamics plot"
-                      src={`data:image/png;base64,${serverResult.plot_base64}`}
+                      src={
+                        serverResult.plot_base64
+                          ? `data:image/png;base64,${serverResult.plot_base64}`
+                          : serverResult.plot_url
+                      }
                       className="h-auto w-full rounded-2xl"
                     />
                   </div>
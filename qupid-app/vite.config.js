@@ -1,7 +1,55 @@
+import { readdirSync, readFileSync, statSync, writeFileSync } from 'node:fs'
+import { join, resolve } from 'node:path'
+import { brotliCompressSync, constants, gzipSync } from 'node:zlib'
 import { defineConfig } from 'vite'
 import react from '@vitejs/plugin-react'
 
+// Text assets worth compressing; images and fonts are compressed already.
+const COMPRESSIBLE = /\.(html|js|mjs|css|json|svg|txt|map|webmanifest)$/
+const MIN_BYTES = 1024
+
+function* files(dir) {
+  for (const name of readdirSync(dir)) {
+    const path = join(dir, name)
+    if (statSync(path).isDirectory()) yield* files(path)
+    else yield path
+  }
+}
+
+// Writes .br and .gz next to each text asset so the Flask app can serve
+// them by content negotiation without compressing per request. Variants
+// that save less than 5% are skipped.
+function precompress() {
+  let outDir
+  return {
+    name: 'qupid-precompress',
+    apply: 'build',
+    configResolved(config) {
+      outDir = resolve(config.root, config.build.outDir)
+    },
+    closeBundle() {
+      for (const path of files(outDir)) {
+        if (!COMPRESSIBLE.test(path)) continue
+        const body = readFileSync(path)
+        if (body.length < MIN_BYTES) continue
+        const variants = {
+          br: brotliCompressSync(body, {
+            params: {
+              [constants.BROTLI_PARAM_QUALITY]: constants.BROTLI_MAX_QUALITY,
+              [constants.BROTLI_PARAM_SIZE_HINT]: body.length,
+            },
+          }),
+          gz: gzipSync(body, { level: 9 }),
+        }
+        for (const [suffix, compressed] of Object.entries(variants)) {
+          if (compressed.length < body.length * 0.95) writeFileSync(`${path}.${suffix}`, compressed)
+        }
+      }
+    },
+  }
+}
+
 // https://vite.dev/config/
 export default defineConfig({
-  plugins: [react()],
+  plugins: [react(), precompress()],
 })
@@ -0,0 +1,381 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+# Default home of the on-disk stores (caches, sessions, job state). It holds
+# pickles the server loads, so it must not be somewhere other users can
+# write, like the shared temp dir.
+DATA_DIR = os.environ.get("QUPID_DATA_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), ".qupid-data"
+)
+
+
+def data_path(name):
+    return os.path.join(DATA_DIR, name)
+
+
+def private_dir(path):
+    """
+    Creates `path` (mode 0o700) if needed and returns it, refusing a
+    directory owned by another user or writable by group or others: files
+    in it are unpickled, so whoever can write there can run code here.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.stat(path)
+    if hasattr(os, "geteuid") and (info.st_uid != os.geteuid() or info.st_mode & 0o022):
+        raise PermissionError(f"{path} must be owned by this user and not writable by group or others")
+    return path
+
+
+def _default_size(value):
+    """
+    Rough byte size of a cached value. NumPy arrays report their buffer size,
+    containers are walked one level deep, everything else uses sys.getsizeof.
+    """
+    nbytes = getattr(value, "nbytes", None)
+    if nbytes is not None:
+        return int(nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_default_size(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_default_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def _key_digest(key):
+    return hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+
+
+class PickleDirStore:
+    """
+    Disk tier that keeps one pickle per entry in `path`, named by a hash of
+    the key. Writes are atomic (temp file + rename), so several processes
+    can share the directory. Bounded like SQLiteStore, with file mtimes as
+    the access times (reads refresh them): entries not used for `ttl`
+    seconds are ignored and pruned, and when the directory holds more than
+    `max_bytes` the least recently used entries are deleted. Pruning runs
+    every `prune_every` writes.
+    """
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024, ttl=7 * 24 * 3600.0, prune_every=64):
+        self.path = path
+        self.max_bytes = int(max_bytes)
+        self.ttl = float(ttl)
+        self.prune_every = max(1, int(prune_every))
+        self._writes = 0
+        self._lock = threading.Lock()
+        private_dir(path)
+
+    def _entry_path(self, key):
+        return os.path.join(self.path, f"{_key_digest(key)}.pkl")
+
+    def get(self, key):
+        path = self._entry_path(key)
+        try:
+            if os.stat(path).st_mtime <= time.time() - self.ttl:
+                return None
+            with open(path, "rb") as handle:
+                stored_key, value = pickle.load(handle)
+            os.utime(path)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        # Guard against digest collisions between different keys.
+        return value if stored_key == key else None
+
+    def put(self, key, value):
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+            with os.fdopen(fd, "wb") as handle:
+                pickle.dump((key, value), handle, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._entry_path(key))
+        except OSError:
+            # The disk tier is best effort; memory still holds the value.
+            return
+        with self._lock:
+            self._writes += 1
+            due = self._writes % self.prune_every == 0
+        if due:
+            self.prune()
+
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(".pkl"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((entry.path, stat))
+        return entries
+
+    def prune(self):
+        # Other processes prune the same directory, so files may vanish
+        # under us; that is fine.
+        expired = time.time() - self.ttl
+        kept = []
+        for path, stat in self._entries():
+            if stat.st_mtime <= expired:
+                _remove(path)
+            else:
+                kept.append((stat.st_mtime, stat.st_size, path))
+        excess = sum(size for _, size, _ in kept) - self.max_bytes
+        for _, size, path in sorted(kept):
+            if excess <= 0:
+                break
+            _remove(path)
+            excess -= size
+
+    def clear(self):
+        for path, _ in self._entries():
+            _remove(path)
+
+    def stats(self):
+        entries = self._entries()
+        return {
+            "kind": "pickle-dir",
+            "path": self.path,
+            "entries": len(entries),
+            "bytes": sum(stat.st_size for _, stat in entries),
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+        }
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class SQLiteStore:
+    """
+    Disk tier in a single SQLite file (WAL mode), safe to share between
+    worker processes. Entries older than `ttl` seconds are ignored and
+    pruned; when the file holds more than `max_bytes` of values the least
+    recently read entries are deleted. Pruning runs every `prune_every`
+    writes so reads stay a single indexed lookup.
+    """
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024, ttl=7 * 24 * 3600.0, prune_every=64):
+        self.path = path
+        self.max_bytes = int(max_bytes)
+        self.ttl = float(ttl)
+        self.prune_every = max(1, int(prune_every))
+        self._local = threading.local()
+        self._writes = 0
+        self._lock = threading.Lock()
+        private_dir(os.path.dirname(os.path.abspath(path)))
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " digest TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL,"
+                " created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+
+    def _connect(self):
+        # sqlite3 connections must not cross threads or forks, so each thread
+        # of each process opens its own.
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        digest = _key_digest(key)
+        now = time.time()
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value FROM entries WHERE digest = ? AND created > ?", (digest, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                return None
+            with conn:
+                conn.execute("UPDATE entries SET accessed = ? WHERE digest = ?", (now, digest))
+            stored_key, value = pickle.loads(row[0])
+        except (sqlite3.Error, EOFError, pickle.UnpicklingError):
+            return None
+        return value if stored_key == key else None
+
+    def put(self, key, value):
+        blob = pickle.dumps((key, value), protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return
+        now = time.time()
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (digest, value, size, created, accessed)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (_key_digest(key), sqlite3.Binary(blob), len(blob), now, now),
+                )
+            with self._lock:
+                self._writes += 1
+                due = self._writes % self.prune_every == 0
+            if due:
+                self.prune()
+        except sqlite3.Error:
+            # Best effort, like the pickle tier: a locked or read-only
+            # database only costs a recomputation later.
+            pass
+
+    def prune(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM entries WHERE created <= ?", (time.time() - self.ttl,))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            excess = total - self.max_bytes
+            doomed = []
+            for digest, size in conn.execute("SELECT digest, size FROM entries ORDER BY accessed"):
+                if excess <= 0:
+                    break
+                doomed.append((digest,))
+                excess -= size
+            conn.executemany("DELETE FROM entries WHERE digest = ?", doomed)
+
+    def clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM entries")
+
+    def stats(self):
+        try:
+            entries, size = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        except sqlite3.Error:
+            entries, size = None, None
+        return {
+            "kind": "sqlite",
+            "path": self.path,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+        }
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache bounded by entry count and bytes.
+
+    An optional disk tier (`store`, e.g. SQLiteStore, or `disk_dir` for a
+    PickleDirStore) receives every entry as well, so several worker
+    processes pointed at the same location share each other's work. The
+    in-memory tier is always checked first; disk hits are promoted into
+    memory.
+    """
+
+    def __init__(self, max_entries=128, max_bytes=64 * 1024 * 1024, size_fn=None, disk_dir=None,
+                 store=None):
+        self.max_entries = int(max_entries)
+        self.max_bytes = int(max_bytes)
+        self.size_fn = size_fn or _default_size
+        self.store = store or (PickleDirStore(disk_dir) if disk_dir else None)
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _load_from_disk(self, key):
+        return self.store.get(key) if self.store else None
+
+    def _store_to_disk(self, key, value):
+        if self.store:
+            self.store.put(key, value)
+
+    def _insert(self, key, value):
+        size = self.size_fn(value)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._bytes -= self._sizes.pop(key)
+            del self._entries[key]
+        self._entries[key] = value
+        self._sizes[key] = size
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            old_key, _ = self._entries.popitem(last=False)
+            self._bytes -= self._sizes.pop(old_key)
+            self.evictions += 1
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        value = self._load_from_disk(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return default
+            self.disk_hits += 1
+            self._insert(key, value)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._insert(key, value)
+        self._store_to_disk(key, value)
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def discard(self, key):
+        """Drops `key` from memory (the disk tier keeps it)."""
+        with self._lock:
+            if key in self._entries:
+                del self._entries[key]
+                self._bytes -= self._sizes.pop(key)
+
+    def clear(self, disk=False):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+        if disk and hasattr(self.store, "clear"):
+            self.store.clear()
+
+    def stats(self):
+        disk = self.store.stats() if self.store else None
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "disk": disk,
+            }
@@ -0,0 +1,629 @@
+"""
+Batched NumPy Floquet-Markov engine for the two-qubit Qupid model.
+
+Every function accepts arrays with leading batch axes, so many parameter
+sets are propagated, diagonalized and evolved together. The physics is
+the same as qutip's fmmesolve path in qupid_time_dependent_floquet:
+white-noise spectra, zero temperature, kmax = 5 sidebands, and (like
+fmmesolve) only the first collapse operator entering the rates.
+
+Because the Floquet-Markov generator is time independent in the Floquet
+basis, the master equation is solved exactly with one matrix exponential
+per time step instead of an adaptive ODE. Against the default qutip
+backend (zvode, rtol 1e-6) health scores agree to within 1e-3 points and
+<sz> trajectories to within 1e-4.
+"""
+import numpy as np
+import scipy.linalg as la
+
+# Slider inputs are multiples of 0.01, so rounding to 6 decimals makes equal
+# settings share a key without merging genuinely different ones.
+FLOQUET_KEY_DECIMALS = 6
+# Sideband truncation and coupling-integral steps, as used by fmmesolve.
+FLOQUET_KMAX = 5
+FLOQUET_RATE_STEPS = max(20 * FLOQUET_KMAX, 100)
+# Tolerances for integrating the one-period propagator.
+PROPAGATOR_RTOL = 1e-10
+PROPAGATOR_ATOL = 1e-12
+# Offsets within a period closer than this (as a fraction of T) are merged.
+PHASE_DECIMALS = 9
+# Quasi-energies whose phases e * T differ by less than this are degenerate.
+DEGENERACY_TOL = 1e-7
+
+DEFAULT_PARAMS = {
+    "omega_A": 1.0,
+    "omega_B": 1.4,
+    "J_empathy": 0.1,
+    "J_compatibility": 0.05,
+    "drive_amplitude": 1.5,
+    "drive_freq": 1.0,
+    "rate_bit_flip_A": 0.05,
+    "rate_dephase_A": 0.2,
+    "rate_decay_A": 0.01,
+    "rate_bit_flip_B": 0.01,
+    "rate_dephase_B": 0.05,
+    "rate_decay_B": 0.1,
+    "rate_anti_corr": 0.9,
+    "rate_coll_decay": 0.02,
+}
+HAMILTONIAN_FIELDS = ("omega_A", "omega_B", "J_empathy", "J_compatibility", "drive_amplitude", "drive_freq")
+
+_I2 = np.eye(2, dtype=complex)
+_SX = np.array([[0, 1], [1, 0]], dtype=complex)
+_SY = np.array([[0, -1j], [1j, 0]], dtype=complex)
+_SZ = np.array([[1, 0], [0, -1]], dtype=complex)
+_SM = np.array([[0, 0], [1, 0]], dtype=complex)
+
+SX_A, SY_A, SZ_A, SM_A = (np.kron(op, _I2) for op in (_SX, _SY, _SZ, _SM))
+SX_B, SY_B, SZ_B, SM_B = (np.kron(_I2, op) for op in (_SX, _SY, _SZ, _SM))
+SZ_A_B = np.kron(_SZ, _SZ)
+SM_A_B = np.kron(_SM, _SM)
+
+# Noise channels in the order run_simulation builds c_ops_list.
+COLLAPSE_CHANNELS = (
+    ("rate_bit_flip_A", SX_A),
+    ("rate_dephase_A", SZ_A),
+    ("rate_decay_A", SM_A),
+    ("rate_bit_flip_B", SX_B),
+    ("rate_dephase_B", SZ_B),
+    ("rate_decay_B", SM_B),
+    ("rate_anti_corr", SZ_A_B),
+    ("rate_coll_decay", SM_A_B),
+)
+# fmmesolve only consumes the first collapse operator; keep the same model.
+ACTIVE_CHANNELS = COLLAPSE_CHANNELS[:1]
+
+PSI0 = np.zeros(4, dtype=complex)
+PSI0[0] = 1.0
+
+
+def param_value(params, name):
+    if name == "J_compatibility":
+        value = params.get("J_compatibility", params.get("J_compatability", DEFAULT_PARAMS[name]))
+    else:
+        value = params.get(name, DEFAULT_PARAMS[name])
+    return float(value)
+
+
+def quantize_hamiltonian_params(omega_A, omega_B, J_empathy, J_compatibility, drive_amplitude, drive_freq):
+    return tuple(
+        round(float(v), FLOQUET_KEY_DECIMALS)
+        for v in (omega_A, omega_B, J_empathy, J_compatibility, drive_amplitude, drive_freq)
+    )
+
+
+def hamiltonian_key_for(params):
+    return quantize_hamiltonian_params(*(param_value(params, name) for name in HAMILTONIAN_FIELDS))
+
+
+def hamiltonian_terms(keys):
+    """
+    Static and driving operators, shape (B, 4, 4), and drive frequencies (B,)
+    for a sequence of quantized Hamiltonian keys.
+    """
+    p = np.asarray(keys, dtype=float).reshape(-1, len(HAMILTONIAN_FIELDS))
+    omega_A, omega_B, J_empathy, J_compatibility, drive_amplitude, drive_freq = (
+        p[:, i, None, None] for i in range(len(HAMILTONIAN_FIELDS))
+    )
+    H_static = (
+        omega_A * SZ_A + omega_B * SZ_B
+        + J_empathy * (SX_A @ SX_B + SY_A @ SY_B)
+        + J_compatibility * (SZ_A @ SZ_B)
+    )
+    H_drive = drive_amplitude * (SX_A + SX_B)
+    return H_static, H_drive, p[:, -1]
+
+
+def period_phases(tlist, T):
+    """
+    Maps each time in tlist to its offset within the drive period.
+    Returns the distinct offsets as fractions of T and, for every time,
+    the index of its offset.
+    """
+    phase = np.mod(np.asarray(tlist, dtype=float) / T, 1.0)
+    phase = np.round(phase, PHASE_DECIMALS)
+    phase[phase >= 1.0] = 0.0
+    return np.unique(phase, return_inverse=True)
+
+
+def rate_phases(steps=FLOQUET_RATE_STEPS):
+    """Offsets (fractions of T) at which fmmesolve samples the coupling integral."""
+    return np.round(np.arange(1, steps + 1) / steps, PHASE_DECIMALS)
+
+
+def one_period_propagators(H_static, H_drive, drive_freq, phases, rtol=PROPAGATOR_RTOL,
+                           atol=PROPAGATOR_ATOL):
+    """
+    Integrates U(t) for H(t) = H_static + sin(drive_freq * t) * H_drive over
+    one period, to the given tolerances, and returns U at the given phases
+    (fractions of T).
+
+    Works in the reduced time s = t / T so that a whole batch, each with
+    its own drive frequency, shares one integration. Inputs of shape (N, N)
+    give (P, N, N); batched inputs (B, N, N) give (B, P, N, N).
+    """
+    from scipy.integrate import solve_ivp
+
+    H_static = np.asarray(H_static, dtype=complex)
+    H_drive = np.asarray(H_drive, dtype=complex)
+    single = H_static.ndim == 2
+    if single:
+        H_static, H_drive = H_static[None], H_drive[None]
+    batch, dim = H_static.shape[0], H_static.shape[-1]
+    drive_freq = np.broadcast_to(np.asarray(drive_freq, dtype=float), (batch,))
+    if not np.all(drive_freq > 0):
+        # No period to integrate over; T would be infinite.
+        raise ValueError("drive_freq must be above 0")
+    T = ((2 * np.pi) / drive_freq)[:, None, None]
+    H_static_T = -1j * T * H_static
+    H_drive_T = -1j * T * H_drive
+
+    def rhs(s, y):
+        U = y.reshape(batch, dim, dim)
+        return ((H_static_T + np.sin(2 * np.pi * s) * H_drive_T) @ U).ravel()
+
+    U0 = np.broadcast_to(np.eye(dim, dtype=complex), (batch, dim, dim)).ravel()
+    sol = solve_ivp(
+        rhs, (0.0, 1.0), U0, method="DOP853", t_eval=np.asarray(phases, dtype=float),
+        rtol=rtol, atol=atol,
+    )
+    if not sol.success:
+        raise RuntimeError(f"propagator integration failed: {sol.message}")
+    U = sol.y.T.reshape(len(phases), batch, dim, dim).transpose(1, 0, 2, 3)
+    return U[0] if single else U
+
+
+def floquet_decomposition(U_T, T):
+    """
+    Quasi-energies in [-pi/T, pi/T] and Floquet modes (as columns) from the
+    one-period propagator, with the same conventions as qutip's
+    floquet_modes.
+    """
+    evals, modes_0 = np.linalg.eig(U_T)
+    eargs = np.angle(evals)
+    eargs += (eargs <= -np.pi) * (2 * np.pi) + (eargs > np.pi) * (-2 * np.pi)
+    energies = -eargs / np.asarray(T, dtype=float)[..., None]
+    return energies, modes_0
+
+
+def resolve_degenerate_modes(energies, modes_0, T, H_static):
+    """
+    Fixes the basis inside degenerate quasi-energy subspaces.
+
+    There eig returns any basis of the subspace, and which one depends on
+    rounding in the propagator, so the same Hamiltonian integrated alone or
+    as part of a batch could get different modes (and different rates). The
+    modes are replaced by the eigenvectors of H_static restricted to the
+    subspace, in ascending order, which is what an isolated integration
+    gives for the Qupid Hamiltonians.
+    """
+    modes_0 = np.array(modes_0)
+    phases = np.asarray(energies) * np.asarray(T, dtype=float)[..., None]
+    gap = np.abs(np.angle(np.exp(1j * (phases[..., :, None] - phases[..., None, :]))))
+    degenerate = (gap < DEGENERACY_TOL) & ~np.eye(phases.shape[-1], dtype=bool)
+    flat_modes = modes_0.reshape((-1,) + modes_0.shape[-2:])
+    flat_H = np.broadcast_to(H_static, modes_0.shape).reshape(flat_modes.shape)
+    flat_degenerate = degenerate.reshape((-1,) + degenerate.shape[-2:])
+    for b in np.flatnonzero(flat_degenerate.any(axis=(-1, -2))):
+        done = set()
+        for a in range(flat_degenerate.shape[-1]):
+            cluster = [a] + [int(c) for c in np.flatnonzero(flat_degenerate[b, a])]
+            if a in done or len(cluster) < 2:
+                continue
+            cluster.sort()
+            done.update(cluster)
+            Q, _ = np.linalg.qr(flat_modes[b][:, cluster])
+            _, vecs = np.linalg.eigh(Q.conj().T @ flat_H[b] @ Q)
+            flat_modes[b][:, cluster] = Q @ vecs
+    return flat_modes.reshape(modes_0.shape)
+
+
+def modes_at(U, modes_0, energies, phases, T):
+    """Phi_a(t) = U(t) Phi_a(0) exp(i e_a t) for every phase; shape (..., P, N, N)."""
+    t = np.asarray(phases, dtype=float) * np.asarray(T, dtype=float)[..., None]
+    return (U @ modes_0[..., None, :, :]) * np.exp(1j * t[..., :, None] * energies[..., None, :])[..., None, :]
+
+
+def floquet_basis_batch(H_static, H_drive, drive_freq, sample_phases, rtol=PROPAGATOR_RTOL,
+                        atol=PROPAGATOR_ATOL):
+    """
+    One propagator integration per batch gives quasi-energies, modes at
+    t = 0, modes at `sample_phases` and modes on the coupling-integral grid.
+    """
+    r_phases = rate_phases()
+    phases = np.union1d(np.union1d(sample_phases, r_phases), [1.0])
+    U = one_period_propagators(H_static, H_drive, drive_freq, phases, rtol=rtol, atol=atol)
+    T = (2 * np.pi) / np.asarray(drive_freq, dtype=float)
+    energies, modes_0 = floquet_decomposition(U[..., -1, :, :], T)
+    modes_0 = resolve_degenerate_modes(energies, modes_0, T, H_static)
+    modes_t = modes_at(U, modes_0, energies, phases, T)
+    return {
+        "T": T,
+        "modes_0": modes_0,
+        "energies": energies,
+        "sample_phases": np.asarray(sample_phases),
+        "sample_modes": modes_t[..., np.searchsorted(phases, sample_phases), :, :],
+        "rate_phases": r_phases,
+        "rate_modes": modes_t[..., np.searchsorted(phases, r_phases), :, :],
+    }
+
+
+def coupling_elements(rate_modes, r_phases, c_op, kmax=FLOQUET_KMAX):
+    """
+    Fourier components X[a, b, k] of <Phi_a(t)| c_op |Phi_b(t)> over one
+    period, shape (..., N, N, 2 * kmax + 1).
+    """
+    FF = np.swapaxes(rate_modes.conj(), -1, -2) @ c_op @ rate_modes
+    k = np.arange(-kmax, kmax + 1)
+    phase = np.exp(-2j * np.pi * np.outer(r_phases, k))
+    return np.einsum("...tab,tk->...abk", FF, phase) / len(r_phases)
+
+
+def sideband_detunings(energies, T, kmax=FLOQUET_KMAX):
+    omega = (2 * np.pi) / np.asarray(T, dtype=float)[..., None, None, None]
+    k = np.arange(-kmax, kmax + 1)
+    return energies[..., :, None, None] - energies[..., None, :, None] + k * omega
+
+
+def rate_matrix(X, Delta, spectral_density, w_th=0.0):
+    """
+    Floquet-Markov rate matrix A from coupling elements, detunings and the
+    noise spectrum J(Delta) evaluated on the same grid.
+    """
+    heaviside = (np.sign(Delta) + 1) / 2.0
+    Gamma = 2 * np.pi * heaviside * spectral_density * np.abs(X) ** 2
+    A = Gamma.sum(axis=-1)
+    if w_th > 0:
+        n_th = 1.0 / (np.exp(np.abs(Delta) / w_th) - 1.0)
+        A = A + (n_th * (Gamma + np.swapaxes(Gamma, -2, -3)[..., ::-1])).sum(axis=-1)
+    return A
+
+
+def master_equation_tensor(A):
+    """
+    Dense equivalent of qutip's floquet_master_equation_tensor acting on
+    column-stacked density matrices: populations follow the rate matrix,
+    coherences decay at the mean of the two total outgoing rates.
+    """
+    A = np.asarray(A, dtype=float)
+    N = A.shape[-1]
+    out_rates = A.sum(axis=-1)
+    R = np.zeros(A.shape[:-2] + (N * N, N * N), dtype=complex)
+    diag = np.arange(N)
+    pop = diag + N * diag
+    # d rho_ii = sum_j A_ji rho_jj - (sum_j A_ij - A_ii) rho_ii
+    R[..., pop[:, None], pop[None, :]] = np.swapaxes(A, -1, -2)
+    R[..., pop, pop] = A[..., diag, diag] - out_rates
+    i, j = np.where(~np.eye(N, dtype=bool))
+    R[..., i + N * j, i + N * j] = -0.5 * (out_rates[..., i] + out_rates[..., j])
+    return R
+
+
+def evolve_expectations(R, rho0_floquet, dt, n_steps, observables, sample_index):
+    """
+    Exact evolution rho(t + dt) = expm(R dt) rho(t) with lab-frame
+    expectation values reduced at every step.
+
+    observables: (B, O, P, N, N) operators already rotated into the Floquet
+    basis at each sampled offset. Returns (B, O, n_steps) expectations and
+    the final Floquet-basis density matrices (B, N, N).
+    """
+    batch, N = rho0_floquet.shape[0], rho0_floquet.shape[-1]
+    step = la.expm(R * np.asarray(dt, dtype=float).reshape(batch, 1, 1))
+    # <O> = Tr[O rho] = sum over vec index (i + N j) of O[j, i] rho[i, j]
+    weights = observables.reshape(observables.shape[:3] + (N * N,))
+    vec = np.swapaxes(rho0_floquet, -1, -2).reshape(batch, N * N, 1)
+    expectations = np.empty((batch, weights.shape[1], n_steps))
+    for t_idx in range(n_steps):
+        if t_idx:
+            vec = step @ vec
+        expectations[:, :, t_idx] = np.real(weights[:, :, sample_index[t_idx]] @ vec)[..., 0]
+    return expectations, np.swapaxes(vec.reshape(batch, N, N), -1, -2)
+
+
+def evolve_periodic(R, rho0_floquet, T, reduced_times, observables, sample_phases, sample_index):
+    """
+    Stroboscopic evolution that exploits the periodicity of the drive.
+
+    The Floquet-Markov generator is the same in every period, so one period
+    is propagated once: the maps expm(R tau) for the sampled offsets tau
+    (built by stepping between neighbouring offsets) and the one-period map
+    M = expm(R T). Each sample at t = n T + tau is then expm(R tau) M^n rho0.
+    The cost is one exponential per distinct offset plus one (N^2, N^2)
+    matrix-vector product per period, so it still grows with the number of
+    periods, but far more slowly than integrating through them.
+
+    reduced_times are t / T; the other arguments are as for
+    evolve_expectations. Returns (B, O, S) expectations and the final
+    Floquet-basis density matrices (B, N, N).
+    """
+    batch, N = rho0_floquet.shape[0], rho0_floquet.shape[-1]
+    T = np.broadcast_to(np.asarray(T, dtype=float), (batch,))
+    sample_phases = np.asarray(sample_phases, dtype=float)
+    n_samples = len(sample_index)
+    period_index = np.rint(np.asarray(reduced_times) - sample_phases[sample_index]).astype(int)
+
+    weights = observables.reshape(observables.shape[:3] + (N * N,))
+    vec0 = np.swapaxes(rho0_floquet, -1, -2).reshape(batch, N * N, 1)
+
+    # States at the period boundaries, M^n rho0 for n = 0..max.
+    one_period = la.expm(R * T[:, None, None])
+    boundary = [vec0]
+    for _ in range(period_index.max()):
+        boundary.append(one_period @ boundary[-1])
+    boundary = np.concatenate(boundary, axis=-1)  # (B, N*N, periods + 1)
+
+    # Maps to each offset, stepped from the previous offset.
+    increments = np.round(np.diff(np.concatenate([[0.0], sample_phases])), PHASE_DECIMALS)
+    unique_increments, increment_index = np.unique(increments, return_inverse=True)
+    steps = la.expm(R[:, None] * (unique_increments[None, :] * T[:, None])[..., None, None])
+
+    order = np.argsort(sample_index, kind="stable")
+    splits = np.searchsorted(sample_index[order], np.arange(1, len(sample_phases)))
+    expectations = np.empty((batch, weights.shape[1], n_samples))
+    offset_map = np.broadcast_to(np.eye(N * N, dtype=complex), R.shape)
+    final_vec = None
+    for offset, samples in enumerate(np.split(order, splits)):
+        offset_map = steps[:, increment_index[offset]] @ offset_map
+        states = offset_map @ boundary[..., period_index[samples]]
+        expectations[:, :, samples] = np.real(weights[:, :, offset] @ states)
+        if n_samples - 1 in samples:
+            final_vec = states[..., list(samples).index(n_samples - 1)]
+    return expectations, np.swapaxes(final_vec.reshape(batch, N, N), -1, -2)
+
+
+def hybrid_scores(times, data_A, data_B, final_rho):
+    """
+    Vectorized calculate_hybrid_score over a batch: times, data_A, data_B
+    are (B, S) and final_rho is (B, N, N) in the lab frame with |00> first.
+    """
+    dA = data_A - data_A.mean(axis=1, keepdims=True)
+    dB = data_B - data_B.mean(axis=1, keepdims=True)
+    dt = times - times.mean(axis=1, keepdims=True)
+    var_t = (dt ** 2).sum(axis=1)
+    avg_slope = ((dt * dA).sum(axis=1) / var_t + (dt * dB).sum(axis=1) / var_t) / 2.0
+    return _combined_scores(data_A, data_B, avg_slope, final_rho)
+
+
+def _combined_scores(data_A, data_B, avg_slope, final_rho):
+    # calculate_hybrid_score given the trend, which the steady state fixes
+    # at zero rather than fitting.
+    purity = np.real(np.einsum("bij,bji->b", final_rho, final_rho))
+    fidelity_score = np.real(final_rho[:, 0, 0])
+    final_score = (0.7 * fidelity_score + 0.3 * purity) * 100
+
+    avg_happiness = np.mean((data_A + data_B) / 2.0, axis=1)
+    avg_happiness_score = (avg_happiness + 1.0) * 50.0
+
+    dA = data_A - data_A.mean(axis=1, keepdims=True)
+    dB = data_B - data_B.mean(axis=1, keepdims=True)
+    denom = np.sqrt((dA ** 2).sum(axis=1) * (dB ** 2).sum(axis=1))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        correlation = np.where(denom > 0, (dA * dB).sum(axis=1) / denom, 0.0)
+    correlation_score = (correlation + 1.0) * 50.0
+
+    trend_score = (np.tanh(avg_slope * 6) + 1.0) * 50.0
+
+    volatility = (np.std(data_A, axis=1) + np.std(data_B, axis=1)) / 2.0
+    stability_score = np.exp(-1.6 * np.clip(volatility, 0.0, 1.5)) * 100.0
+
+    trajectory_score = (
+        0.45 * avg_happiness_score
+        + 0.2 * correlation_score
+        + 0.2 * stability_score
+        + 0.15 * trend_score
+    )
+    hybrid = 0.7 * trajectory_score + 0.3 * final_score
+    hybrid = 100.0 * np.power(np.clip(hybrid / 100.0, 0.0, 1.0), 0.85)
+    return np.clip(hybrid, 0.0, 100.0)
+
+
+# Entries of floquet_basis_batch that have no batch axis.
+_SHARED_FIELDS = ("sample_phases", "rate_phases")
+
+
+PROPAGATION_MODES = ("ode", "periodic")
+# Offsets per period at which the periodic steady state is sampled: the
+# coupling-integral grid, whose modes the Floquet setup computes anyway.
+STEADY_STATE_PHASES = FLOQUET_RATE_STEPS
+# Generator eigenvalues (and coherence decay rates) below this count as zero.
+STATIONARY_RATE_TOL = 1e-10
+
+
+def stationary_state(A, rho0_floquet):
+    """
+    Long-time limit of the Floquet-basis master equation of
+    master_equation_tensor, without integrating it.
+
+    Populations follow dp/dt = G p with G = A^T - diag(outgoing rates). The
+    zero eigenvalue of such a generator is never defective, so
+    p(inf) = R (L^H R)^-1 L^H p(0), with R and L its right and left null
+    vectors; when the rates connect all modes this is the unique
+    normalized solution of G p = 0. Coherences decay at the mean outgoing
+    rate of their two modes, so only those between modes without any
+    outgoing rate survive. Returns the states (B, N, N) and the slowest
+    non-zero relaxation rate (B,), inf when nothing relaxes.
+    """
+    A = np.asarray(A, dtype=float)
+    N = A.shape[-1]
+    out_rates = A.sum(axis=-1)
+    G = np.swapaxes(A, -1, -2) - out_rates[..., :, None] * np.eye(N)
+    scale = np.maximum(1.0, np.abs(G).max(axis=(-1, -2)))[..., None]
+    # Singular values come in descending order, so the null vectors are the
+    # trailing columns of both factors and pair up in L^H R.
+    U, singular, Vh = np.linalg.svd(G)
+    null = singular <= STATIONARY_RATE_TOL * scale
+    R = np.swapaxes(Vh, -1, -2) * null[..., None, :]
+    L = U * null[..., None, :]
+    projector = R @ np.linalg.pinv(np.swapaxes(L, -1, -2) @ R) @ np.swapaxes(L, -1, -2)
+    p0 = np.real(np.diagonal(rho0_floquet, axis1=-2, axis2=-1))
+    populations = np.einsum("...ij,...j->...i", projector, p0)
+
+    coherence_rates = 0.5 * (out_rates[..., :, None] + out_rates[..., None, :])
+    frozen = coherence_rates <= STATIONARY_RATE_TOL
+    rho = np.where(frozen, rho0_floquet, 0.0).astype(complex)
+    diag = np.arange(N)
+    rho[..., diag, diag] = populations
+
+    evals = np.linalg.eigvals(G)
+    rates = np.concatenate([
+        np.where(np.abs(evals) <= STATIONARY_RATE_TOL * scale, np.inf, np.abs(np.real(evals))),
+        np.where(frozen | np.eye(N, dtype=bool), np.inf, coherence_rates).reshape(A.shape[:-2] + (N * N,)),
+    ], axis=-1)
+    return rho, rates.min(axis=-1)
+
+
+def steady_state_batch(params_list, channels=ACTIVE_CHANNELS, phases=STEADY_STATE_PHASES):
+    """
+    Health scores of the periodic steady state reached after the transient,
+    for a batch of parameter dicts, with no time integration beyond the one
+    period of the Floquet setup.
+
+    The stationary Floquet-basis state gives the lab-frame state at every
+    offset of the period; the response <sz>(t) is then periodic, and its
+    mean, spread and A/B correlation over one period are the long-run
+    values of the trajectory statistics of calculate_hybrid_score, whose
+    fitted trend tends to zero. The final state is the one at a period
+    boundary, as for a run over whole periods.
+
+    This is the limit of run_simulation's score as `periods` grows. The
+    final state and the means agree with a finite run once it is several
+    relaxation times long (relaxation_periods, the slowest relaxation time
+    in drive periods). The spread and the A/B correlation converge more
+    slowly: a finite run's statistics also include the initial transient,
+    whose share of the variance falls only as 1/periods, so where the
+    steady-state ripple is small compared with the transient (weak drive,
+    strong noise) even 1000-period runs keep scoring differently. The
+    default 10-period score is dominated by the transient for most points;
+    use this to rank by long-run behaviour, not to predict that score.
+
+    Returns happiness_A/B over one period (B, phases), the phases, final
+    lab-frame states (B, 4, 4), relaxation_periods (B,; 0 where nothing
+    relaxes, as the state is then periodic from the start) and health
+    scores.
+    """
+    params_list = list(params_list)
+    batch = len(params_list)
+    keys = [hamiltonian_key_for(params) for params in params_list]
+    sample_phases = np.arange(phases) / phases
+    unique_keys = sorted(set(keys))
+    H_static, H_drive, drive_freq = hamiltonian_terms(unique_keys)
+    computed = floquet_basis_batch(H_static, H_drive, drive_freq, sample_phases)
+    positions = {key: i for i, key in enumerate(unique_keys)}
+    index = np.array([positions[key] for key in keys], dtype=int)
+
+    # Rates are linear in the white-noise level, so each channel's rate
+    # matrix at unit rate is built once per Hamiltonian and scaled per point.
+    Delta = sideband_detunings(computed["energies"], computed["T"])
+    A = np.zeros((batch, 4, 4))
+    for name, c_op in channels:
+        rates = np.array([param_value(params, name) for params in params_list])
+        X = coupling_elements(computed["rate_modes"], computed["rate_phases"], c_op)
+        A += rates[:, None, None] * rate_matrix(X, Delta, 1.0 / (2 * np.pi))[index]
+
+    T = computed["T"][index]
+    modes_0 = computed["modes_0"][index]
+    sample_modes = computed["sample_modes"][index]
+
+    rho0 = np.outer(PSI0, PSI0.conj())
+    rho0_floquet = modes_0.conj().transpose(0, 2, 1) @ rho0 @ modes_0
+    rho_floquet, slowest_rate = stationary_state(A, rho0_floquet)
+
+    # Lab-frame states over one period; offset 0 is the period boundary.
+    rho_lab = sample_modes @ rho_floquet[:, None] @ sample_modes.conj().transpose(0, 1, 3, 2)
+    happiness_A = np.real(np.einsum("ij,bpji->bp", SZ_A, rho_lab))
+    happiness_B = np.real(np.einsum("ij,bpji->bp", SZ_B, rho_lab))
+    final_rho = rho_lab[:, 0]
+    with np.errstate(divide="ignore"):
+        relaxation_periods = 1.0 / (slowest_rate * T)
+    return {
+        "phases": sample_phases,
+        "happiness_A": happiness_A,
+        "happiness_B": happiness_B,
+        "final_rho": final_rho,
+        "relaxation_periods": relaxation_periods,
+        "health_score": _combined_scores(happiness_A, happiness_B, np.zeros(batch), final_rho),
+    }
+
+
+def simulate_batch(params_list, periods=10, samples=200, channels=ACTIVE_CHANNELS, bases=None,
+                   propagation="ode"):
+    """
+    Runs the Qupid model for a batch of parameter dicts (same keys as
+    run_simulation). Parameter sets that share a Hamiltonian share one
+    propagator integration. `bases`, if given, maps Hamiltonian keys to
+    bases from floquet_basis_batch computed earlier for the same sampling.
+    propagation="ode" steps from sample to sample; "periodic" uses
+    evolve_periodic, which adds one matrix product per period.
+
+    Returns times (B, S), happiness_A/B (B, S), final lab-frame density
+    matrices (B, 4, 4) and health scores (B,).
+    """
+    params_list = list(params_list)
+    batch = len(params_list)
+    keys = [hamiltonian_key_for(params) for params in params_list]
+    # Every run samples the same reduced times, so one phase table serves all.
+    reduced_times = np.linspace(0.0, float(periods), samples)
+    sample_phases, sample_index = period_phases(reduced_times, 1.0)
+
+    # Precomputed bases are only usable if they were sampled at the same offsets.
+    bases = {
+        key: basis for key, basis in (bases or {}).items()
+        if np.array_equal(basis["sample_phases"], sample_phases)
+    }
+    missing = sorted(set(keys) - set(bases))
+    if missing:
+        H_static, H_drive, drive_freq = hamiltonian_terms(missing)
+        computed = floquet_basis_batch(H_static, H_drive, drive_freq, sample_phases)
+        for i, key in enumerate(missing):
+            bases[key] = {
+                name: (value if name in _SHARED_FIELDS else value[i])
+                for name, value in computed.items()
+            }
+
+    def stacked(name):
+        return np.stack([bases[key][name] for key in keys])
+
+    T = stacked("T")
+    energies = stacked("energies")
+    modes_0 = stacked("modes_0")
+    sample_modes = stacked("sample_modes")
+    r_phases = rate_phases()
+
+    Delta = sideband_detunings(energies, T)
+    A = np.zeros((batch, 4, 4))
+    rate_modes = stacked("rate_modes")
+    for name, c_op in channels:
+        rates = np.array([param_value(params, name) for params in params_list])
+        X = coupling_elements(rate_modes, r_phases, c_op)
+        # White noise: J(w) = rate / (2 pi) at every detuning.
+        A += rate_matrix(X, Delta, (rates / (2 * np.pi))[:, None, None, None])
+    R = master_equation_tensor(A)
+
+    rho0 = np.outer(PSI0, PSI0.conj())
+    rho0_floquet = modes_0.conj().transpose(0, 2, 1) @ rho0 @ modes_0
+    modes_h = sample_modes.conj().transpose(0, 1, 3, 2)
+    observables = np.stack([modes_h @ SZ_A @ sample_modes, modes_h @ SZ_B @ sample_modes], axis=1)
+
+    times = reduced_times[None, :] * T[:, None]
+    dt = times[:, 1] - times[:, 0] if samples > 1 else np.zeros(batch)
+    if propagation == "periodic":
+        expectations, final_floquet = evolve_periodic(
+            R, rho0_floquet, T, reduced_times, observables, sample_phases, sample_index
+        )
+    else:
+        expectations, final_floquet = evolve_expectations(
+            R, rho0_floquet, dt, samples, observables, sample_index
+        )
+    final_modes = sample_modes[:, sample_index[-1]]
+    final_rho = final_modes @ final_floquet @ final_modes.conj().transpose(0, 2, 1)
+
+    happiness_A = expectations[:, 0]
+    happiness_B = expectations[:, 1]
+    return {
+        "times": times,
+        "happiness_A": happiness_A,
+        "happiness_B": happiness_B,
+        "final_rho": final_rho,
+        "health_score": hybrid_scores(times, happiness_A, happiness_B, final_rho),
+    }
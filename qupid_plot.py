@@ -0,0 +1,114 @@
+import base64
+import hashlib
+import io
+import os
+
+import numpy as np
+
+from qupid_cache import LRUCache
+
+PLOT_DPI = 160
+PLOT_SIZE = (10, 6)
+PLOT_TITLE = "Relationship Dynamics with Periodic Effort (Floquet-Markov)"
+
+# The colors of matplotlib's "dark_background" style, applied per figure so
+# that rendering never touches the global rcParams (not safe across threads).
+DARK_STYLE = {
+    "face": "black",
+    "text": "white",
+    "grid_alpha": 0.5,
+}
+
+_plot_cache = LRUCache(
+    max_entries=int(os.environ.get("QUPID_PLOT_CACHE_ENTRIES", 256)),
+    max_bytes=int(os.environ.get("QUPID_PLOT_CACHE_BYTES", 32 * 1024 * 1024)),
+    size_fn=len,
+)
+# Trajectories behind plot ids that have not been rendered yet.
+_trajectory_cache = LRUCache(
+    max_entries=int(os.environ.get("QUPID_PLOT_TRAJECTORIES", 1024)),
+    max_bytes=int(os.environ.get("QUPID_PLOT_TRAJECTORY_BYTES", 64 * 1024 * 1024)),
+)
+
+
+def plot_id_for(tlist, happiness_A, happiness_B, dpi=PLOT_DPI):
+    """
+    Content hash of a trajectory. Identical results share one plot id, so
+    the PNG is rendered at most once per distinct result.
+    """
+    digest = hashlib.sha256()
+    for values in (tlist, happiness_A, happiness_B):
+        digest.update(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    digest.update(str(dpi).encode("ascii"))
+    return digest.hexdigest()[:32]
+
+
+def render_dynamics_png(tlist, happiness_A, happiness_B, dpi=PLOT_DPI):
+    """
+    Renders the happiness trajectories to PNG bytes with the object-oriented
+    Figure/Agg API. Each call owns its figure, so renders can run from
+    several threads at once. matplotlib is imported on first use.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=PLOT_SIZE, facecolor=DARK_STYLE["face"])
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.set_facecolor(DARK_STYLE["face"])
+    ax.plot(tlist, happiness_A, label="Person A", color="#00FFFF", linewidth=2)
+    ax.plot(tlist, happiness_B, label="Person B", color="#FF00FF", linewidth=2, linestyle="--")
+    ax.axhline(0, color=DARK_STYLE["text"], linestyle=":", alpha=DARK_STYLE["grid_alpha"])
+    ax.set_title(PLOT_TITLE, color=DARK_STYLE["text"])
+    ax.set_ylim(-1.1, 1.1)
+    ax.tick_params(colors=DARK_STYLE["text"])
+    for spine in ax.spines.values():
+        spine.set_color(DARK_STYLE["text"])
+    legend = ax.legend(loc="upper right", facecolor=DARK_STYLE["face"], edgecolor=DARK_STYLE["text"])
+    for text in legend.get_texts():
+        text.set_color(DARK_STYLE["text"])
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=dpi, bbox_inches="tight", facecolor=fig.get_facecolor())
+    return buffer.getvalue()
+
+
+def register_trajectory(tlist, happiness_A, happiness_B):
+    """
+    Remembers a trajectory for deferred rendering and returns its plot id.
+    """
+    plot_id = plot_id_for(tlist, happiness_A, happiness_B)
+    _trajectory_cache.put(plot_id, (
+        np.asarray(tlist, dtype=np.float64),
+        np.asarray(happiness_A, dtype=np.float64),
+        np.asarray(happiness_B, dtype=np.float64),
+    ))
+    return plot_id
+
+
+def plot_png(plot_id):
+    """
+    PNG bytes for a registered plot id, rendered on first request and cached
+    afterwards. Returns None for unknown or evicted ids.
+    """
+    png = _plot_cache.get(plot_id)
+    if png is not None:
+        return png
+    trajectory = _trajectory_cache.get(plot_id)
+    if trajectory is None:
+        return None
+    png = render_dynamics_png(*trajectory)
+    _plot_cache.put(plot_id, png)
+    return png
+
+
+def plot_base64(tlist, happiness_A, happiness_B):
+    """
+    Inline PNG for callers that still want the image embedded in the result.
+    """
+    png = plot_png(register_trajectory(tlist, happiness_A, happiness_B))
+    return base64.b64encode(png).decode("utf-8")
+
+
+def plot_cache_stats():
+    return {"png": _plot_cache.stats(), "pending": _trajectory_cache.stats()}
@@ -0,0 +1,303 @@
+"""
+Instant-preview surrogate for the Qupid health score.
+
+An offline build samples the slider space, evolves every sample with the
+batched NumPy engine and fits a random-Fourier-feature ridge regression
+that maps the model parameters to the health score and a coarse
+trajectory. The fit is saved as a versioned .npz artifact together with
+its accuracy on held-out exact runs; a prediction takes about 0.1 ms,
+so the API can answer slider changes before the full
+Floquet-Markov solve finishes. The fit is rough (held-out score MAE about
+5 points, 95th percentile about 16), so every prediction carries that
+error and the score range it implies.
+
+Only parameters that can change the result are used as inputs: the
+Hamiltonian fields and the rates of ACTIVE_CHANNELS.
+
+    python qupid_surrogate.py build [--samples N] [--holdout M] [--out PATH] [--if-needed]
+    python qupid_surrogate.py report [--holdout M] [--path PATH]
+"""
+import argparse
+import functools
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from qupid_floquet_engine import ACTIVE_CHANNELS, HAMILTONIAN_FIELDS, param_value, simulate_batch
+from qupid_time_dependent_floquet import MODEL_VERSION, build_simulation_args
+
+# Bump when the artifact layout changes; older files are then refused.
+SURROGATE_FORMAT = 1
+SURROGATE_FIELDS = HAMILTONIAN_FIELDS + tuple(name for name, _ in ACTIVE_CHANNELS)
+PREVIEW_POINTS = 21
+PREVIEW_PERIODS = 10
+SLIDER_FIELDS = (
+    "personATemperarment", "personBTemperarment", "mutualEmpathy", "mutualCompatability",
+    "mutualStrength", "mutualFrequency", "personAHotCold", "personADistant", "personABurnedOut",
+    "personBHotCold", "personBDistant", "personBBurnedOut", "mutualSync", "mutualCodependence",
+)
+# A zero drive frequency has no period, so sampling starts just above it.
+MIN_FREQUENCY_SLIDER = 5
+# `report` fails when held-out error grows past this many score points.
+MAX_SCORE_MAE = 8.0
+DEFAULT_ARTIFACT = os.environ.get(
+    "QUPID_SURROGATE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "artifacts", "qupid_surrogate.npz"),
+)
+
+
+def sample_slider_payloads(n, seed=0):
+    """
+    `n` slider payloads drawn uniformly from the integer 0-100 UI range.
+    """
+    rng = np.random.default_rng(seed)
+    values = rng.integers(0, 101, size=(n, len(SLIDER_FIELDS)))
+    values[:, SLIDER_FIELDS.index("mutualFrequency")] = rng.integers(MIN_FREQUENCY_SLIDER, 101, size=n)
+    return [dict(zip(SLIDER_FIELDS, map(int, row))) for row in values]
+
+
+def parameter_matrix(params_list):
+    return np.array([[param_value(params, name) for name in SURROGATE_FIELDS] for params in params_list])
+
+
+def surrogate_features(P):
+    """
+    Model inputs plus the log drive frequency. The run spans ten periods,
+    so the score depends on the frequency roughly logarithmically; ratios
+    like 1/freq made the fit blow up at the slow end of the range.
+    """
+    freq = np.maximum(P[:, SURROGATE_FIELDS.index("drive_freq")], MIN_FREQUENCY_SLIDER / 100.0)
+    return np.column_stack([P, np.log(freq)])
+
+
+def exact_targets(params_list, batch_size=250):
+    """
+    Health scores and trajectories (resampled to PREVIEW_POINTS) from the
+    NumPy engine, which matches the qutip backend to within 1e-3 points.
+    Returns a (len(params_list), 1 + 2 * PREVIEW_POINTS) array.
+    """
+    coarse = np.linspace(0.0, 1.0, PREVIEW_POINTS)
+    rows = []
+    for start in range(0, len(params_list), batch_size):
+        batch = simulate_batch(params_list[start:start + batch_size], periods=PREVIEW_PERIODS)
+        fine = np.linspace(0.0, 1.0, batch["times"].shape[1])
+        for score, data_A, data_B in zip(batch["health_score"], batch["happiness_A"], batch["happiness_B"]):
+            rows.append(np.concatenate([[score], np.interp(coarse, fine, data_A), np.interp(coarse, fine, data_B)]))
+    return np.array(rows)
+
+
+class Surrogate:
+    """
+    Fitted random-Fourier-feature model. `arrays` holds the feature scaling,
+    the random projection and the ridge weights; `meta` the version and
+    accuracy information written by build().
+    """
+
+    def __init__(self, arrays, meta):
+        self.arrays = arrays
+        self.meta = meta
+        self._mean = arrays["feature_mean"]
+        self._scale = arrays["feature_scale"]
+        self._projection = arrays["projection"]
+        self._phase = arrays["phase"]
+        self._weights = arrays["weights"]
+        self._offset = arrays["target_mean"]
+
+    @property
+    def stale(self):
+        """
+        True when the simulation code has changed since the artifact was built.
+        """
+        return self.meta.get("model_version") != MODEL_VERSION
+
+    def predict_matrix(self, P):
+        Z = (surrogate_features(P) - self._mean) / self._scale
+        phi = np.cos(Z @ self._projection + self._phase)
+        return phi @ self._weights + self._offset
+
+    def predict(self, params):
+        """
+        Approximate health score and coarse trajectory for one parameter dict
+        (same keys as run_simulation). `score_error` is the held-out error
+        measured at build time and `score_range` the score +- its 95th
+        percentile, which holds the exact score in 95% of held-out runs.
+        """
+        P = parameter_matrix([params or {}])
+        out = self.predict_matrix(P)[0]
+        T = 2 * np.pi / max(P[0, SURROGATE_FIELDS.index("drive_freq")], MIN_FREQUENCY_SLIDER / 100.0)
+        score = float(np.clip(out[0], 0.0, 100.0))
+        prediction = {
+            "health_score": score,
+            "trajectory": {
+                "t": np.linspace(0.0, PREVIEW_PERIODS * T, PREVIEW_POINTS).tolist(),
+                "happiness_A": np.clip(out[1:1 + PREVIEW_POINTS], -1.0, 1.0).tolist(),
+                "happiness_B": np.clip(out[1 + PREVIEW_POINTS:], -1.0, 1.0).tolist(),
+            },
+        }
+        accuracy = self.meta.get("accuracy") or {}
+        if "score_p95" in accuracy:
+            prediction["score_error"] = {"mae": accuracy["score_mae"], "p95": accuracy["score_p95"]}
+            prediction["score_range"] = [
+                max(0.0, score - accuracy["score_p95"]), min(100.0, score + accuracy["score_p95"]),
+            ]
+        return prediction
+
+    def info(self):
+        return {
+            "format": self.meta.get("format"),
+            "model_version": self.meta.get("model_version"),
+            "built_at": self.meta.get("built_at"),
+            "stale": self.stale,
+            "accuracy": self.meta.get("accuracy"),
+        }
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, meta=np.array(json.dumps(self.meta)), **self.arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta.get("format") != SURROGATE_FORMAT:
+                raise ValueError(f"surrogate format {meta.get('format')} is not {SURROGATE_FORMAT}; rebuild it")
+            arrays = {name: data[name] for name in data.files if name != "meta"}
+        return cls(arrays, meta)
+
+
+def fit(P, targets, components=1024, gamma=0.1, ridge=0.1, seed=0):
+    """
+    Ridge regression on random Fourier features of the standardized
+    inputs, i.e. a Gaussian-kernel fit with a fixed, small model size.
+    """
+    rng = np.random.default_rng(seed)
+    features = surrogate_features(P)
+    mean = features.mean(axis=0)
+    scale = features.std(axis=0)
+    scale[scale == 0] = 1.0
+    Z = (features - mean) / scale
+    projection = rng.normal(scale=np.sqrt(2.0 * gamma), size=(Z.shape[1], components))
+    phase = rng.uniform(0.0, 2 * np.pi, size=components)
+    phi = np.cos(Z @ projection + phase)
+    target_mean = targets.mean(axis=0)
+    weights = np.linalg.solve(phi.T @ phi + ridge * np.eye(components), phi.T @ (targets - target_mean))
+    return {
+        "feature_mean": mean,
+        "feature_scale": scale,
+        "projection": projection,
+        "phase": phase,
+        "weights": weights,
+        "target_mean": target_mean,
+    }
+
+
+def accuracy_report(surrogate, P, targets):
+    """
+    Error of the surrogate against exact targets for the same inputs.
+    """
+    predicted = surrogate.predict_matrix(P)
+    score_error = np.abs(np.clip(predicted[:, 0], 0.0, 100.0) - targets[:, 0])
+    trajectory_error = np.abs(np.clip(predicted[:, 1:], -1.0, 1.0) - targets[:, 1:])
+    return {
+        "samples": int(len(P)),
+        "score_mae": round(float(score_error.mean()), 3),
+        "score_p95": round(float(np.percentile(score_error, 95)), 3),
+        "score_max": round(float(score_error.max()), 3),
+        "trajectory_mae": round(float(trajectory_error.mean()), 4),
+    }
+
+
+def _exact_dataset(n, seed):
+    params_list = [build_simulation_args(payload) for payload in sample_slider_payloads(n, seed)]
+    return parameter_matrix(params_list), exact_targets(params_list)
+
+
+def build(samples=5000, holdout=1000, seed=0, path=DEFAULT_ARTIFACT, log=print):
+    """
+    Samples the slider space, fits the surrogate, scores it on `holdout`
+    separate exact runs and writes the artifact to `path`.
+    """
+    start = time.perf_counter()
+    P, targets = _exact_dataset(samples, seed)
+    P_test, targets_test = _exact_dataset(holdout, seed + 1)
+    log(f"simulated {samples + holdout} points in {time.perf_counter() - start:.1f}s")
+
+    surrogate = Surrogate(fit(P, targets, seed=seed), {})
+    surrogate.meta = {
+        "format": SURROGATE_FORMAT,
+        "model_version": MODEL_VERSION,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "fields": list(SURROGATE_FIELDS),
+        "training_samples": samples,
+        "seed": seed,
+        "accuracy": accuracy_report(surrogate, P_test, targets_test),
+    }
+    surrogate.save(path)
+    log(f"wrote {path}: {json.dumps(surrogate.meta['accuracy'])}")
+    return surrogate
+
+
+def artifact_is_current(path=DEFAULT_ARTIFACT):
+    """
+    True when `path` holds a readable surrogate of this format built from
+    the current simulation code, so a deploy can skip rebuilding it.
+    """
+    try:
+        return not Surrogate.load(path).stale
+    except (OSError, ValueError, KeyError):
+        return False
+
+
+@functools.lru_cache(maxsize=None)
+def load_surrogate(path=DEFAULT_ARTIFACT):
+    """
+    The surrogate at `path`, loaded once per process; None when it has not
+    been built.
+    """
+    if not os.path.exists(path):
+        return None
+    return Surrogate.load(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or check the Qupid preview surrogate.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_cmd = commands.add_parser("build")
+    build_cmd.add_argument("--samples", type=int, default=5000)
+    build_cmd.add_argument("--holdout", type=int, default=1000)
+    build_cmd.add_argument("--seed", type=int, default=0)
+    build_cmd.add_argument("--out", default=DEFAULT_ARTIFACT)
+    build_cmd.add_argument(
+        "--if-needed", action="store_true",
+        help="only build when the artifact is missing, unreadable or stale",
+    )
+    report_cmd = commands.add_parser("report")
+    report_cmd.add_argument("--holdout", type=int, default=500)
+    report_cmd.add_argument("--seed", type=int, default=12345)
+    report_cmd.add_argument("--path", default=DEFAULT_ARTIFACT)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        if args.if_needed and artifact_is_current(args.out):
+            print(f"{args.out} is current; not rebuilding")
+            return 0
+        build(args.samples, args.holdout, args.seed, args.out)
+        return 0
+
+    # Re-checks a stored artifact against fresh exact runs with the current code.
+    surrogate = Surrogate.load(args.path)
+    accuracy = accuracy_report(surrogate, *_exact_dataset(args.holdout, args.seed))
+    print(json.dumps({"built": surrogate.info(), "current": accuracy}, indent=2))
+    if accuracy["score_mae"] > MAX_SCORE_MAE:
+        print(f"score MAE {accuracy['score_mae']} exceeds {MAX_SCORE_MAE}; rebuild the surrogate")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
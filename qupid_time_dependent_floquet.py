@@ -1,10 +1,335 @@
 import base64
+import functools
+import hashlib
+import importlib.metadata
 import io
+import json
+import os
+import time
 import numpy as np
-import matplotlib
-import matplotlib.pyplot as plt
-import qutip as qt
-from qutip import *
+
+import qupid_floquet_engine
+from qupid_cache import LRUCache, PickleDirStore, SQLiteStore, data_path
+from qupid_plot import plot_base64, register_trajectory, render_dynamics_png
+from qupid_floquet_engine import (
+    DEFAULT_PARAMS,
+    FLOQUET_KEY_DECIMALS,
+    FLOQUET_KMAX,
+    FLOQUET_RATE_STEPS,
+    HAMILTONIAN_FIELDS,
+    PROPAGATION_MODES,
+    PROPAGATOR_ATOL,
+    PROPAGATOR_RTOL,
+    coupling_elements,
+    evolve_periodic,
+    floquet_basis_batch,
+    hamiltonian_key_for,
+    hamiltonian_terms,
+    param_value,
+    period_phases,
+    rate_matrix,
+    sideband_detunings,
+    simulate_batch,
+    steady_state_batch,
+)
+
+_floquet_cache = LRUCache(
+    max_entries=int(os.environ.get("QUPID_FLOQUET_CACHE_ENTRIES", 64)),
+    max_bytes=int(os.environ.get("QUPID_FLOQUET_CACHE_BYTES", 256 * 1024 * 1024)),
+    store=PickleDirStore(
+        os.environ["QUPID_FLOQUET_CACHE_DIR"],
+        max_bytes=int(os.environ.get("QUPID_FLOQUET_CACHE_DIR_BYTES", 1024 * 1024 * 1024)),
+        ttl=float(os.environ.get("QUPID_FLOQUET_CACHE_DIR_TTL", 7 * 24 * 3600)),
+    ) if os.environ.get("QUPID_FLOQUET_CACHE_DIR") else None,
+)
+
+SIMULATION_BACKENDS = ("qutip", "numpy")
+MAX_PERIODS = 1000
+MAX_SAMPLES = 20000
+
+# Solver settings per quality preset. `samples` is the time resolution of
+# the trajectory, which dominates the accuracy of the score (its error falls
+# as 1/samples); the propagator tolerances govern the Floquet setup and the
+# ODE ones the qutip solve. "standard" is what every run used before presets.
+QUALITY_PRESETS = {
+    "draft": {
+        "samples": 100, "propagator_rtol": 1e-6, "propagator_atol": 1e-8, "ode_rtol": 1e-4, "ode_atol": 1e-6,
+    },
+    "standard": {
+        "samples": 200, "propagator_rtol": PROPAGATOR_RTOL, "propagator_atol": PROPAGATOR_ATOL,
+        "ode_rtol": 1e-6, "ode_atol": 1e-8,
+    },
+    "precise": {
+        "samples": 1000, "propagator_rtol": 1e-12, "propagator_atol": 1e-14, "ode_rtol": 1e-8, "ode_atol": 1e-10,
+    },
+}
+# "adaptive" refines the sample count until the estimated error of the score
+# is within `tolerance` points, and that of the trajectory statistics within
+# tolerance * ADAPTIVE_STATS_PER_POINT, starting from the draft resolution. A
+# unit change in any statistic moves the score by at most about 20 points.
+QUALITY_MODES = tuple(QUALITY_PRESETS) + ("adaptive",)
+ADAPTIVE_TOLERANCE = 0.05
+ADAPTIVE_STATS_PER_POINT = 0.05
+ADAPTIVE_MAX_SAMPLES = 6400
+
+# Bump when results change in a way the source digest below cannot see.
+SIMULATION_MODEL_VERSION = 1
+
+def _model_version():
+    # Cached results are keyed by this, so editing the simulation code or
+    # upgrading the numerical stack invalidates them automatically.
+    digest = hashlib.sha256()
+    for module_file in (__file__, qupid_floquet_engine.__file__):
+        with open(module_file, "rb") as handle:
+            digest.update(handle.read())
+    for package in ("qutip", "numpy", "scipy"):
+        try:
+            digest.update(f"{package}={importlib.metadata.version(package)}".encode("utf-8"))
+        except importlib.metadata.PackageNotFoundError:
+            pass
+    return f"{SIMULATION_MODEL_VERSION}-{digest.hexdigest()[:12]}"
+
+MODEL_VERSION = _model_version()
+
+_result_db = os.environ.get("QUPID_RESULT_CACHE_DB", data_path("results.sqlite3"))
+_result_cache = LRUCache(
+    max_entries=int(os.environ.get("QUPID_RESULT_CACHE_ENTRIES", 1024)),
+    max_bytes=int(os.environ.get("QUPID_RESULT_CACHE_BYTES", 64 * 1024 * 1024)),
+    store=SQLiteStore(
+        _result_db,
+        max_bytes=int(os.environ.get("QUPID_RESULT_CACHE_DB_BYTES", 256 * 1024 * 1024)),
+        ttl=float(os.environ.get("QUPID_RESULT_CACHE_TTL", 7 * 24 * 3600)),
+    ) if _result_db else None,
+)
+
+@functools.lru_cache(maxsize=None)
+def qutip_operators():
+    """
+    The model's fixed two-qubit operators and states, built once per process.
+    qutip is imported here on first use rather than with this module, so
+    importing the module (or using only the numpy backend) stays cheap.
+    """
+    from qutip import basis, qeye, sigmam, sigmax, sigmay, sigmaz, tensor
+
+    I = qeye(2)
+    return {
+        # Acts on A, leaves B alone
+        "sx_A": tensor(sigmax(), I),  # Hot/Cold Partner, Bit flip A
+        "sz_A": tensor(sigmaz(), I),  # Cold shoulder partner, Dephase A
+        "sm_A": tensor(sigmam(), I),  # Burnt out partner, Decay A
+        # Leaves A alone, acts on B
+        "sx_B": tensor(I, sigmax()),
+        "sz_B": tensor(I, sigmaz()),
+        "sm_B": tensor(I, sigmam()),
+        # Things that affect BOTH simultaneously
+        "sz_A_B": tensor(sigmaz(), sigmaz()),  # Growing apart partners, Anti-correlated Dephase A/B
+        "sm_A_B": tensor(sigmam(), sigmam()),  # Codepedent downward spiral partners, Collective Decay A/B
+        # Creates the "Swap" interaction
+        "sy_A": tensor(sigmay(), I),
+        "sy_B": tensor(I, sigmay()),
+        "psi0": tensor(basis(2, 0), basis(2, 0)),
+        "ideal_state": tensor(basis(2, 0), basis(2, 0)),
+    }
+
+def floquet_cache_stats():
+    """
+    Hit/miss counters and current size of the Floquet basis cache.
+    """
+    return _floquet_cache.stats()
+
+def clear_floquet_cache():
+    _floquet_cache.clear()
+
+def result_cache_stats():
+    """
+    Hit/miss counters of the run_simulation result cache, both tiers.
+    """
+    return dict(_result_cache.stats(), model_version=MODEL_VERSION)
+
+def clear_result_cache(disk=False):
+    _result_cache.clear(disk=disk)
+
+def result_cache_key(params, backend="qutip", periods=10, samples=200, propagation="ode",
+                     quality="standard", tolerance=None):
+    """
+    Content address of a run_simulation result: a SHA-256 over the 14 model
+    parameters (quantized like the Hamiltonian key), the solver settings and
+    MODEL_VERSION.
+    """
+    canonical = {
+        "model": MODEL_VERSION,
+        "params": {
+            name: round(param_value(params or {}, name), FLOQUET_KEY_DECIMALS)
+            for name in sorted(DEFAULT_PARAMS)
+        },
+        "backend": backend,
+        "periods": int(periods),
+        "samples": None if samples is None else int(samples),
+        "propagation": propagation,
+        "quality": quality,
+    }
+    if quality == "adaptive":
+        canonical["tolerance"] = float(tolerance or ADAPTIVE_TOLERANCE)
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True).encode("utf-8")).hexdigest()
+
+def floquet_stage(H_static, H_drive, drive_freq, tlist, key=None, rtol=PROPAGATOR_RTOL,
+                  atol=PROPAGATOR_ATOL):
+    """
+    The single Floquet setup step of the pipeline.
+
+    One integration of the propagator over a period (to rtol/atol) yields U(T), whose
+    eigendecomposition gives the modes and quasi-energies (same conventions
+    as qutip's floquet_modes), plus the modes at every offset needed by the
+    rate integral and by the lab-frame transform of `tlist`.
+
+    Returns a dict of arrays; mode arrays hold the kets as columns. When
+    `key` (the quantized Hamiltonian parameters) is given, the result is
+    cached, so runs that only change noise rates reuse it.
+    """
+    T = (2 * np.pi) / drive_freq
+    sample_phases, sample_index = period_phases(tlist, T)
+
+    def compute():
+        return floquet_basis_batch(H_static, H_drive, drive_freq, sample_phases, rtol=rtol, atol=atol)
+
+    if key is None:
+        stage = compute()
+    else:
+        grid = (len(sample_phases), float(sample_phases.sum()), FLOQUET_RATE_STEPS, rtol, atol)
+        stage = _floquet_cache.get_or_compute(("floquet",) + tuple(key) + grid, compute)
+    return stage, sample_index
+
+def floquet_markov_rates(stage, c_op, spectrum, w_th=0.0, kmax=FLOQUET_KMAX):
+    """
+    Rate matrix A of the Floquet-Markov master equation for one collapse
+    operator; a vectorized equivalent of qutip's
+    floquet_master_equation_rates using the modes from `floquet_stage`.
+    """
+    c_op = c_op.full() if hasattr(c_op, "full") else np.asarray(c_op)
+    X = coupling_elements(stage["rate_modes"], stage["rate_phases"], c_op, kmax)
+    Delta = sideband_detunings(stage["energies"], stage["T"], kmax)
+    J = np.vectorize(spectrum, otypes=[float])(Delta)
+    return rate_matrix(X, Delta, J, w_th)
+
+def lab_frame_observables(stage, operators):
+    """
+    Operators expressed in the Floquet basis at each sampled offset,
+    stacked as (len(operators), offsets, N, N), so that
+    <O>(t) = Tr[O_f(t) rho_floquet(t)].
+    """
+    modes = stage["sample_modes"]
+    return np.stack([
+        modes.conj().transpose(0, 2, 1) @ np.asarray(op.full() if hasattr(op, "full") else op) @ modes
+        for op in operators
+    ])
+
+def floquet_markov_expectations(R, rho0_floquet, tlist, stage, sample_index, operators,
+                                options=None, chunk_size=256):
+    """
+    Integrates the Floquet-Markov master equation (same integrator and
+    defaults as qutip's floquet_markov_mesolve) and reduces each state to
+    lab-frame expectation values on the fly.
+
+    States are written into a fixed (chunk_size, N, N) buffer that is
+    reduced with batched array operations whenever it fills, so memory
+    does not grow with len(tlist). Returns the (len(operators), len(tlist))
+    expectation array and the final lab-frame density matrix.
+    """
+    import scipy.integrate
+    from qutip import Options, Qobj
+    from qutip.cy.spmatfuncs import cy_ode_rhs
+
+    opt = options or Options()
+    dim = rho0_floquet.shape[0]
+    n_steps = len(tlist)
+    observables = lab_frame_observables(stage, operators)
+    expectations = np.zeros((len(operators), n_steps))
+    buffer = np.empty((min(chunk_size, n_steps), dim, dim), dtype=complex)
+
+    def flush(stop, count):
+        start = stop - count
+        obs = observables[:, sample_index[start:stop]]
+        expectations[:, start:stop] = np.real(
+            np.einsum("oxij,xji->ox", obs, buffer[:count])
+        )
+
+    if isinstance(R, Qobj):
+        if opt.tidy:
+            R.tidyup()
+        R_data = R.data
+    else:
+        R_data = R
+    r = scipy.integrate.ode(cy_ode_rhs)
+    r.set_f_params(R_data.data, R_data.indices, R_data.indptr)
+    r.set_integrator("zvode", method=opt.method, order=opt.order,
+                     atol=opt.atol, rtol=opt.rtol, max_step=opt.max_step)
+    r.set_initial_value(np.asarray(rho0_floquet, dtype=complex).ravel(order="F"), tlist[0])
+
+    dt = tlist[1] - tlist[0] if n_steps > 1 else 0.0
+    filled = 0
+    for t_idx in range(n_steps):
+        if not r.successful():
+            raise RuntimeError("Floquet-Markov integration failed")
+        # qutip stacks density matrices column-wise.
+        buffer[filled] = r.y.reshape(dim, dim).T
+        filled += 1
+        if filled == len(buffer):
+            flush(t_idx + 1, filled)
+            final_rho = buffer[filled - 1].copy()
+            filled = 0
+        if t_idx + 1 < n_steps:
+            r.integrate(r.t + dt)
+    if filled:
+        flush(n_steps, filled)
+        final_rho = buffer[filled - 1].copy()
+
+    final_modes = stage["sample_modes"][sample_index[-1]]
+    final_rho_lab = final_modes @ final_rho @ final_modes.conj().T
+    return expectations, final_rho_lab
+
+def to_unit(value):
+    try:
+        return float(value) / 100.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def build_simulation_args(payload):
+    omega_A = to_unit(payload.get("personATemperarment"))
+    omega_B = to_unit(payload.get("personBTemperarment"))
+    J_empathy = to_unit(payload.get("mutualEmpathy"))
+    J_compatability = to_unit(payload.get("mutualCompatability"))
+    drive_amplitude = to_unit(payload.get("mutualStrength"))
+    drive_freq = to_unit(payload.get("mutualFrequency"))
+
+    rate_bit_flip_A = to_unit(payload.get("personAHotCold"))
+    rate_dephase_A = to_unit(payload.get("personADistant"))
+    rate_decay_A = to_unit(payload.get("personABurnedOut"))
+
+    rate_bit_flip_B = to_unit(payload.get("personBHotCold"))
+    rate_dephase_B = to_unit(payload.get("personBDistant"))
+    rate_decay_B = to_unit(payload.get("personBBurnedOut"))
+
+    mutual_sync = payload.get("mutualSync", 0)
+    rate_anti_corr = to_unit(100 - float(mutual_sync or 0))
+    rate_coll_decay = to_unit(payload.get("mutualCodependence"))
+
+    return {
+        "omega_A": omega_A,
+        "omega_B": omega_B,
+        "J_empathy": J_empathy,
+        "J_compatability": J_compatability,
+        "drive_amplitude": drive_amplitude,
+        "drive_freq": drive_freq,
+        "rate_bit_flip_A": rate_bit_flip_A,
+        "rate_dephase_A": rate_dephase_A,
+        "rate_decay_A": rate_decay_A,
+        "rate_bit_flip_B": rate_bit_flip_B,
+        "rate_dephase_B": rate_dephase_B,
+        "rate_decay_B": rate_decay_B,
+        "rate_anti_corr": rate_anti_corr,
+        "rate_coll_decay": rate_coll_decay,
+    }
 
 def calculate_health_score(final_rho):
     """
@@ -17,7 +342,8 @@ def calculate_health_score(final_rho):
     
     # 2. Fidelity: How close are we to the 'Ideal' state (|00>)?
     # We define ideal as tensor(basis(2,0), basis(2,0))
-    ideal_state = tensor(basis(2,0), basis(2,0))
+    from qutip import fidelity
+    ideal_state = qutip_operators()["ideal_state"]
     fidelity_score = fidelity(final_rho, ideal_state)**2 # Probability of finding them in ideal state
     
     # Weighted Score: 70% based on being Happy (Fidelity), 30% on Clarity (Purity)
@@ -110,50 +436,113 @@ def generate_horoscope(times, data_A, data_B, score):
 
     return "\n".join(narrative)
 
-def run_simulation(params=None, render_plot=True):
-    params = params or {}
-
-    # --- 1. Define The Operators ---
-    I = qeye(2)
+def _no_progress(stage):
+    pass
+
+def _simulate_dynamics_numpy(params, progress, periods, samples, propagation, preset):
+    progress("floquet_setup")
+    key = hamiltonian_key_for(params)
+    H_static, H_drive, drive_freq = hamiltonian_terms([key])
+    T = (2 * np.pi) / drive_freq[0]
+    # Same sampling as the qutip path, so both backends share cached bases.
+    tlist = np.linspace(0.0, periods * T, samples)
+    stage, _ = floquet_stage(
+        H_static[0], H_drive[0], drive_freq[0], tlist, key=key,
+        rtol=preset["propagator_rtol"], atol=preset["propagator_atol"],
+    )
+    progress("solve")
+    batch = simulate_batch(
+        [params], periods=periods, samples=samples, bases={key: stage}, propagation=propagation
+    )
+    progress("scoring")
+    from qutip import Qobj
+    return {
+        "tlist": batch["times"][0],
+        "happiness_A": batch["happiness_A"][0],
+        "happiness_B": batch["happiness_B"][0],
+        "final_rho": Qobj(batch["final_rho"][0], dims=[[2, 2], [2, 2]]),
+        "health_score": float(batch["health_score"][0]),
+    }
 
-    # Acts on A, leaves B alone
-    sx_A = tensor(sigmax(), I)  # Hot/Cold Partner, Bit flip A
-    sz_A = tensor(sigmaz(), I)  # Cold shoulder partner, Dephase A
-    sm_A = tensor(sigmam(), I)  # Burnt out partner, Decay A
+def validate_simulation_options(backend="qutip", periods=10, samples=200, propagation="ode",
+                                quality="standard", tolerance=None):
+    """
+    Raises ValueError for settings simulate_dynamics cannot run, so callers
+    can reject a request before queueing it. samples=None stands for the
+    quality preset's default.
+    """
+    if backend not in SIMULATION_BACKENDS:
+        raise ValueError(f"unknown backend '{backend}'; expected one of {SIMULATION_BACKENDS}")
+    if propagation not in PROPAGATION_MODES:
+        raise ValueError(f"unknown propagation '{propagation}'; expected one of {PROPAGATION_MODES}")
+    if quality not in QUALITY_MODES:
+        raise ValueError(f"unknown quality '{quality}'; expected one of {QUALITY_MODES}")
+    if tolerance is not None and not float(tolerance) > 0:
+        raise ValueError("tolerance must be a positive number of health-score points")
+    if not 1 <= int(periods) <= MAX_PERIODS or (samples is not None and not 2 <= int(samples) <= MAX_SAMPLES):
+        raise ValueError(f"periods must be in [1, {MAX_PERIODS}] and samples in [2, {MAX_SAMPLES}]")
+
+
+def validate_simulation_params(params):
+    """
+    Raises ValueError for parameters simulate_dynamics cannot run: without
+    a drive frequency above 0 (after the Floquet cache's rounding) there is
+    no period to propagate over.
+    """
+    if not hamiltonian_key_for(params or {})[-1] > 0:
+        raise ValueError("mutualFrequency must be above 0")
 
-    # Leaves A alone, acts on B
-    sx_B = tensor(I, sigmax())
-    sz_B = tensor(I, sigmaz())
-    sm_B = tensor(I, sigmam())
 
-    # Things that affect BOTH simultaneously
-    sz_A_B = tensor(sigmaz(), sigmaz())  # Growing apart partners, Anti-correlated Dephase A/B
-    sm_A_B = tensor(sigmam(), sigmam()) # Codepedent downward spiral partners, Collective Decay A/B
+def simulate_dynamics(params=None, progress=None, backend="qutip", periods=10, samples=200,
+                      propagation="ode", quality="standard"):
+    """
+    Runs the Floquet-Markov model without any reporting or plotting.
+    Returns the sample times, both happiness trajectories, the final
+    lab-frame state and the hybrid health score. `progress`, if given, is
+    called with the name of each stage as it starts.
+
+    backend="qutip" integrates the master equation with qutip's zvode
+    setup; backend="numpy" uses the batched engine in
+    qupid_floquet_engine (exact exponentials, same model).
+
+    The trajectory has `samples` points over `periods` drive periods.
+    propagation="periodic" propagates a single period and reaches later
+    periods by repeating the one-period map: one propagator solve plus a
+    matrix product per period. The tolerances come from QUALITY_PRESETS[quality];
+    the sample count does not.
+    """
+    params = params or {}
+    progress = progress or _no_progress
+    if quality not in QUALITY_PRESETS:
+        raise ValueError(f"unknown quality preset '{quality}'; expected one of {tuple(QUALITY_PRESETS)}")
+    validate_simulation_options(backend, periods, samples, propagation)
+    validate_simulation_params(params)
+    periods = int(periods)
+    samples = int(samples)
+    preset = QUALITY_PRESETS[quality]
+    if backend == "numpy":
+        return _simulate_dynamics_numpy(params, progress, periods, samples, propagation, preset)
+    from qutip import Options, Qobj, floquet_master_equation_tensor
 
-    # Creates the "Swap" interaction
-    sy_A = tensor(sigmay(), I)
-    sy_B = tensor(I, sigmay())
+    # --- 1. Define The Operators ---
+    operators = qutip_operators()
+    sx_A, sz_A = operators["sx_A"], operators["sz_A"]
+    sx_B, sz_B = operators["sx_B"], operators["sz_B"]
+    sm_A, sm_B = operators["sm_A"], operators["sm_B"]
+    sz_A_B, sm_A_B = operators["sz_A_B"], operators["sm_A_B"]
+    sy_A, sy_B = operators["sy_A"], operators["sy_B"]
 
     # --- 2. Define Parameters ---
-    omega_A = float(params.get("omega_A", 1.0))
-    omega_B = float(params.get("omega_B", 1.4))
-    J_empathy = float(params.get("J_empathy", 0.1))
-    J_compatibility = float(
-        params.get("J_compatibility", params.get("J_compatability", 0.05))
-    )
-    drive_amplitude = float(params.get("drive_amplitude", 1.5))
-    drive_freq = float(params.get("drive_freq", 1.0))
+    hamiltonian_key = hamiltonian_key_for(params)
+    omega_A, omega_B, J_empathy, J_compatibility, drive_amplitude, drive_freq = hamiltonian_key
     T = (2 * np.pi) / drive_freq
 
-    args = {"w": drive_freq}
-
     # --- 3. Construct the Time-Dependent Hamiltonian ---
     H_static = (omega_A * sz_A) + (omega_B * sz_B) + \
                J_empathy * (sx_A * sx_B + sy_A * sy_B) + \
                J_compatibility * (sz_A * sz_B)
 
     H_driving_op = drive_amplitude * (sx_A + sx_B)
-    H = [H_static, [H_driving_op, lambda t, args: np.sin(args["w"] * t)]]
 
     # --- 4. Define Noise Spectra ---
     def make_spectrum(rate):
@@ -161,16 +550,16 @@ def run_simulation(params=None, render_plot=True):
             return rate / (2 * np.pi)
         return spectrum
 
-    rate_bit_flip_A = float(params.get("rate_bit_flip_A", 0.05))
-    rate_dephase_A = float(params.get("rate_dephase_A", 0.2))
-    rate_decay_A = float(params.get("rate_decay_A", 0.01))
+    rate_bit_flip_A = param_value(params, "rate_bit_flip_A")
+    rate_dephase_A = param_value(params, "rate_dephase_A")
+    rate_decay_A = param_value(params, "rate_decay_A")
 
-    rate_bit_flip_B = float(params.get("rate_bit_flip_B", 0.01))
-    rate_dephase_B = float(params.get("rate_dephase_B", 0.05))
-    rate_decay_B = float(params.get("rate_decay_B", 0.1))
+    rate_bit_flip_B = param_value(params, "rate_bit_flip_B")
+    rate_dephase_B = param_value(params, "rate_dephase_B")
+    rate_decay_B = param_value(params, "rate_decay_B")
 
-    rate_anti_corr = float(params.get("rate_anti_corr", 0.9))
-    rate_coll_decay = float(params.get("rate_coll_decay", 0.02))
+    rate_anti_corr = param_value(params, "rate_anti_corr")
+    rate_coll_decay = param_value(params, "rate_coll_decay")
 
     c_ops_list = []
     spectra_list = []
@@ -187,40 +576,133 @@ def run_simulation(params=None, render_plot=True):
     c_ops_list.append(sm_A_B); spectra_list.append(make_spectrum(rate_coll_decay))
 
     # --- 5. Setup Simulation ---
-    tlist = np.linspace(0.0, 10 * T, 200)
-    psi0 = tensor(basis(2, 0), basis(2, 0))
+    tlist = np.linspace(0.0, periods * T, samples)
+    psi0 = operators["psi0"]
 
     # --- 6. The Floquet-Markov Solver Flow ---
-    f_modes_0, f_energies = floquet_modes(H, T, args)
-    f_modes_table_t = floquet_modes_table(
-        f_modes_0, f_energies, np.linspace(0, T, 500 + 1), H, T, args
+    # One Floquet setup (cached per Hamiltonian) feeds both the solve and the
+    # lab-frame transform. Like fmmesolve, only the first collapse operator
+    # enters the rates.
+    progress("floquet_setup")
+    stage, sample_index = floquet_stage(
+        H_static.full(), H_driving_op.full(), drive_freq, tlist, key=hamiltonian_key,
+        rtol=preset["propagator_rtol"], atol=preset["propagator_atol"],
     )
+    modes_0 = stage["modes_0"]
 
-    output = fmmesolve(
-        H, psi0, tlist,
-        c_ops_list,
-        [],
-        spectra_list,
-        T=T,
-        args=args
+    rate_matrix = floquet_markov_rates(
+        stage, c_ops_list[0], spectra_list[0], w_th=0
     )
+    R = floquet_master_equation_tensor(rate_matrix, stage["energies"])
+    rho0 = psi0.proj()
+    rho0_floquet = modes_0.conj().T @ rho0.full() @ modes_0
 
     # --- 7. Transform & Extract Data ---
-    happiness_A = np.zeros(len(tlist))
-    happiness_B = np.zeros(len(tlist))
-
-    for idx, t in enumerate(tlist):
-        f_modes_t = floquet_modes_t_lookup(f_modes_table_t, t, T)
-        rho_lab = output.states[idx].transform(f_modes_t, True)
-        happiness_A[idx] = expect(sz_A, rho_lab)
-        happiness_B[idx] = expect(sz_B, rho_lab)
+    progress("solve")
+    # Expectation values are reduced inside the solve; only the final
+    # state is kept as a Qobj for scoring.
+    if propagation == "periodic":
+        expectations, final_floquet = evolve_periodic(
+            R.full()[None], rho0_floquet[None], T, tlist / T,
+            lab_frame_observables(stage, [sz_A, sz_B])[None],
+            stage["sample_phases"], sample_index,
+        )
+        happiness_A, happiness_B = expectations[0]
+        final_modes = stage["sample_modes"][sample_index[-1]]
+        final_rho = final_modes @ final_floquet[0] @ final_modes.conj().T
+    else:
+        (happiness_A, happiness_B), final_rho = floquet_markov_expectations(
+            R, rho0_floquet, tlist, stage, sample_index, [sz_A, sz_B],
+            options=Options(atol=preset["ode_atol"], rtol=preset["ode_rtol"]),
+        )
 
     # --- EXECUTE ANALYSIS ---
-    final_rho_floquet = output.states[-1]
-    final_modes = floquet_modes_t_lookup(f_modes_table_t, tlist[-1], T)
-    final_rho_lab = final_rho_floquet.transform(final_modes, True)
+    final_rho_lab = Qobj(final_rho, dims=rho0.dims)
 
+    progress("scoring")
     health_score = calculate_hybrid_score(tlist, happiness_A, happiness_B, final_rho_lab)
+    return {
+        "tlist": tlist,
+        "happiness_A": happiness_A,
+        "happiness_B": happiness_B,
+        "final_rho": final_rho_lab,
+        "health_score": health_score,
+    }
+
+def resolution_error(dynamics):
+    """
+    Estimated discretization error of a run's health score and of its
+    trajectory statistics (the largest over trajectory_summary): how much
+    they change when every other sample is dropped. Both converge as
+    1/samples, so this approximates the distance to the continuous-time
+    values, at the cost of one extra scoring. None below 3 samples.
+    """
+    tlist = np.asarray(dynamics["tlist"])
+    if len(tlist) < 3:
+        return None, None
+    half = np.round(np.linspace(0, len(tlist) - 1, (len(tlist) + 1) // 2)).astype(int)
+    data_A = np.asarray(dynamics["happiness_A"])
+    data_B = np.asarray(dynamics["happiness_B"])
+    coarse_score = calculate_hybrid_score(tlist[half], data_A[half], data_B[half], dynamics["final_rho"])
+    fine = trajectory_summary(tlist, data_A, data_B)
+    coarse = trajectory_summary(tlist[half], data_A[half], data_B[half])
+    stats_error = max(abs(fine[name] - coarse[name]) for name in fine)
+    return abs(float(dynamics["health_score"]) - coarse_score), stats_error
+
+
+def _adaptive_dynamics(params, progress, backend, periods, samples, propagation, tolerance):
+    # Standard tolerances; only the sample count is refined, since it
+    # carries nearly all of the error.
+    samples = int(samples or QUALITY_PRESETS["draft"]["samples"])
+    refinements = 0
+    while True:
+        dynamics = simulate_dynamics(
+            params, progress=progress, backend=backend,
+            periods=periods, samples=samples, propagation=propagation,
+        )
+        score_error, stats_error = resolution_error(dynamics)
+        stats_tolerance = tolerance * ADAPTIVE_STATS_PER_POINT
+        converged = score_error is not None and score_error <= tolerance and stats_error <= stats_tolerance
+        if converged or samples >= ADAPTIVE_MAX_SAMPLES:
+            break
+        # The error falls as 1/samples, so aim straight for the tolerance
+        # (with some margin), at least doubling.
+        ratio = 2.0 if score_error is None else max(score_error / tolerance, stats_error / stats_tolerance)
+        samples = min(ADAPTIVE_MAX_SAMPLES, max(2 * samples, int(np.ceil(1.2 * samples * ratio))))
+        refinements += 1
+    quality = {
+        "preset": "adaptive",
+        "tolerance": tolerance,
+        "converged": converged,
+        "refinements": refinements,
+    }
+    return dynamics, score_error, stats_error, quality
+
+
+def _simulation_result(params, progress, backend, periods, samples, propagation, quality="standard",
+                       tolerance=None):
+    if quality == "adaptive":
+        dynamics, score_error, stats_error, quality_info = _adaptive_dynamics(
+            params, progress, backend, periods, samples, propagation, float(tolerance or ADAPTIVE_TOLERANCE)
+        )
+    else:
+        dynamics = simulate_dynamics(
+            params, progress=progress, backend=backend, periods=periods,
+            samples=samples or QUALITY_PRESETS[quality]["samples"], propagation=propagation, quality=quality,
+        )
+        score_error, stats_error = resolution_error(dynamics)
+        quality_info = {"preset": quality}
+    quality_info.update(
+        samples=len(dynamics["tlist"]),
+        periods=int(periods),
+        score_error=score_error,
+        stats_error=stats_error,
+    )
+    tlist = dynamics["tlist"]
+    happiness_A = dynamics["happiness_A"]
+    happiness_B = dynamics["happiness_B"]
+    health_score = dynamics["health_score"]
+
     horoscope_text = generate_horoscope(tlist, happiness_A, happiness_B, health_score)
 
     report_lines = [
@@ -234,38 +716,289 @@ def run_simulation(params=None, render_plot=True):
     ]
     report_text = "\n".join(report_lines)
 
+    return {
+        "health_score": float(health_score),
+        "report_text": report_text,
+        "plot_id": register_trajectory(tlist, happiness_A, happiness_B),
+        "trajectory": {
+            "t": np.asarray(tlist).tolist(),
+            "happiness_A": np.asarray(happiness_A).tolist(),
+            "happiness_B": np.asarray(happiness_B).tolist(),
+        },
+        "quality": quality_info,
+    }
+
+def run_simulation(params=None, render_plot=False, progress=None, backend="qutip", periods=10,
+                   samples=None, propagation="ode", use_cache=True, quality="standard", tolerance=None):
+    """
+    Simulates, scores and writes the report. The trajectory is returned as
+    plain lists together with a `plot_id`; the PNG is rendered later via
+    qupid_plot.plot_png(plot_id), or inline as `plot_base64` when
+    `render_plot` is set.
+
+    `quality` picks a QUALITY_PRESETS entry (samples, unless given, and
+    solver tolerances) or "adaptive", which refines the sample count until
+    the estimated score error is within `tolerance` points (default
+    ADAPTIVE_TOLERANCE). The result's `quality` reports the preset, the
+    samples used and the estimated `score_error` and `stats_error`.
+
+    Results are memoized by result_cache_key, in memory and in a SQLite file
+    shared by all workers; `cache_hit` says whether this one was reused.
+    """
+    progress = progress or _no_progress
+    validate_simulation_options(backend, periods, samples, propagation, quality, tolerance)
+    validate_simulation_params(params)
+    if samples is None and quality != "adaptive":
+        samples = QUALITY_PRESETS[quality]["samples"]
+    key = (
+        result_cache_key(params, backend, periods, samples, propagation, quality, tolerance)
+        if use_cache else None
+    )
+    result = _result_cache.get(key) if use_cache else None
+    cache_hit = result is not None
+    if cache_hit:
+        progress("cache_hit")
+        trajectory = result["trajectory"]
+        # Plot ids are content hashes, so re-registering restores the same URL.
+        register_trajectory(trajectory["t"], trajectory["happiness_A"], trajectory["happiness_B"])
+    else:
+        result = _simulation_result(params, progress, backend, periods, samples, propagation, quality, tolerance)
+        if use_cache:
+            _result_cache.put(key, result)
+
     plot_b64 = None
     if render_plot:
-        matplotlib.use("Agg")
-        fig = plt.figure(figsize=(10, 6))
-        plt.style.use("dark_background")
-        plt.plot(tlist, happiness_A, label="Person A", color="#00FFFF", linewidth=2)
-        plt.plot(tlist, happiness_B, label="Person B", color="#FF00FF", linewidth=2, linestyle="--")
-        plt.axhline(0, color="white", linestyle=":", alpha=0.5)
-        plt.title("Relationship Dynamics with Periodic Effort (Floquet-Markov)")
-        plt.legend(loc="upper right")
-        plt.ylim(-1.1, 1.1)
-
-        buffer = io.BytesIO()
-        fig.savefig(buffer, format="png", dpi=160, bbox_inches="tight")
-        buffer.seek(0)
-        plot_b64 = base64.b64encode(buffer.read()).decode("utf-8")
-        plt.close(fig)
+        progress("plotting")
+        trajectory = result["trajectory"]
+        plot_b64 = plot_base64(trajectory["t"], trajectory["happiness_A"], trajectory["happiness_B"])
+
+    return dict(result, plot_base64=plot_b64, cache_hit=cache_hit)
 
+
+def warmup(backends=SIMULATION_BACKENDS, render_plot=True):
+    """
+    Loads qutip, builds the static operators and runs one tiny simulation
+    per backend (plus a thumbnail render) so the first real request does not
+    pay for imports, compiled-extension loading or font setup. Returns the
+    seconds spent on each step.
+    """
+    timings = {}
+    start = time.perf_counter()
+    qutip_operators()
+    timings["qutip"] = time.perf_counter() - start
+    for backend in backends:
+        start = time.perf_counter()
+        dynamics = simulate_dynamics(dict(DEFAULT_PARAMS), backend=backend, periods=1, samples=21)
+        timings[f"simulate_{backend}"] = time.perf_counter() - start
+    if render_plot:
+        start = time.perf_counter()
+        render_dynamics_png(dynamics["tlist"], dynamics["happiness_A"], dynamics["happiness_B"], dpi=20)
+        timings["plot"] = time.perf_counter() - start
+    return timings
+
+
+MAX_SWEEP_POINTS = 2500
+# Scoring backends for sweeps and candidate lists. "steady_state" scores the
+# long-run periodic state without integrating in time (steady_state_batch),
+# so it takes far more points, evaluated in chunks of a few Hamiltonians.
+SCORING_BACKENDS = SIMULATION_BACKENDS + ("steady_state",)
+MAX_STEADY_STATE_POINTS = 50000
+STEADY_STATE_CHUNK_KEYS = 32
+STEADY_STATE_CHUNK_POINTS = 1000
+
+
+def max_scoring_points(backend):
+    return MAX_STEADY_STATE_POINTS if backend == "steady_state" else MAX_SWEEP_POINTS
+
+def trajectory_summary(times, data_A, data_B):
+    """
+    The trajectory statistics that feed calculate_hybrid_score.
+    """
+    correlation = np.corrcoef(data_A, data_B)[0, 1]
     return {
-        "health_score": float(health_score),
-        "report_text": report_text,
-        "plot_base64": plot_b64,
+        "mean_A": float(np.mean(data_A)),
+        "mean_B": float(np.mean(data_B)),
+        "final_A": float(data_A[-1]),
+        "final_B": float(data_B[-1]),
+        "correlation": 0.0 if np.isnan(correlation) else float(correlation),
+        "trend": float((np.polyfit(times, data_A, 1)[0] + np.polyfit(times, data_B, 1)[0]) / 2.0),
+        "volatility": float((np.std(data_A) + np.std(data_B)) / 2.0),
     }
 
+def steady_state_summary(happiness_A, happiness_B):
+    """
+    trajectory_summary of the periodic steady state from one period of it:
+    long-run means, spreads and correlation, the state at a period boundary
+    as the final values, and no trend.
+    """
+    summary = trajectory_summary(np.arange(len(happiness_A)), happiness_A, happiness_B)
+    summary.update(final_A=float(happiness_A[0]), final_B=float(happiness_B[0]), trend=0.0)
+    return summary
+
+def sweep_axis_values(axis):
+    """
+    Values for one swept slider: either an explicit "values" list or
+    "start"/"stop"/"num" (inclusive, like np.linspace).
+    """
+    if "values" in axis:
+        values = [float(v) for v in axis["values"]]
+    else:
+        values = np.linspace(float(axis["start"]), float(axis["stop"]), int(axis.get("num", 11))).tolist()
+    if not values:
+        raise ValueError(f"sweep axis '{axis.get('field')}' has no values")
+    return values
+
+def _steady_state_chunks(points):
+    # The propagator integration of a chunk takes as many steps as its
+    # slowest drive needs, so chunks hold a few Hamiltonians of similar
+    # drive frequency; the point limit bounds the per-point arrays.
+    by_key = {}
+    for point in points:
+        by_key.setdefault(hamiltonian_key_for(point[1]), []).append(point)
+    freq = HAMILTONIAN_FIELDS.index("drive_freq")
+    chunk, keys = [], 0
+    for key in sorted(by_key, key=lambda key: (key[freq], key)):
+        group = by_key[key]
+        for start in range(0, len(group), STEADY_STATE_CHUNK_POINTS):
+            piece = group[start:start + STEADY_STATE_CHUNK_POINTS]
+            if chunk and (keys == STEADY_STATE_CHUNK_KEYS or len(chunk) + len(piece) > STEADY_STATE_CHUNK_POINTS):
+                yield chunk
+                chunk, keys = [], 0
+            chunk += piece
+            keys += 1
+    if chunk:
+        yield chunk
+
+def _simulate_group(points, include_summaries, backend="qutip"):
+    # Runs in a pool worker. Points in a group share Hamiltonian parameters,
+    # so only the first one pays for the Floquet setup. The numpy backend
+    # evolves the whole group as one batch; steady_state scores it in chunks.
+    if backend == "steady_state":
+        results = []
+        for chunk in _steady_state_chunks(points):
+            batch = steady_state_batch([params for _, params in chunk])
+            for i, (index, _) in enumerate(chunk):
+                entry = {"index": index, "health_score": float(batch["health_score"][i])}
+                if include_summaries:
+                    entry["summary"] = steady_state_summary(batch["happiness_A"][i], batch["happiness_B"][i])
+                    entry["summary"]["relaxation_periods"] = float(batch["relaxation_periods"][i])
+                results.append(entry)
+        return results
+    if backend == "numpy":
+        batch = simulate_batch([params for _, params in points])
+        runs = [
+            (batch["times"][i], batch["happiness_A"][i], batch["happiness_B"][i], batch["health_score"][i])
+            for i in range(len(points))
+        ]
+    else:
+        runs = []
+        for _, params in points:
+            dynamics = simulate_dynamics(params)
+            runs.append((dynamics["tlist"], dynamics["happiness_A"], dynamics["happiness_B"], dynamics["health_score"]))
+
+    results = []
+    for (index, _), (times, data_A, data_B, score) in zip(points, runs):
+        entry = {"index": index, "health_score": float(score)}
+        if include_summaries:
+            entry["summary"] = trajectory_summary(times, data_A, data_B)
+        results.append(entry)
+    return results
+
+def score_parameter_sets(params_list, workers=1, include_summaries=False, backend="qutip"):
+    """
+    Health scores (and optionally trajectory summaries) for a list of
+    simulation parameter dicts, in order. Points are grouped by Hamiltonian
+    parameters and the groups spread over a process pool of `workers`;
+    with backend="numpy" each worker evolves its points as one batch, and
+    backend="steady_state" scores the long-run periodic state of each
+    point instead of a 10-period run (see steady_state_batch), which is
+    cheap enough to rank thousands of candidates.
+    Returns (scores array, summaries list, number of groups, workers used).
+    """
+    from collections import OrderedDict
+    from concurrent.futures import ProcessPoolExecutor
+
+    groups = OrderedDict()
+    for index, params in enumerate(params_list):
+        key = hamiltonian_key_for(params)
+        if not key[-1] > 0:
+            raise ValueError(f"point {index} has no drive frequency (mutualFrequency must be above 0)")
+        groups.setdefault(key, []).append((index, params))
+
+    workers = max(1, min(int(workers or 1), os.cpu_count() or 1, len(groups)))
+    tasks = list(groups.values())
+    if backend in ("numpy", "steady_state"):
+        # Larger batches amortize better: one task per worker, groups kept whole.
+        tasks = [sum(tasks[i::workers], []) for i in range(workers)]
+    if workers == 1:
+        batches = [_simulate_group(points, include_summaries, backend) for points in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_simulate_group, points, include_summaries, backend) for points in tasks]
+            batches = [future.result() for future in futures]
+
+    scores = np.zeros(len(params_list))
+    summaries = [None] * len(params_list)
+    for batch in batches:
+        for entry in batch:
+            scores[entry["index"]] = entry["health_score"]
+            summaries[entry["index"]] = entry.get("summary")
+    return scores, summaries, len(groups), workers
+
+def run_sweep(base_payload, axes, workers=1, include_summaries=False, backend="qutip"):
+    """
+    Evaluates the health score over a grid of slider values.
+
+    `base_payload` uses the same slider fields as build_simulation_args;
+    `axes` is a list of {"field": <slider>, "values": [...]} (or
+    start/stop/num). Points are grouped by Hamiltonian parameters and the
+    groups are spread over a process pool of `workers`; nothing is plotted.
+    With backend="numpy" each task is evolved as one vectorized batch;
+    backend="steady_state" scores long-run steady states and allows up to
+    MAX_STEADY_STATE_POINTS points.
+    Returns the score grid (nested lists, axes in the given order) and,
+    optionally, per-point trajectory summaries in the same layout.
+    """
+    import itertools
+
+    base_payload = dict(base_payload or {})
+    if backend not in SCORING_BACKENDS:
+        raise ValueError(f"unknown backend '{backend}'; expected one of {SCORING_BACKENDS}")
+    if not axes:
+        raise ValueError("sweep needs at least one axis")
+    fields = [axis["field"] for axis in axes]
+    grids = [sweep_axis_values(axis) for axis in axes]
+    shape = [len(values) for values in grids]
+    n_points = int(np.prod(shape))
+    if n_points > max_scoring_points(backend):
+        raise ValueError(f"sweep has {n_points} points; the limit is {max_scoring_points(backend)}")
+
+    params_list = [
+        build_simulation_args(dict(base_payload, **dict(zip(fields, combo))))
+        for combo in itertools.product(*grids)
+    ]
+    scores, summaries, n_groups, workers = score_parameter_sets(params_list, workers, include_summaries, backend)
+
+    result = {
+        "axes": [{"field": field, "values": values} for field, values in zip(fields, grids)],
+        "scores": np.round(scores, 3).reshape(shape).tolist(),
+        "points": n_points,
+        "hamiltonian_groups": n_groups,
+        "workers": workers,
+        "backend": backend,
+    }
+    if include_summaries:
+        result["summaries"] = np.array(summaries, dtype=object).reshape(shape).tolist()
+    return result
 
 if __name__ == "__main__":
-    results = run_simulation()
+    results = run_simulation(render_plot=True)
     print(results["report_text"])
     if results["plot_base64"]:
         try:
             import matplotlib
             matplotlib.use("TkAgg")
+            import matplotlib.pyplot as plt
             img_data = base64.b64decode(results["plot_base64"])
             img_buf = io.BytesIO(img_data)
             img = plt.imread(img_buf, format="png")
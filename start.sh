@@ -11,4 +11,6 @@ source "$ROOT_DIR/.venv/bin/activate"
 # IMPORTANT: bind to Render's port
 export PORT="${PORT:-5000}"
 
-exec python "$BACKEND_DIR/app.py"
+# preloaded, pre-forked workers; see backend/gunicorn.conf.py for the knobs
+cd "$ROOT_DIR"
+exec gunicorn -c "$BACKEND_DIR/gunicorn.conf.py" backend.app:app